@@ -0,0 +1,55 @@
+"""Micro-benchmark colormapping of a single frame.
+
+Compares the previous matplotlib path (float64 RGBA, scaled and cast back to uint8)
+with the cached lookup table used by `topil`, `render_slice` and videos.
+
+Usage:
+    python benchmarks/bench_colormap.py [--size N] [--cmap NAME] [--repeats N]
+"""
+
+import argparse
+import time
+from collections.abc import Callable
+
+import matplotlib as mpl
+import numpy as np
+
+from niclips.image import colormap, normalize, topil
+
+
+def _matplotlib(data: np.ndarray, cmap: str) -> np.ndarray:
+    return (255 * mpl.colormaps[cmap](data)[..., :3]).astype("uint8")
+
+
+def _time(fn: Callable[[], object], repeats: int) -> float:
+    fn()
+    tic = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - tic) / repeats
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--size", type=int, default=256)
+    parser.add_argument("--cmap", default="gray")
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    frame = rng.normal(1000, 50, size=(args.size, args.size))
+    data = normalize(frame)
+
+    results = {
+        "matplotlib": _time(lambda: _matplotlib(data, args.cmap), args.repeats),
+        "lookup table": _time(lambda: colormap(data, args.cmap), args.repeats),
+        "topil": _time(lambda: topil(frame, cmap=args.cmap), args.repeats),
+    }
+    print(f"{args.size}x{args.size} frame, '{args.cmap}' colormap")
+    for name, elapsed in results.items():
+        print(f"{name:>14}: {1e6 * elapsed:.0f} us/frame")
+
+
+if __name__ == "__main__":
+    main()
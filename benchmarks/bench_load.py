@@ -0,0 +1,80 @@
+"""Benchmark full loads of gzipped 4D Nifti images.
+
+Compares the `nifti` library (if installed) and `nibabel` eager loads with the
+multi-threaded gzip decompression path, both on first access (which builds the gzip
+seek index) and with the persisted index.
+
+Usage:
+    python benchmarks/bench_load.py [PATH] [--threads N] [--repeats N]
+
+If no path is given, a synthetic BOLD-like image is generated.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import nibabel as nib
+import numpy as np
+
+from niclips import io as noio
+
+
+def _make_image(out: Path, shape: tuple[int, ...]) -> Path:
+    rng = np.random.default_rng(42)
+    # Smooth-ish int16 data compresses similarly to real BOLD
+    data = rng.normal(1000, 50, size=shape).astype(np.int16)
+    nib.save(nib.Nifti1Image(data, affine=np.eye(4)), out)
+    return out
+
+
+def _time(fn: Callable[[], nib.Nifti1Image], repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        tic = time.perf_counter()
+        img = fn()
+        np.asanyarray(img.dataobj)
+        best = min(best, time.perf_counter() - tic)
+    return best
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("path", nargs="?", type=Path, default=None)
+    parser.add_argument("--threads", type=int, default=os.cpu_count())
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        os.environ["NICLIPS_CACHE_DIR"] = tmpdir
+        path = args.path or _make_image(
+            Path(tmpdir) / "bold.nii.gz", shape=(96, 96, 72, 200)
+        )
+        print(f"{path} ({path.stat().st_size / 1024**2:.1f} MiB compressed)")
+
+        results = {}
+        if noio.HAVE_NIFTI:
+            results["nifti"] = _time(
+                lambda: noio.load_nifti(path, reader="nifti"), args.repeats
+            )
+        results["nibabel"] = _time(
+            lambda: noio.load_nifti(path, reader="nibabel"), args.repeats
+        )
+        results["parallel (build index)"] = _time(
+            lambda: noio.load_nifti_parallel(path, threads=args.threads), 1
+        )
+        results[f"parallel ({args.threads} threads)"] = _time(
+            lambda: noio.load_nifti_parallel(path, threads=args.threads),
+            args.repeats,
+        )
+
+    for name, elapsed in results.items():
+        print(f"{name:>28}: {elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Benchmark rendering of 4D three-view video frames.
+
+Compares rendering each frame with `three_view_frame` against the batched renderer
+used by `three_view_video`. Frames are rendered but not encoded.
+
+Usage:
+    python benchmarks/bench_video.py [PATH] [--volumes N] [--batch-size N]
+
+If no path is given, a synthetic BOLD-like image is generated.
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import nibabel as nib
+import numpy as np
+from PIL import Image
+
+import niclips.image as noimg
+from niclips.defaults import get_default_coord, get_default_vmin_vmax
+from niclips.figures.multi_view import three_view_frame
+
+
+def _make_image(shape: tuple[int, ...]) -> nib.Nifti1Image:
+    rng = np.random.default_rng(42)
+    data = rng.normal(1000, 50, size=shape).astype(np.int16)
+    return nib.Nifti1Image(data, affine=np.diag([3.0, 3.0, 3.5, 1.0]))
+
+
+def _per_frame(img: nib.Nifti1Image, coord: tuple, vmin: float, vmax: float) -> None:
+    for idx in range(img.shape[-1]):
+        frame = three_view_frame(img, coord=coord, idx=idx, vmin=vmin, vmax=vmax)
+        noimg.annotate(frame, text=f"T={idx}", loc="upper right", size=14)
+
+
+def _batched(
+    img: nib.Nifti1Image, coord: tuple, vmin: float, vmax: float, batch_size: int
+) -> None:
+    layout: noimg.GridLayout | None = None
+    num_volumes = img.shape[-1]
+    for start in range(0, num_volumes, batch_size):
+        volumes = slice(start, min(start + batch_size, num_volumes))
+        panels = [
+            noimg.render_slices(
+                img, axis=axis, coord=coord, vmin=vmin, vmax=vmax, volumes=volumes
+            )
+            for axis in [2, 1, 0]
+        ]
+        if layout is None:
+            layout = noimg.GridLayout([panel.shape[1:] for panel in panels])
+            canvas = layout.canvas(batch_size)
+        frames = layout.paste(panels, out=canvas[: len(panels[0])])
+        for idx, frame in enumerate(frames, start=start):
+            frame_img = Image.fromarray(frame).convert("RGB")
+            noimg.annotate(frame_img, f"T={idx}", "upper right", size=14, inplace=True)
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("path", nargs="?", type=Path, default=None)
+    parser.add_argument("--volumes", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=8)
+    args = parser.parse_args()
+
+    if args.path:
+        img = noimg.to_ras(nib.load(args.path))
+    else:
+        img = _make_image((96, 96, 72, args.volumes))
+    img.get_fdata()
+    coord = get_default_coord(img)
+    vmin, vmax = get_default_vmin_vmax(img)
+    print(f"{img.shape} image")
+
+    for name, fn in [
+        ("per frame", lambda: _per_frame(img, coord, vmin, vmax)),
+        ("batched", lambda: _batched(img, coord, vmin, vmax, args.batch_size)),
+    ]:
+        tic = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - tic
+        per_frame = 1000 * elapsed / img.shape[-1]
+        print(f"{name:>10}: {elapsed:.2f}s ({per_frame:.1f} ms/frame)")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,26 +3,43 @@
 import nibabel as nib
 
 import niclips.image as noimg
+from niclips.products import ImageProducts
 
 
-def get_default_coord(img: nib.Nifti1Image) -> tuple[float, float, float]:
-    """Get default coordinates of an image (middle of volume)."""
-    coord = noimg.ind2coord(img.affine, img.header["dim"][1:4] // 2)
+def get_default_coord(
+    img: nib.Nifti1Image | nib.Nifti1Header,
+) -> tuple[float, float, float]:
+    """Get default coordinates of an image (middle of volume).
+
+    Only the header is needed, e.g. as loaded by `niclips.io.load_nifti_header`.
+    """
+    if isinstance(img, nib.Nifti1Header):
+        affine, header = img.get_best_affine(), img
+    else:
+        affine, header = img.affine, img.header
+    coord = noimg.ind2coord(affine, header["dim"][1:4] // 2)
     coord = tuple(coord)
     return coord
 
 
-def get_default_window(img: nib.Nifti1Image) -> noimg.Window:
-    """Get default window of an image."""
+def get_default_window(
+    img: nib.Nifti1Image, products: ImageProducts | None = None
+) -> noimg.Window:
+    """Get default window of an image, reusing the image's `products` if given."""
+    if products is not None:
+        return products["window"]
     return noimg.center_minmax(img)
 
 
 def get_default_vmin_vmax(
-    img: nib.Nifti1Image, vmin: float | None = None, vmax: float | None = None
+    img: nib.Nifti1Image,
+    vmin: float | None = None,
+    vmax: float | None = None,
+    products: ImageProducts | None = None,
 ) -> tuple[float, float]:
     """Get default window min/max of an image."""
     if vmin is None or vmax is None:
-        window = get_default_window(img)
+        window = get_default_window(img, products=products)
         if vmin is None:
             vmin = window.vmin
         if vmax is None:
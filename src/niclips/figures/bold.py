@@ -1,6 +1,10 @@
 """Bold fMRI figure generation module."""
 
+import logging
 import math
+import os
+from pathlib import Path
+from typing import cast
 
 import matplotlib.figure as mpl_figure
 import nibabel as nib
@@ -8,16 +12,21 @@ import numpy as np
 from matplotlib import pyplot as plt
 from matplotlib.gridspec import GridSpec
 from PIL import Image
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
 
 import niclips.image as noimg
 from niclips.checks import check_3d, check_4d, check_ras
-from niclips.defaults import get_default_coord, get_default_vmin_vmax
-from niclips.typing import StrPath
+from niclips.defaults import get_default_coord
+from niclips.io import file_digest, get_cache_dir
+from niclips.precision import get_float_dtype
+from niclips.products import ImageProducts
+from niclips.typing import CarpetBackend, ClusterMethod, StrPath
 
 from .multi_view import three_view_frame
 
 EPS = 1e-6
+# Number of timeseries labeled at a time when clustering
+PREDICT_CHUNK = 65536
 plt.style.use("bmh")
 
 
@@ -26,28 +35,75 @@ def cluster_timeseries(
     n_clusters: int = 3,
     n_samples: int = 10000,
     seed: int = 42,
+    products: ImageProducts | None = None,
+    method: ClusterMethod = "kmeans",
+    cache: bool = False,
 ) -> nib.Nifti1Image:
-    """Segment a BOLD volume by k-means clustering to the timeseries."""
+    """Segment a BOLD volume by clustering the timeseries.
+
+    Methods are "kmeans" (k-means fit to `n_samples` timeseries), "minibatch"
+    (mini-batch k-means in float32), or the "tsnr" and "intensity" shortcuts,
+    splitting the mask into quantiles of temporal SNR or mean intensity without
+    fitting. Labels are ranked by mean tSNR. Timeseries are labeled in chunks of
+    `PREDICT_CHUNK` voxels.
+
+    If `cache` is set, the label volume of an image with a filename is saved to the
+    niclips cache directory, keyed by the image file and clustering parameters, and
+    loaded from there on reruns.
+    """
+    cache_path = None
+    fname = bold.get_filename()
+    if cache and fname:
+        digest = file_digest(fname, method, n_clusters, n_samples, seed)
+        cache_path = get_cache_dir() / "labels" / f"{digest}.nii.gz"
+        if cache_path.exists():
+            logging.debug("Loading cached cluster labels %s", cache_path)
+            cached = cast(nib.Nifti1Image, nib.load(cache_path))
+            return nib.Nifti1Image(cached.get_fdata(), affine=bold.affine)
+
     rng = np.random.default_rng(seed)
+    products = products or ImageProducts(bold)
 
     # bold data and mean volume
-    bold_data = bold.get_fdata()
-    bold_mean = bold_data.mean(axis=-1)
-
-    # rough mask
-    mask = bold_mean > bold_mean.mean()
-    mask_data = bold_data[mask]
-
-    # fit clustering to subset of timeseries
-    clust = KMeans(n_clusters=n_clusters, n_init="auto", random_state=seed)
-    indices = rng.permutation(len(mask_data))[:n_samples]
-    clust.fit(mask_data[indices])
-
-    # predict cluster for full mask data
-    mask_label = clust.predict(mask_data)
+    bold_data = noimg.get_fdata(bold)
+    bold_mean = products["mean"]
+
+    # rough mask, and voxel-wise tSNR within it
+    mask = products["mask"]
+    mask_ind = np.nonzero(mask)
+    mask_tsnr = bold_mean[mask] / (products["std"][mask] + EPS)
+
+    if method in {"tsnr", "intensity"}:
+        # split into equally sized quantiles, without clustering
+        values = mask_tsnr if method == "tsnr" else bold_mean[mask]
+        edges = np.quantile(values, np.linspace(0, 1, n_clusters + 1)[1:-1])
+        mask_label = np.searchsorted(edges, values, side="right")
+    else:
+        if method == "minibatch":
+            dtype = np.dtype(np.float32)
+            clust = MiniBatchKMeans(
+                n_clusters=n_clusters, n_init="auto", random_state=seed
+            )
+        elif method == "kmeans":
+            dtype = get_float_dtype(bold_data.dtype)
+            clust = KMeans(n_clusters=n_clusters, n_init="auto", random_state=seed)
+        else:
+            raise ValueError(f"Invalid clustering method {method}")
+
+        # fit clustering to subset of timeseries
+        num_voxels = len(mask_ind[0])
+        indices = rng.choice(num_voxels, min(n_samples, num_voxels), replace=False)
+        samples = bold_data[tuple(ind[indices] for ind in mask_ind)]
+        clust.fit(samples.astype(dtype, copy=False))
+
+        # predict cluster for full mask data, a chunk of timeseries at a time
+        mask_label = np.empty(num_voxels, dtype=np.intp)
+        for start in range(0, num_voxels, PREDICT_CHUNK):
+            chunk = slice(start, start + PREDICT_CHUNK)
+            chunk_data = bold_data[tuple(ind[chunk] for ind in mask_ind)]
+            mask_label[chunk] = clust.predict(chunk_data.astype(dtype, copy=False))
 
     # sort labels by t-SNR
-    mask_tsnr = bold_mean[mask] / (mask_data.std(axis=-1) + EPS)
     class_tsnr = [np.mean(mask_tsnr[mask_label == idx]) for idx in range(n_clusters)]
     ranking = np.argsort(np.argsort(class_tsnr))
     mask_label = ranking[mask_label]
@@ -56,9 +112,24 @@ def cluster_timeseries(
     label = np.full(bold.shape[:3], np.nan)
     label[mask] = mask_label
     label_nii = nib.Nifti1Image(label, affine=bold.affine)
+
+    if cache_path is not None:
+        _save_label(label_nii, cache_path)
     return label_nii
 
 
+def _save_label(label: nib.Nifti1Image, path: Path) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename so concurrent workers never read a partial file
+        tmp_path = path.with_name(f"{os.getpid()}.tmp.{path.name}")
+        label_data = np.asarray(label.dataobj, dtype=np.float32)
+        nib.save(nib.Nifti1Image(label_data, affine=label.affine), tmp_path)
+        tmp_path.replace(path)
+    except OSError as exc:
+        logging.warning("Unable to save cluster labels %s: %s", path, exc)
+
+
 def carpet_plot(
     bold: nib.Nifti1Image,
     out: StrPath | None = None,
@@ -67,53 +138,58 @@ def carpet_plot(
     seed: int = 42,
     label_cmap: str = "brg",
     alpha: float = 0.3,
+    products: ImageProducts | None = None,
+    cluster_method: ClusterMethod = "kmeans",
+    cache_labels: bool = False,
+    backend: CarpetBackend = "raster",
+    fontsize: int = 14,
     **kwargs,
-) -> mpl_figure.Figure:
-    """BOLD "carpet" plot showing timeseries for a subset of voxels."""
+) -> Image.Image | mpl_figure.Figure:
+    """BOLD "carpet" plot showing timeseries for a subset of voxels.
+
+    If no `label` is given, voxels are labeled by `cluster_timeseries` with
+    `cluster_method`, caching the labels if `cache_labels`.
+
+    With the "raster" backend, the plot is drawn directly as a uint8 image (returned
+    as a PIL Image), with the carpet colormapped by lookup and laid out next to the
+    axial panel. The "matplotlib" backend draws a matplotlib figure instead (returned
+    as a Figure), e.g. for publication-quality output.
+    """
     rng = np.random.default_rng(seed)
 
     check_4d(bold)
     check_ras(bold)
+    products = products or ImageProducts(bold)
     if label is None:
-        label = cluster_timeseries(bold)
+        label = cluster_timeseries(
+            bold, products=products, method=cluster_method, cache=cache_labels
+        )
     check_3d(label)
     check_ras(label)
 
     # get bold data and mean image
-    bold_data = bold.get_fdata()
-    bold_mean_data = bold_data.mean(axis=-1)
-    bold_mean = nib.Nifti1Image(bold_mean_data, affine=bold.affine)
+    bold_data = noimg.get_fdata(bold)
+    bold_mean = nib.Nifti1Image(products["mean"], affine=bold.affine)
 
     # axial bold mean and label overlay
     coord = np.asarray(get_default_coord(bold_mean))
-    vmin, vmax = get_default_vmin_vmax(bold_mean)
-    panel = noimg.render_slice(
-        bold_mean,
-        axis=2,
-        coord=coord,
-        vmin=vmin,
-        vmax=vmax,
-        fontsize=18,
-    )
-    panel_label = noimg.render_slice(
-        label,
-        axis=2,
-        coord=coord,
-        cmap=label_cmap,
-        fontsize=18,
-    )
-    panel = noimg.overlay(panel, panel_label, alpha=alpha)
+    vmin, vmax = products["mean_window"]
+    renderer = noimg.VolumeRenderer(bold_mean, vmin=vmin, vmax=vmax)
+    panel = renderer.render(axis=2, coord=coord, fontsize=18)
+    label_renderer = noimg.VolumeRenderer(label, cmap=label_cmap)
+    panel_label = label_renderer.render(axis=2, coord=coord, fontsize=18)
+    panel = noimg.composite(np.asarray(panel), [np.asarray(panel_label)], alpha)
 
     # assume nan is background; apply mask
-    label_data = label.get_fdata()
-    mask = ~np.isnan(label_data)
-    mask_data = bold_data[mask]
-    mask_label = label_data[mask]
+    label_data = noimg.get_fdata(label)
+    mask_ind = np.nonzero(~np.isnan(label_data))
 
-    # random sample of voxels
-    indices = rng.permutation(len(mask_data))[:n_voxels]
-    example_data = mask_data[indices]
-    example_label = mask_label[indices]
+    # random sample of voxels, gathering only their timeseries
+    num_voxels = len(mask_ind[0])
+    indices = rng.choice(num_voxels, min(n_voxels, num_voxels), replace=False)
+    example_ind = tuple(ind[indices] for ind in mask_ind)
+    example_data = bold_data[example_ind]
+    example_label = label_data[example_ind]
 
     # order by cluster
     order = np.argsort(example_label)
@@ -121,10 +197,79 @@ def carpet_plot(
     example_label = example_label[order]
 
     # centered and scaled carpet
+    example_data = example_data.astype(get_float_dtype(example_data.dtype), copy=False)
     carpet = example_data - example_data.mean(axis=1, keepdims=True)
     carpet = carpet / (carpet.std() + EPS)
 
-    # generate plots
+    if backend == "matplotlib":
+        fig = _carpet_figure(panel, carpet, example_label, label_cmap=label_cmap)
+        if out:
+            fig.savefig(out, bbox_inches="tight", dpi=150)
+        return fig
+    if backend != "raster":
+        raise ValueError(f"Invalid carpet plot backend {backend}")
+
+    grid = _carpet_image(
+        panel, carpet, example_label, label_cmap=label_cmap, fontsize=fontsize
+    )
+    grid_img = noimg.topil(grid)
+    if out:
+        grid_img.save(out)
+    return grid_img
+
+
+def _carpet_image(
+    panel: np.ndarray,
+    carpet: np.ndarray,
+    example_label: np.ndarray,
+    label_cmap: str,
+    fontsize: int,
+) -> np.ndarray:
+    """Draw the axial panel and carpet, with its label strip, as a uint8 RGB array.
+
+    The carpet is twice as wide as it is high, with the height of the panel.
+    """
+    height = panel.shape[0]
+    width = 2 * height
+    # extra space for label
+    label_w = math.ceil(0.025 * width)
+    num_voxels, num_volumes = carpet.shape
+
+    # Resample the normalized carpet, then colormap
+    carpet = noimg.normalize(carpet, vmin=-2.0, vmax=2.0)
+    carpet = noimg.resize_stack(carpet, (width - label_w, height))
+    carpet_img = noimg.colormap(carpet, cmap="gray")[..., :3]
+
+    # One label color per row (nearest voxel), tiled across the strip
+    rows = ((np.arange(height) + 0.5) * num_voxels / height).astype(int)
+    strip = noimg.colormap(noimg.normalize(example_label[rows]), cmap=label_cmap)
+    strip = np.broadcast_to(strip[:, None, :3], (height, label_w, 3))
+    carpet_img = np.concatenate([strip, carpet_img], axis=1)
+
+    # Volume ticks along the bottom, labeled with the number of volumes
+    step = _tick_step(num_volumes)
+    ticks = np.arange(0, num_volumes + 1, step) * (width - label_w) / num_volumes
+    ticks = np.minimum(label_w + ticks.astype(int), width - 1)
+    carpet_img[-max(height // 64, 2) :, ticks] = 255
+    noimg.blit_text(carpet_img, str(num_volumes), loc="lower right", size=fontsize)
+
+    return noimg.stack_images([panel[..., :3], carpet_img], axis=1)
+
+
+def _tick_step(num: int, max_ticks: int = 6) -> int:
+    """Round step of at most about `max_ticks` ticks over `num` values."""
+    step = max(num // max_ticks, 1)
+    magnitude = 10 ** int(math.log10(step))
+    return next(mult * magnitude for mult in (1, 2, 5, 10) if mult * magnitude >= step)
+
+
+def _carpet_figure(
+    panel: np.ndarray,
+    carpet: np.ndarray,
+    example_label: np.ndarray,
+    label_cmap: str,
+) -> mpl_figure.Figure:
+    """Draw the axial panel and carpet, with its label strip, as a matplotlib figure."""
     fig = plt.figure(layout="tight", dpi=150, figsize=(6.4, 4.8))
     gs = GridSpec(1, 3, figure=fig)
 
@@ -147,8 +292,6 @@ def carpet_plot(
     ax2.tick_params(colors="w", labelsize=8, direction="in", pad=-8)
 
     fig.set_facecolor("black")
-    if out:
-        fig.savefig(out, bbox_inches="tight", dpi=150)
     return fig
 
 
@@ -156,19 +299,20 @@ def bold_mean_std(
     bold: nib.Nifti1Image,
     out: StrPath | None = None,
     std_vmax_ratio: float = 0.1,
+    products: ImageProducts | None = None,
     **kwargs,
 ) -> Image.Image:
     """Panel showing three-view BOLD mean and three-view tSNR."""
     check_4d(bold)
     check_ras(bold)
+    products = products or ImageProducts(bold)
 
     # bold mean and std
-    bold_data = bold.get_fdata()
-    bold_mean_data = bold_data.mean(axis=-1)
-    bold_std_data = bold_data.std(axis=-1)
+    bold_mean_data = products["mean"]
+    bold_std_data = products["std"]
 
     # summary stats computed over a rough mask
-    mask = bold_mean_data > bold_mean_data.mean()
+    mask = products["mask"]
     mean_med = np.median(bold_mean_data[mask])
     std_med = np.median(bold_std_data[mask])
 
@@ -176,21 +320,20 @@ def bold_mean_std(
     bold_std = nib.Nifti1Image(bold_std_data, affine=bold.affine)
 
     coord = get_default_coord(bold_mean)
-    vmin, vmax = get_default_vmin_vmax(bold_mean)
+    vmin, vmax = products["mean_window"]
     std_vmax = std_vmax_ratio * mean_med
 
     panel_mean = three_view_frame(
         bold_mean,
         coord=coord,
-        vmin=vmin,
-        vmax=vmax,
+        renderer=noimg.VolumeRenderer(bold_mean, vmin=vmin, vmax=vmax),
     )
     panel_std = three_view_frame(
         bold_std,
         coord=coord,
-        vmin=0.0,
-        vmax=std_vmax,
-        cmap="viridis",
+        renderer=noimg.VolumeRenderer(
+            bold_std, vmin=0.0, vmax=std_vmax, cmap="viridis"
+        ),
     )
 
     noimg.annotate(
@@ -1,179 +1,451 @@
 """Diffusion MRI figure generation module."""
 
 import re
+from collections.abc import Iterator
 from pathlib import Path
 
-import matplotlib.pyplot as plt
 import nibabel as nib
 import numpy as np
-from matplotlib.animation import FuncAnimation
-from matplotlib.gridspec import GridSpec
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from PIL import Image
 
 import niclips.image as noimg
-from niclips.checks import check_4d
 from niclips.defaults import get_default_coord, get_default_vmin_vmax
-from niclips.figures.multi_view import three_view_video
-from niclips.typing import StrPath
+from niclips.figures.multi_view import three_view_frame, three_view_video
+from niclips.io import EncoderLike, VideoWriter
+from niclips.products import ImageProducts, register_product
+from niclips.typing import Coord, StrPath
 
 nii_pattern = r"(\.nii(\.gz)?)$"
+# Default threshold for grouping bvals into shells
+SHELL_THRESH = 10
 
 
 def _equate_bvals(bvals: np.ndarray, thresh: int) -> np.ndarray:
-    """Map bvals within a given threshold to each other."""
-    uniq_bvals = sorted(np.unique(bvals).astype(int))
-    bval_map = {}
+    """Map bvals within a given threshold to each other.
+
+    Only the (few) unique bvals are grouped in a loop; all bvals are then mapped
+    at once by their index into the unique bvals.
+    """
+    uniq_bvals, inverse = np.unique(np.asarray(bvals).astype(int), return_inverse=True)
+    equated = np.empty_like(uniq_bvals)
 
     cur_bval = uniq_bvals[0]
-    for bval in uniq_bvals:
+    for idx, bval in enumerate(uniq_bvals):
         if (bval - cur_bval) > thresh:
             cur_bval = bval
-        bval_map[bval] = cur_bval
+        equated[idx] = cur_bval
+
+    return equated[inverse.reshape(-1)]
+
+
+class DwiSession:
+    """Gradient table, shells and shell summaries of a diffusion image.
+
+    Shared by the DWI views (see the "dwi" product), so that the `.bval`/`.bvec`
+    sidecars are read once. Volumes are grouped into shells of bvals within
+    `thresh`. The per-volume signal and per-shell mean images are computed together,
+    in a single pass over the volumes (see `niclips.image.iter_volumes`), on first
+    access.
+    """
+
+    def __init__(
+        self,
+        dwi: nib.Nifti1Image,
+        bvals: np.ndarray,
+        bvecs: np.ndarray,
+        thresh: int = SHELL_THRESH,
+    ) -> None:
+        self.dwi = dwi
+        self.bvals = bvals
+        self.bvecs = bvecs
+        self.thresh = thresh
+        self.shells = _equate_bvals(bvals, thresh=thresh)
+        self.shell_values, self._shell_ids = np.unique(self.shells, return_inverse=True)
+        self._signal: np.ndarray | None = None
+        self._shell_means: np.ndarray | None = None
+
+    @classmethod
+    def from_products(
+        cls, products: ImageProducts, thresh: int = SHELL_THRESH
+    ) -> "DwiSession":
+        """Get the session of an image, shared if for the default threshold."""
+        if thresh == SHELL_THRESH:
+            return products["dwi"]
+        return cls(products.img, products["bvals"], products["bvecs"], thresh=thresh)
+
+    def volumes(self, shell: int) -> np.ndarray:
+        """Indices of the volumes of a shell."""
+        return np.flatnonzero(self.shells == shell)
+
+    @property
+    def signal(self) -> np.ndarray:
+        """Mean signal of each volume."""
+        if self._signal is None:
+            self._read()
+        assert self._signal is not None
+        return self._signal
+
+    @property
+    def shell_means(self) -> dict[int, np.ndarray]:
+        """Mean image of each shell."""
+        if self._shell_means is None:
+            self._read()
+        assert self._shell_means is not None
+        return dict(zip(self.shell_values.tolist(), self._shell_means))
+
+    def _read(self) -> None:
+        """Compute the signal and shell means in one pass over the volumes."""
+        signal = np.empty(self.dwi.shape[3])
+        sums = np.zeros((len(self.shell_values), *self.dwi.shape[:3]))
+        for volumes, chunk in noimg.iter_volumes(self.dwi):
+            signal[volumes] = chunk.mean(axis=(0, 1, 2))
+            shell_ids = self._shell_ids[volumes]
+            for shell_id in np.unique(shell_ids):
+                sums[shell_id] += chunk[..., shell_ids == shell_id].sum(axis=-1)
+        counts = np.bincount(self._shell_ids, minlength=len(self.shell_values))
+        self._signal = signal
+        self._shell_means = sums / counts[:, None, None, None]
+
+
+def _sidecar_path(products: ImageProducts, ext: str) -> Path:
+    """Path of a sidecar file of the products' image."""
+    fname = products.img.get_filename()
+    if fname is None:
+        raise ValueError(f"Unable to locate {ext} sidecar of an image without a file")
+    return Path(re.sub(nii_pattern, ext, fname))
+
+
+@register_product("bvals")
+def _bvals(products: ImageProducts) -> np.ndarray:
+    """Diffusion gradient magnitudes, read from the `.bval` sidecar."""
+    bval = _sidecar_path(products, ".bval")
+    assert bval.exists()
+    return np.loadtxt(bval).astype(int)
+
 
-    return np.array([bval_map[bval] for bval in bvals])
+@register_product("bvecs")
+def _bvecs(products: ImageProducts) -> np.ndarray:
+    """Diffusion gradient directions, read from the `.bvec` sidecar."""
+    bvec = _sidecar_path(products, ".bvec")
+    assert bvec.exists()
+    return np.loadtxt(bvec)
 
 
-def _get_bval_indices(bvals: np.ndarray, bval: int) -> np.ndarray:
-    """Grab indices corresponding to a given bval."""
-    idxes = np.argwhere(bvals == bval)
-    return idxes[0] if len(idxes) == 1 else idxes
+@register_product("dwi", requires=["bvals", "bvecs"])
+def _dwi(products: ImageProducts) -> DwiSession:
+    """Diffusion session, with shells grouped with the default threshold."""
+    return DwiSession(products.img, products["bvals"], products["bvecs"])
 
 
 def visualize_qspace(
     dwi: nib.Nifti1Image,
     out: StrPath | None = None,
-    thresh: int = 10,
+    thresh: int = SHELL_THRESH,
+    products: ImageProducts | None = None,
+    num_frames: int = 360,
+    size: int = 480,
+    fontsize: int = 14,
+    encoder: EncoderLike = None,
     **kwargs,
-) -> FuncAnimation:
-    """Visualize diffusion gradients in q-space."""
-    # Grab paths and check existence
-    bvec = Path(re.sub(nii_pattern, ".bvec", dwi.get_filename()))
-    bval = Path(re.sub(nii_pattern, ".bval", dwi.get_filename()))
-    assert all([bvec.exists(), bval.exists()])
-
-    # Gradient vector
-    bvec_data = np.loadtxt(bvec)
-
-    # Equivalent gradient magnitudes
-    bval_data = np.loadtxt(bval).astype(int)
-    bval_data = _equate_bvals(bval_data, thresh=thresh)
-
-    # Generate animation
-    fig = plt.figure()
-    ax = fig.add_subplot(111, projection="3d")
-
-    # Plot by magnitude
-    for idx, val in enumerate(np.unique(bval_data)):
-        bval_idxes = _get_bval_indices(bval_data, val)
-        ax.scatter(
-            bvec_data[0, bval_idxes] * idx,
-            bvec_data[1, bval_idxes] * idx,
-            bvec_data[2, bval_idxes] * idx,
-            alpha=0.5,
-        )
-
-    # Settings
-    ax.set_title("Diffusion gradients in q-space")
-    ax.set_aspect("equal")
-    ax.set_xticklabels([])
-    ax.set_yticklabels([])
-    ax.set_zticklabels([])
-
-    # Animate
-    def _rotate(angle: int) -> None:
-        ax.view_init(elev=0, azim=angle, roll=0)
-
-    ani = FuncAnimation(fig, _rotate, frames=np.arange(0, 360, 1), interval=30)
-
-    if out:
-        ani.save(out, writer="ffmpeg", fps=10, dpi=150)
-    return ani
+) -> None:
+    """Visualize diffusion gradients in q-space, as a video rotating about the z-axis.
+
+    Frames are rendered by `iter_qspace_frames` and written to a `VideoWriter`, with
+    the `encoder` profile.
+    """
+    session = DwiSession.from_products(products or ImageProducts(dwi), thresh=thresh)
+    if not out:
+        return
+
+    frames = iter_qspace_frames(
+        # Gradient vector
+        bvecs=session.bvecs,
+        # Equivalent gradient magnitudes
+        shells=session.shells,
+        num_frames=num_frames,
+        size=size,
+        fontsize=fontsize,
+    )
+    with VideoWriter(out, fps=10, encoder=encoder) as writer:
+        for frame in frames:
+            writer.put(frame)
+
+
+def iter_qspace_frames(
+    bvecs: np.ndarray,
+    shells: np.ndarray,
+    num_frames: int = 360,
+    size: int = 480,
+    elev: float = 0.0,
+    radius: int = 3,
+    batch_size: int = 32,
+    fontsize: int = 14,
+) -> Iterator[np.ndarray]:
+    """Generate uint8 RGB frames, (`size`, `size`), of gradients rotating in q-space.
+
+    Gradient directions, shape (3, N), are scaled by the rank of their shell, and
+    viewed from elevation `elev` (degrees) at `num_frames` azimuths over a full
+    turn, with an orthographic projection. The points of a batch of `batch_size`
+    frames are rotated and projected at once, and splatted as disks of `radius`
+    pixels, colored by shell, with the nearest point drawn on top.
+    """
+    # Note: Ensure size is even numbered for video codec.
+    size += size % 2
+    ranks = np.searchsorted(np.unique(shells), shells)
+    points = np.asarray(bvecs, dtype=float).T * ranks[:, None]
+    colors = noimg.lookup(ranks % 10, cmap="tab10", depth=10)[:, :3]
+
+    # Disk offsets, and scale fitting the points within the frame
+    offsets = np.arange(-radius, radius + 1)
+    dy, dx = np.meshgrid(offsets, offsets, indexing="ij")
+    disk = dy**2 + dx**2 <= radius**2
+    dy, dx = dy[disk], dx[disk]
+    extent = max(np.linalg.norm(points, axis=1).max(initial=0.0), 1.0)
+    scale = (size / 2 - radius - 1) / extent
+
+    x, y, z = points.T
+    cos_elev, sin_elev = np.cos(np.deg2rad(elev)), np.sin(np.deg2rad(elev))
+    for start in range(0, num_frames, batch_size):
+        azim = 2 * np.pi * np.arange(start, min(start + batch_size, num_frames))
+        azim = azim[:, None] / num_frames
+        # Rotate all points for every view at once, (F, N)
+        toward = np.cos(azim) * x + np.sin(azim) * y
+        right = np.cos(azim) * y - np.sin(azim) * x
+        up = cos_elev * z - sin_elev * toward
+        depth = cos_elev * toward + sin_elev * z
+
+        # Pixel positions of the points' disks, (F, N, K)
+        rows = np.round(size / 2 - scale * up)[..., None].astype(int) + dy
+        cols = np.round(size / 2 + scale * right)[..., None].astype(int) + dx
+        frame_idx = np.arange(len(azim))[:, None, None]
+        pixels = ((frame_idx * size + rows) * size + cols).ravel()
+        depths = np.broadcast_to(depth[..., None], rows.shape).ravel()
+        point_idx = np.broadcast_to(np.arange(len(points))[:, None], rows.shape)
+
+        # Keep the nearest point of each pixel
+        order = np.lexsort((depths, pixels))
+        nearest = order[np.r_[pixels[order][1:] != pixels[order][:-1], True]]
+        frames = np.zeros((len(azim), size, size, 3), dtype=np.uint8)
+        frames.reshape(-1, 3)[pixels[nearest]] = colors[point_idx.ravel()[nearest]]
+
+        for frame in frames:
+            noimg.blit_text(
+                frame, "Diffusion gradients in q-space", loc="upper left", size=fontsize
+            )
+            yield frame
 
 
 def three_view_per_shell(
     dwi: nib.Nifti1Image,
     out: StrPath | None = None,
-    thresh: int = 10,
+    thresh: int = SHELL_THRESH,
     replace_str: str = "bval",
+    products: ImageProducts | None = None,
+    stream: bool | None = None,
+    encoder: EncoderLike = None,
+    **kwargs,
 ) -> list[nib.Nifti1Image]:
-    """Generate three-view videos per shell."""
-    # Grab bvals
-    bval = Path(re.sub(nii_pattern, ".bval", dwi.get_filename()))
-    assert bval.exists()
-    bval_data = np.loadtxt(bval).astype(int)
-    bval_data = _equate_bvals(bval_data, thresh=thresh)
+    """Generate three-view videos per shell.
+
+    The images of each shell are lazy selections of the diffusion image's volumes
+    (see `niclips.image.take_volumes`), which are only read when rendered. Videos
+    of large shells are streamed (see `three_view_video`), and all are encoded with
+    the `encoder` profile.
+    """
+    # Grab shells
+    session = DwiSession.from_products(products or ImageProducts(dwi), thresh=thresh)
+
+    if dwi.ndim > 4:
+        # Drop trailing singleton dimensions (e.g. 5D with a single volume)
+        dwi = nib.funcs.squeeze_image(dwi)
+    if dwi.ndim != 4:
+        raise ValueError(f"Diffusion image of the wrong shape {dwi.shape}")
 
     figs = []
-    for val in np.unique(bval_data):
-        bval_idxes = _get_bval_indices(bval_data, val)
-        dwi_arr = dwi.dataobj[:, :, :, bval_idxes]
-        # Squeeze if necessary (e.g. more than 1 volume in a shell)
-        if len(dwi_arr.shape) == 5:
-            if dwi_arr.shape[-1] > 1:
-                raise ValueError(f"Diffusion image of the wrong shape {dwi_arr.shape}")
-            dwi_arr = np.squeeze(dwi_arr, axis=-1)
-        figs.append(nib.Nifti1Image(dwi_arr, affine=dwi.affine))
-        check_4d(figs[-1])
+    for val in session.shell_values:
+        figs.append(noimg.take_volumes(dwi, session.volumes(val)))
 
         if out:
-            three_view_video(img=figs[-1], out=str(out).replace(replace_str, f"b{val}"))
+            three_view_video(
+                img=figs[-1],
+                out=str(out).replace(replace_str, f"b{val}"),
+                stream=stream,
+                encoder=encoder,
+            )
 
     return figs
 
 
+def three_view_shell_means(
+    dwi: nib.Nifti1Image,
+    out: StrPath | None = None,
+    thresh: int = SHELL_THRESH,
+    products: ImageProducts | None = None,
+    fontsize: int = 14,
+    **kwargs,
+) -> Image.Image:
+    """Panel of three-view mean images per shell, in ascending order of bval.
+
+    The shell means are computed by the shared `DwiSession`, in its single pass over
+    the volumes.
+    """
+    session = DwiSession.from_products(products or ImageProducts(dwi), thresh=thresh)
+    coord = get_default_coord(dwi)
+
+    panels = []
+    for val, mean in session.shell_means.items():
+        panel = three_view_frame(
+            nib.Nifti1Image(mean, affine=dwi.affine), coord=coord, fontsize=fontsize
+        )
+        noimg.annotate(
+            panel, f"b={val}", loc="upper right", size=fontsize, inplace=True
+        )
+        panels.append(panel)
+
+    grid = noimg.stack_images(panels, axis=0)
+    grid_img = noimg.topil(grid)
+
+    if out:
+        grid_img.save(out)
+    return grid_img
+
+
 def signal_per_volume(
     dwi: nib.Nifti1Image,
     out: StrPath | None = None,
     fontsize: int = 14,
+    products: ImageProducts | None = None,
+    panel_height: int | None = 256,
+    batch_size: int = 8,
+    encoder: EncoderLike = None,
     **kwargs,
 ) -> None:
-    """Generate plot of signal per volume (side-by-side)."""
-    signal = np.mean(dwi.dataobj, axis=(0, 1, 2))
-    coord = np.asarray(get_default_coord(dwi))
-    vmin, vmax = get_default_vmin_vmax(dwi)
-
-    # Create plot
-    fig = plt.figure(layout="tight", figsize=(6.4, 4.8))
-    gs = GridSpec(1, 2, figure=fig)
-
-    # Plot frame over time
-    ax1 = fig.add_subplot(gs[0, 0])
-    frame = noimg.render_slice(
-        noimg.index_img(dwi, 0),
-        axis=2,
-        coord=coord,
-        vmin=vmin,
-        vmax=vmax,
+    """Generate video of signal per volume (side-by-side with an axial slice).
+
+    The signal is taken from the shared `DwiSession` if it is in `products`,
+    otherwise from the "signal" product. Either is computed by streaming the
+    volumes. Frames are rendered by `iter_signal_frames` and written straight to a
+    `VideoWriter`, with the `encoder` profile.
+    """
+    products = products or ImageProducts(dwi)
+    if not out:
+        return
+
+    signal = products["dwi"].signal if "dwi" in products else products["signal"]
+    frames = iter_signal_frames(
+        dwi,
+        signal=signal,
+        coord=get_default_coord(dwi),
+        window=get_default_vmin_vmax(dwi, products=products),
         fontsize=fontsize,
+        panel_height=panel_height,
+        batch_size=batch_size,
     )
-    frame = noimg.annotate(frame, text="T=0", loc="upper right", size=fontsize)
-    im = ax1.imshow(frame, cmap="gray")
-    ax1.axis("off")
-
-    # Plot signal over time
-    ax2 = fig.add_subplot(gs[0, 1:])
-    ax2.plot(range(0, signal.shape[-1], 1), signal)
-    (dot,) = ax2.plot([], [], "ro")
-    ax2.set_xlim(0, signal.shape[-1] + 1)
-    ax2.set_ylim(0, np.max(signal) + 1)
-    ax2.set_xlabel("Volume")
-    ax2.set_ylabel("Signal")
-
-    def _update(t: int) -> None:
-        dot.set_data([t], [signal[t]])
-        frame = noimg.render_slice(
-            noimg.index_img(dwi, t),
+    with VideoWriter(out, fps=10, encoder=encoder) as writer:
+        for frame in frames:
+            writer.put(frame)
+
+
+def iter_signal_frames(
+    dwi: nib.Nifti1Image,
+    signal: np.ndarray,
+    coord: Coord,
+    window: tuple[float, float],
+    fontsize: int = 14,
+    panel_height: int | None = 256,
+    batch_size: int = 8,
+) -> Iterator[np.ndarray]:
+    """Generate uint8 RGB frames of an axial slice and the signal over time.
+
+    The signal trace is drawn once as a background. For each batch of `batch_size`
+    volumes, the axial slices are rendered together (see `render_slices`) and laid
+    out with the trace on a reused canvas, onto which the moving marker is drawn.
+    Frames are only valid until the next frame is generated.
+    """
+    vmin, vmax = window
+    layout: noimg.GridLayout | None = None
+    num_volumes = dwi.shape[-1]
+    for start in range(0, num_volumes, batch_size):
+        volumes = slice(start, min(start + batch_size, num_volumes))
+        panels = noimg.render_slices(
+            dwi,
             axis=2,
             coord=coord,
             vmin=vmin,
             vmax=vmax,
-            fontsize=fontsize,
-        )
-        frame = noimg.annotate(frame, text=f"T={t}", loc="upper right", size=fontsize)
-        im.set_data(frame)
+            height=panel_height,
+            volumes=volumes,
+        )[..., :3]
+
+        if layout is None:
+            height = panels.shape[1]
+            background, markers = _signal_trace(signal, size=(3 * height // 2, height))
+            layout = noimg.GridLayout([panels.shape[1:], background.shape])
+            canvas = layout.canvas()
+            top, left = layout.offsets[1][:2]
+            markers += (top, left)
+
+        for idx, panel in zip(range(volumes.start, volumes.stop), panels):
+            for text, loc in [
+                (f"T={idx}", "upper right"),
+                (f"Z={coord[2]:.0f}", "lower right"),
+                ("L", "lower left"),
+            ]:
+                noimg.blit_text(panel, text, loc=loc, size=fontsize)
+            frame = layout.paste([panel, background], out=canvas)
+            _draw_marker(frame, markers[idx])
+            yield frame
+
+
+def _signal_trace(
+    signal: np.ndarray, size: tuple[int, int], dpi: int = 100
+) -> tuple[np.ndarray, np.ndarray]:
+    """Draw a plot of the signal as a uint8 RGB array of `size` (width, height).
+
+    Also returns the (row, col) pixel position of each volume's signal in the plot.
+    """
+    fig = Figure(figsize=(size[0] / dpi, size[1] / dpi), dpi=dpi, layout="tight")
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.plot(range(0, signal.shape[-1], 1), signal)
+    ax.set_xlim(0, signal.shape[-1] + 1)
+    ax.set_ylim(0, np.max(signal) + 1)
+    ax.set_xlabel("Volume", fontsize="small")
+    ax.set_ylabel("Signal", fontsize="small")
+    ax.tick_params(labelsize="x-small")
+    ax.set_title("Average signal over time", fontsize="small")
+    canvas.draw()
+    background = np.asarray(canvas.buffer_rgba())[..., :3]
+
+    # Display coordinates are from the bottom left
+    points = ax.transData.transform(
+        np.column_stack([np.arange(signal.shape[-1]), signal])
+    )
+    rows = np.floor(background.shape[0] - points[:, 1])
 
-    fig.suptitle("Average signal over time")
+    # Note: Ensure size is even numbered for video codec.
+    height, width = (dim - dim % 2 for dim in background.shape[:2])
+    # The crop is from the bottom right, keep markers within the cropped plot
+    markers = np.column_stack(
+        [np.clip(rows, 0, height - 1), np.clip(np.floor(points[:, 0]), 0, width - 1)]
+    )
+    return background[:height, :width].copy(), markers.astype(int)
 
-    ani = FuncAnimation(fig, _update, frames=signal.shape[-1], interval=30)
 
-    if out:
-        ani.save(out, writer="ffmpeg", fps=10, dpi=150)
+def _draw_marker(
+    frame: np.ndarray,
+    center: np.ndarray,
+    radius: int = 4,
+    color: tuple[int, int, int] = (255, 0, 0),
+) -> None:
+    """Draw a filled circle marker onto an RGB frame in place."""
+    offsets = np.arange(-radius, radius + 1)
+    dy, dx = np.meshgrid(offsets, offsets, indexing="ij")
+    disk = dy**2 + dx**2 <= radius**2
+    rows, cols = center[0] + dy[disk], center[1] + dx[disk]
+    inside = (
+        (rows >= 0) & (rows < frame.shape[0]) & (cols >= 0) & (cols < frame.shape[1])
+    )
+    frame[rows[inside], cols[inside]] = color
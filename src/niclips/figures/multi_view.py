@@ -11,8 +11,9 @@ from PIL import Image
 import niclips.image as noimg
 from niclips.checks import check_3d, check_3d_4d, check_4d, check_ras
 from niclips.defaults import get_default_coord, get_default_vmin_vmax
-from niclips.io import VideoWriter
-from niclips.typing import Coord, NiftiLike, StrPath
+from niclips.io import EncoderLike, VideoWriter
+from niclips.products import ImageProducts
+from niclips.typing import Coord, NiftiLike, StrPath, Transparent
 
 
 def multi_view_frame(
@@ -30,9 +31,17 @@ def multi_view_frame(
     overlay_cmap: str | list[str] = ["turbo"],
     alpha: float = 0.5,
     fontsize: int = 14,
+    overlay_transparent: Transparent | None = None,
+    renderer: noimg.VolumeRenderer | None = None,
     **kwargs,
 ) -> Image.Image:
-    """Construct a multi view image panel. Returns a PIL Image."""
+    """Construct a multi view image panel. Returns a PIL Image.
+
+    Overlay voxels matching `overlay_transparent` ("nan" or "zero") are not drawn. A
+    prebuilt `renderer` of `img` can be passed, e.g. to share it across video frames,
+    in which case its window and colormap are used. Otherwise, each panel is
+    rendered by `render_slice`, which only reads the panel's plane.
+    """
     check_3d(img)
     check_ras(img)
 
@@ -43,28 +52,38 @@ def multi_view_frame(
             check_3d(ov)
             check_ras(ov)
 
-    vmin, vmax = get_default_vmin_vmax(img, vmin, vmax)
-    panels: list[Image.Image] = []
-    for coord, axis in zip(coords, axes):
-        panel = noimg.render_slice(
-            img,
-            axis=axis,
-            coord=coord,
-            vmin=vmin,
-            vmax=vmax,
-            height=panel_height,
-            cmap=cmap,
-            annotate=overlay is None,
-            fontsize=fontsize,
+    if renderer is None:
+        vmin, vmax = get_default_vmin_vmax(img, vmin, vmax)
+    if len(overlay_cmap) < len(overlay):
+        logging.warning(
+            "More overlays than overlay color maps- will use 'turbo'",
         )
+    panels: list[np.ndarray] = []
+    for coord, axis in zip(coords, axes):
+        if renderer is None:
+            panel = noimg.render_slice(
+                img,
+                axis=axis,
+                coord=coord,
+                vmin=vmin,
+                vmax=vmax,
+                height=panel_height,
+                cmap=cmap,
+                annotate=overlay is None,
+                fontsize=fontsize,
+            )
+        else:
+            panel = renderer.render(
+                axis=axis,
+                coord=coord,
+                height=panel_height,
+                annotate=overlay is None,
+                fontsize=fontsize,
+            )
 
-        if len(overlay) > 0:
-            if len(overlay_cmap) < len(overlay):
-                logging.warning(
-                    "More overlays than overlay color maps- will use 'turbo'",
-                )
-            for ov, ov_cmap in zip_longest(overlay, overlay_cmap):
-                panel_overlay = noimg.render_slice(
+        panel_overlays = [
+            np.asarray(
+                noimg.render_slice(
                     ov,
                     axis=axis,
                     coord=coord,
@@ -72,10 +91,13 @@ def multi_view_frame(
                     cmap=ov_cmap or "turbo",
                     annotate=False,
                     fontsize=fontsize,
+                    transparent=overlay_transparent,
                 )
-                panel = noimg.overlay(panel, panel_overlay, alpha)
-
-        panels.append(panel)
+            )
+            for ov, ov_cmap in zip_longest(overlay, overlay_cmap)
+            if ov is not None
+        ]
+        panels.append(noimg.composite(np.asarray(panel), panel_overlays, alpha))
 
     # Pad to equal height
     panels_list = noimg.pad_to_equal(panels, axis=0)
@@ -100,12 +122,24 @@ def three_view_frame(
     overlay_cmap: str | list[str] = ["turbo"],
     alpha: float = 0.5,
     fontsize: int = 14,
+    overlay_transparent: Transparent | None = None,
+    products: ImageProducts | None = None,
+    renderer: noimg.VolumeRenderer | None = None,
     **kwargs,
 ) -> Image.Image:
-    """Construct a three view image panel. Returns a PIL Image."""
+    """Construct a three view image panel. Returns a PIL Image.
+
+    Shared `products` of a 3D `img` are reused for the default window. A prebuilt
+    `renderer` of `img` (4D, if `img` is 4D) can be passed, e.g. to share it across
+    video frames, in which case its window and colormap are used.
+    """
     check_3d_4d(img)
     if img.ndim == 4:
+        if renderer is not None:
+            renderer = renderer.select(idx)
         img = noimg.index_img(img, idx=idx)
+        # Products describe the full image, not the indexed volume
+        products = None
     assert isinstance(img, nib.Nifti1Image)
 
     overlay = [overlay] if isinstance(overlay, nib.Nifti1Image) else (overlay or [])
@@ -117,6 +151,8 @@ def three_view_frame(
 
     if coord is None:
         coord = get_default_coord(img)
+    if renderer is None:
+        vmin, vmax = get_default_vmin_vmax(img, vmin, vmax, products=products)
 
     grid = multi_view_frame(
         img,
@@ -132,6 +168,8 @@ def three_view_frame(
         overlay_cmap=overlay_cmap,
         alpha=alpha,
         fontsize=fontsize,
+        overlay_transparent=overlay_transparent,
+        renderer=renderer,
     )
     return grid
 
@@ -147,24 +185,50 @@ def three_view_video(
     cmap: str = "gray",
     overlay_cmap: str | list[str] = ["turbo"],
     fontsize: int = 14,
+    overlay_transparent: Transparent | None = None,
+    products: ImageProducts | None = None,
+    batch_size: int = 8,
+    stream: bool | None = None,
+    encoder: EncoderLike = None,
     **kwargs,
 ) -> None:
-    """Save a three view panel video."""
+    """Save a three view panel video.
+
+    Without overlays, frames are rendered in batches of `batch_size` volumes, with
+    each view's plane extracted, windowed, resized and colormapped for the whole batch
+    at once. Only these planes are read, rather than quantizing every voxel with a
+    `VolumeRenderer`. Batches are laid out on a single reused canvas. With overlays,
+    frames are rendered one by one from a shared `VolumeRenderer`.
+
+    If `stream` is set (by default, for images large enough to be streamed, see
+    `niclips.image.should_stream`), volumes are read once, in order, in chunks of at
+    most `batch_size` volumes (and about `niclips.image.CHUNK_BYTES`), and all frames
+    are rendered from the chunk in memory. Memory then stays bounded by a chunk,
+    rather than the full image (or its quantized copy, with overlays). The default
+    window is then taken from the middle volume.
+
+    The video is encoded with the `encoder` profile (see `niclips.io.EncoderProfile`).
+    """
     check_4d(img)
+    check_ras(img)
 
     overlay = [overlay] if isinstance(overlay, nib.Nifti1Image) else (overlay or [])
     overlay_cmap = [overlay_cmap] if isinstance(overlay_cmap, str) else overlay_cmap
 
+    if stream is None:
+        stream = noimg.should_stream(img)
     if coord is None:
         coord = get_default_coord(img)
-    vmin, vmax = get_default_vmin_vmax(img, vmin, vmax)
+    if stream:
+        products = products or ImageProducts(img)
+    vmin, vmax = get_default_vmin_vmax(img, vmin, vmax, products=products)
 
-    with VideoWriter(out, fps=10) as writer:
-        for idx in range(img.shape[-1]):
-            frame = three_view_frame(
+    with VideoWriter(out, fps=10, encoder=encoder) as writer:
+        if stream:
+            _stream_three_view_frames(
+                writer,
                 img,
                 coord=coord,
-                idx=idx,
                 vmin=vmin,
                 vmax=vmax,
                 overlay=overlay,
@@ -172,9 +236,155 @@ def three_view_video(
                 cmap=cmap,
                 overlay_cmap=overlay_cmap,
                 fontsize=fontsize,
+                overlay_transparent=overlay_transparent,
+                batch_size=batch_size,
+            )
+            return
+
+        if len(overlay) > 0:
+            # Overlays are rendered frame by frame, from a shared renderer
+            renderer = noimg.VolumeRenderer(img, vmin=vmin, vmax=vmax, cmap=cmap)
+            for idx in range(img.shape[-1]):
+                frame = three_view_frame(
+                    img,
+                    coord=coord,
+                    idx=idx,
+                    overlay=overlay,
+                    panel_height=panel_height,
+                    overlay_cmap=overlay_cmap,
+                    fontsize=fontsize,
+                    overlay_transparent=overlay_transparent,
+                    renderer=renderer,
+                )
+                frame = noimg.annotate(
+                    frame,
+                    text=f"T={idx}",
+                    loc="upper right",
+                    size=fontsize,
+                    inplace=True,
+                )
+                writer.put(frame)
+            return
+
+        # Frames are written into one reused canvas, laid out on the first batch
+        canvas: _FrameCanvas | None = None
+        num_volumes = img.shape[-1]
+        for start in range(0, num_volumes, batch_size):
+            volumes = slice(start, min(start + batch_size, num_volumes))
+            panels = _render_three_view_panels(
+                img,
+                coord=coord,
+                vmin=vmin,
+                vmax=vmax,
+                panel_height=panel_height,
+                cmap=cmap,
+                volumes=volumes,
+            )
+            canvas = canvas or _FrameCanvas(panels, batch_size)
+            canvas.write(writer, panels, start=start, fontsize=fontsize)
+
+
+class _FrameCanvas:
+    """Reused canvas laying out batches of three view panels as video frames."""
+
+    def __init__(self, panels: list[np.ndarray], batch_size: int) -> None:
+        self.layout = noimg.GridLayout([panel.shape[1:] for panel in panels])
+        self.canvas = self.layout.canvas(batch_size)
+        # Frames are annotated in a reused RGB buffer, keeping the canvas clean
+        self.rgb = np.empty((*self.canvas.shape[1:3], 3), dtype=np.uint8)
+
+    def write(
+        self, writer: VideoWriter, panels: list[np.ndarray], start: int, fontsize: int
+    ) -> None:
+        """Lay out a batch of panels, annotate and write the frames."""
+        frames = self.layout.paste(panels, out=self.canvas[: len(panels[0])])
+        for idx, frame in enumerate(frames, start=start):
+            np.copyto(self.rgb, frame[..., :3])
+            noimg.blit_text(self.rgb, text=f"T={idx}", loc="upper right", size=fontsize)
+            writer.put(self.rgb)
+
+
+def _render_three_view_panels(
+    img: nib.Nifti1Image,
+    coord: Coord,
+    vmin: float,
+    vmax: float,
+    panel_height: int | None,
+    cmap: str,
+    volumes: slice = slice(None),
+) -> list[np.ndarray]:
+    """Render the axial, coronal and sagittal panels of a batch of volumes."""
+    return [
+        noimg.render_slices(
+            img,
+            # ax, cor, sag
+            axis=axis,
+            coord=coord,
+            vmin=vmin,
+            vmax=vmax,
+            height=panel_height,
+            cmap=cmap,
+            volumes=volumes,
+        )
+        for axis in [2, 1, 0]
+    ]
+
+
+def _stream_three_view_frames(
+    writer: VideoWriter,
+    img: nib.Nifti1Image,
+    coord: Coord,
+    vmin: float,
+    vmax: float,
+    overlay: list[nib.Nifti1Image],
+    panel_height: int | None,
+    cmap: str,
+    overlay_cmap: list[str],
+    fontsize: int,
+    overlay_transparent: Transparent | None,
+    batch_size: int,
+) -> None:
+    """Render three view frames from chunks of volumes, read once and in order."""
+    chunk_bytes = min(batch_size * noimg.volume_nbytes(img), noimg.CHUNK_BYTES)
+
+    canvas: _FrameCanvas | None = None
+    for volumes, data in noimg.iter_volumes(img, chunk_bytes=chunk_bytes):
+        chunk = nib.Nifti1Image(data, affine=img.affine, header=img.header)
+        if len(overlay) == 0:
+            panels = _render_three_view_panels(
+                chunk,
+                coord=coord,
+                vmin=vmin,
+                vmax=vmax,
+                panel_height=panel_height,
+                cmap=cmap,
+            )
+            canvas = canvas or _FrameCanvas(panels, batch_size)
+            canvas.write(writer, panels, start=volumes.start, fontsize=fontsize)
+            continue
+
+        renderer = noimg.VolumeRenderer(chunk, vmin=vmin, vmax=vmax, cmap=cmap)
+        for chunk_idx, idx in enumerate(range(volumes.start, volumes.stop)):
+            frame = three_view_frame(
+                chunk,
+                coord=coord,
+                idx=chunk_idx,
+                overlay=[
+                    noimg.index_img(ov, idx=idx) if ov.ndim == 4 else ov
+                    for ov in overlay
+                ],
+                panel_height=panel_height,
+                overlay_cmap=overlay_cmap,
+                fontsize=fontsize,
+                overlay_transparent=overlay_transparent,
+                renderer=renderer,
             )
             frame = noimg.annotate(
-                frame, text=f"T={idx}", loc="upper right", size=fontsize
+                frame,
+                text=f"T={idx}",
+                loc="upper right",
+                size=fontsize,
+                inplace=True,
             )
             writer.put(frame)
 
@@ -192,14 +402,26 @@ def slice_video(
     overlay_cmap: list[str] = ["brg"],
     fontsize: int = 14,
     alpha: float = 0.3,
+    overlay_transparent: Transparent | None = None,
+    products: ImageProducts | None = None,
+    encoder: EncoderLike = None,
     **kwargs,
 ) -> None:
-    """Save video scrolling through range of slices."""
+    """Save video scrolling through range of slices.
+
+    Shared `products` of a 3D `img` are reused for the default window and mask.
+    Overlay voxels matching `overlay_transparent` ("nan" or "zero") are not drawn.
+    The image and overlays are each windowed and quantized once by a
+    `VolumeRenderer`. The video is encoded with the `encoder` profile.
+    """
     check_3d_4d(img)
     if img.ndim == 4:
         img = noimg.index_img(img, idx=idx)
+        # Products describe the full image, not the indexed volume
+        products = None
     assert isinstance(img, nib.Nifti1Image)
     check_ras(img)
+    products = products or ImageProducts(img)
 
     overlay = [overlay] if isinstance(overlay, nib.Nifti1Image) else (overlay or [])
     if len(overlay) > 0:
@@ -209,48 +431,48 @@ def slice_video(
                 check_ras(ov)
                 overlay[ov_idx] = ov
 
-    vmin, vmax = get_default_vmin_vmax(img, vmin, vmax)
+    vmin, vmax = get_default_vmin_vmax(img, vmin, vmax, products=products)
 
     # Find range of slices that intersect with a rough mask
-    data = noimg.get_fdata(img)
-    mask = data > data.mean()
+    mask = products["mask"]
     other_axes = tuple([ii for ii in range(3) if ii != axis])
     indices = np.any(mask, axis=other_axes).nonzero()[0]
     start, stop = indices[0], indices[-1]
 
+    if len(overlay_cmap) < len(overlay):
+        logging.warning(
+            "More overlays than overlay color maps- will use 'brg'",
+        )
+
     # Initial coord
     coord: Coord = (0.0, 0.0, 0.0)
     ind = noimg.coord2ind(img.affine, coord)
 
-    with VideoWriter(out, fps=10) as writer:
+    renderer = noimg.VolumeRenderer(img, vmin=vmin, vmax=vmax, cmap=cmap)
+    overlay_renderers = [
+        noimg.VolumeRenderer(ov, cmap=ov_cmap or "brg", transparent=overlay_transparent)
+        for ov, ov_cmap in zip_longest(overlay, overlay_cmap)
+        if ov is not None
+    ]
+
+    with VideoWriter(out, fps=10, encoder=encoder) as writer:
         for idx in range(start, stop + 1):
             ind[axis] = idx
             coord = noimg.ind2coord(img.affine, ind)
 
-            frame = noimg.render_slice(
-                img,
-                axis=axis,
-                coord=coord,
-                vmin=vmin,
-                vmax=vmax,
-                height=panel_height,
-                cmap=cmap,
-                fontsize=fontsize,
+            frame = renderer.render(
+                axis=axis, coord=coord, height=panel_height, fontsize=fontsize
             )
 
             if len(overlay) > 0:
-                if len(overlay_cmap) < len(overlay):
-                    logging.warning(
-                        "More overlays than overlay color maps- will use 'brg'",
-                    )
-                for ov, ov_cmap in zip_longest(overlay, overlay_cmap):
-                    frame_overlay = noimg.render_slice(
-                        ov,
-                        axis=axis,
-                        coord=coord,
-                        cmap=ov_cmap or "brg",
-                        fontsize=fontsize,
+                frame_overlays = [
+                    np.asarray(
+                        ov_renderer.render(
+                            axis=axis, coord=coord, height=panel_height, annotate=False
+                        )
                     )
-                    frame = noimg.overlay(frame, frame_overlay, alpha=alpha)
+                    for ov_renderer in overlay_renderers
+                ]
+                frame = noimg.composite(np.asarray(frame), frame_overlays, alpha)
 
             writer.put(frame)
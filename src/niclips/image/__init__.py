@@ -1,19 +1,43 @@
 """Image processing utilities."""
 
-from ._annotate import annotate
+from ._annotate import annotate, blit_text
 from ._centroid import center_of_mass, peak_of_mass
 from ._convert import (
+    LUT_DEPTH,
+    colormap,
+    composite,
     get_fdata,
+    get_fdata_slice,
+    get_lut,
+    lookup,
     normalize,
     overlay,
+    quantize,
     reorient,
     scale,
     to_ras,
     topil,
 )
 from ._coord import apply_affine, coord2ind, ind2coord
+from ._orient import ReorientedArray, as_closest_ras, ras_header, reorient_img
 from ._pad import Align, pad_to_equal, pad_to_size, pad_to_square
-from ._render import render_slice
-from ._slice import crop_middle_third, index_img, slice_volume
-from ._stack import image_grid, stack_images
+from ._render import VolumeRenderer, render_slice, render_slices
+from ._resample import panel_size, resize_stack
+from ._slice import (
+    VolumeSubset,
+    crop_middle_third,
+    index_img,
+    slice_volume,
+    take_volumes,
+)
+from ._stack import GridLayout, image_grid, stack_frames, stack_images
+from ._stream import (
+    CHUNK_BYTES,
+    STREAM_BYTES,
+    VolumeStats,
+    iter_volumes,
+    should_stream,
+    volume_nbytes,
+    volume_stats,
+)
 from ._window import Window, center_minmax, minmax
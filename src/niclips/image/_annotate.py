@@ -1,8 +1,17 @@
+import math
 from functools import lru_cache
 from importlib import resources
+from typing import cast
 
 import numpy as np
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+_ANCHORS = {
+    "upper left": "lt",
+    "upper right": "rt",
+    "lower left": "lb",
+    "lower right": "rb",
+}
 
 
 def annotate(
@@ -17,33 +26,87 @@ def annotate(
 
     Locations follow the convention from pyplot, e.g. "upper left", "lower right".
     However, only a subset of locations are currently implemented.
+
+    Text is rasterized once per (text, size, location) and cached, then pasted with
+    the cached mask.
     """
     if isinstance(img, np.ndarray):
         img = Image.fromarray(img)
     assert isinstance(img, Image.Image)
 
-    offset = 2
-    if loc == "upper left":
-        xy = offset, offset
-        anchor = "lt"
-    elif loc == "upper right":
-        xy = img.width - offset, offset
-        anchor = "rt"
-    elif loc == "lower left":
-        xy = offset, img.height - offset
-        anchor = "lb"
-    elif loc == "lower right":
-        xy = img.width - offset, img.height - offset
-        anchor = "rb"
+    x, y, mask = _get_label(
+        text, loc=loc, size=size, width=img.width, height=img.height
+    )
+    if not inplace:
+        img = img.copy()
+    img.paste(fill, (x, y), mask=mask)
+    return img
+
+
+def blit_text(
+    img: np.ndarray,
+    text: str,
+    loc: str,
+    size: int = 10,
+    fill: str = "white",
+) -> np.ndarray:
+    """Annotate an image array with text in place, without converting to PIL.
+
+    Same rendering as `annotate`. For arrays with an alpha channel, only the color
+    channels are drawn on. Returns the annotated array.
+    """
+    height, width = img.shape[:2]
+    x, y, mask = _get_label(text, loc=loc, size=size, width=width, height=height)
+    alpha = np.asarray(mask)
+
+    # Clip label to the image
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + alpha.shape[1], width), min(y + alpha.shape[0], height)
+    if x0 >= x1 or y0 >= y1:
+        return img
+    alpha = alpha[y0 - y : y1 - y, x0 - x : x1 - x].astype(np.uint32)
+
+    if img.ndim == 2:
+        region = img[y0:y1, x0:x1]
+        # Colors are single ints in "L" mode
+        color = np.uint32(cast(int, ImageColor.getcolor(fill, "L")))
     else:
+        channels = min(img.shape[2], 3)
+        region = img[y0:y1, x0:x1, :channels]
+        color = np.asarray(ImageColor.getrgb(fill)[:channels], dtype=np.uint32)
+        alpha = alpha[..., None]
+    # Same rounding as PIL's masked paste
+    region[...] = (region * (255 - alpha) + color * alpha + 127) // 255
+    return img
+
+
+def _get_label(
+    text: str, loc: str, size: int, width: int, height: int
+) -> tuple[int, int, Image.Image]:
+    """Get the position and cached alpha mask of a label within an image."""
+    try:
+        anchor = _ANCHORS[loc]
+    except KeyError:
         raise ValueError(f"Unsupported loc {loc}")
 
-    if not inplace:
-        img = img.copy()
-    draw = ImageDraw.Draw(img)
+    offset = 2
+    x = width - offset if anchor[0] == "r" else offset
+    y = height - offset if anchor[1] == "b" else offset
+    left, top, mask = _render_label(text, anchor=anchor, size=size)
+    return x + left, y + top, mask
+
+
+@lru_cache(maxsize=4096)
+def _render_label(text: str, anchor: str, size: int) -> tuple[int, int, Image.Image]:
+    """Rasterize a label to an alpha mask, offset from its anchor point."""
     font = _get_font(size=size)
-    draw.text(xy, text, fill=fill, font=font, anchor=anchor)
-    return img
+    bbox = font.getbbox(text, anchor=anchor)
+    # Whole pixels covering the text's bounding box
+    left, top = math.floor(bbox[0]), math.floor(bbox[1])
+    right, bottom = math.ceil(bbox[2]), math.ceil(bbox[3])
+    mask = Image.new("L", (max(right - left, 1), max(bottom - top, 1)))
+    ImageDraw.Draw(mask).text((-left, -top), text, fill=255, font=font, anchor=anchor)
+    return left, top, mask
 
 
 @lru_cache
@@ -16,7 +16,7 @@ def center_of_mass(img: NiftiLike, mask: bool = False) -> np.ndarray:
     if img.ndim == 4:
         img = index_img(img, idx=None)
     data = get_fdata(img)
-    data = np.maximum(data, 0.0)
+    data = np.maximum(data, 0)
 
     # Find the center wrt a rough mask mask not the raw values
     if mask:
@@ -42,7 +42,7 @@ def peak_of_mass(img: NiftiLike, mask: bool = False) -> np.ndarray:
     if img.ndim == 4:
         img = index_img(img, idx=None)
     data = get_fdata(img)
-    data = np.maximum(data, 0.0)
+    data = np.maximum(data, 0)
 
     # Find the peak wrt a rough mask mask not the raw values
     if mask:
@@ -1,56 +1,174 @@
 import logging
+from collections.abc import Sequence
+from functools import lru_cache
+from types import EllipsisType
 
 import matplotlib as mpl
 import nibabel as nib
 import numpy as np
 from PIL import Image
 
+from niclips.precision import get_data_dtype
 from niclips.typing import NiftiLike
 
+from ._orient import as_closest_ras
+
 EPS = 1e-8
+# Number of colormap lookup table entries
+LUT_DEPTH = 256
 
 
 def get_fdata(img: NiftiLike) -> np.ndarray:
-    """Get the array data of a nifti-like image."""
+    """Get the array data of a nifti-like image.
+
+    Nifti image data is in the data type of the global precision (see
+    `niclips.precision`). Floating point data is cached by the image. At "native"
+    precision, integer data is the image's array (or read from its data proxy).
+    """
     if isinstance(img, nib.nifti1.Nifti1Image):
-        img = img.get_fdata()
+        dtype = get_data_dtype(img)
+        if dtype.kind == "f":
+            img = img.get_fdata(dtype=dtype)
+        else:
+            img = np.asanyarray(img.dataobj)
     return img
 
 
+def get_fdata_slice(
+    img: NiftiLike, slicer: tuple[int | slice | EllipsisType, ...]
+) -> np.ndarray:
+    """Get a sub-array of a nifti-like image.
+
+    Images whose data is not yet in memory (e.g. loaded with a lazy reader such as
+    "nibabel-mmap") are sliced through their data proxy, so that only the requested
+    planes or volumes are read and decoded. Likewise, in-memory arrays without a
+    cached floating point copy are sliced before conversion, without caching one.
+    """
+    if isinstance(img, nib.nifti1.Nifti1Image):
+        if getattr(img, "_fdata_cache", None) is not None:
+            return get_fdata(img)[slicer]
+        return np.asarray(img.dataobj[slicer], dtype=get_data_dtype(img))
+    return img[slicer]
+
+
 def topil(
     data: np.ndarray,
     vmin: float | None = None,
     vmax: float | None = None,
     cmap: str = "gray",
+    depth: int = LUT_DEPTH,
+    mode: str = "RGB",
 ) -> Image.Image:
-    """Convert a numpy array to a PIL image."""
+    """Convert a numpy array to a PIL image.
+
+    2D arrays are colormapped to an "RGB" image, or an "RGBA" image with NaNs
+    transparent if `mode` is "RGBA".
+    """
     if isinstance(data, Image.Image):
         return data
 
     # Assume that 2d arrays need to be normalized and colormapped
     if data.ndim == 2:
         data = normalize(data, vmin=vmin, vmax=vmax)
-        data = mpl.colormaps[cmap](data)
+        data = colormap(data, cmap=cmap, depth=depth)
+        if mode == "RGBA":
+            return Image.fromarray(data)
         # RGBA -> RGB
-        data = data[..., :3]
-        data = (255 * data).astype("uint8")
+        height, width = data.shape[:2]
+        return Image.frombytes("RGB", (width, height), data, "raw", "RGBX")
 
     img = Image.fromarray(data)
     return img
 
 
+def colormap(
+    data: np.ndarray, cmap: str = "gray", depth: int = LUT_DEPTH
+) -> np.ndarray:
+    """Colormap normalized data by lookup, returning uint8 RGBA with a trailing axis.
+
+    Data in [0, 1] is quantized to `depth` levels, which index the colormap's cached
+    lookup table. NaNs are mapped to the colormap's "bad" color.
+    """
+    return lookup(quantize(data, depth=depth), cmap=cmap, depth=depth)
+
+
+def quantize(data: np.ndarray, depth: int = LUT_DEPTH) -> np.ndarray:
+    """Quantize normalized data in [0, 1] to `depth` colormap indices.
+
+    NaNs are mapped to index `depth`, the "bad" color. Indices are uint8 if they fit,
+    otherwise uint16.
+    """
+    scaled = np.multiply(data, depth, dtype=np.result_type(data, np.float32))
+    np.clip(scaled, 0, depth - 1, out=scaled)
+    bad = np.isnan(scaled)
+    max_index = depth - 1
+    if bad.any():
+        scaled[bad] = max_index = depth
+    index_dtype = np.uint8 if max_index < 256 else np.uint16
+    return scaled.astype(index_dtype)
+
+
+def lookup(
+    indices: np.ndarray, cmap: str = "gray", depth: int = LUT_DEPTH
+) -> np.ndarray:
+    """Look up colormap indices, returning uint8 RGBA with a trailing axis."""
+    lut = get_lut(cmap, depth=depth)
+    # RGBA bytes are packed as uint32, so lookup copies one element per pixel
+    packed = np.take(lut, indices)
+    return packed.view(np.uint8).reshape(packed.shape + (4,))
+
+
+@lru_cache
+def get_lut(cmap: str, depth: int = LUT_DEPTH) -> np.ndarray:
+    """Get a colormap lookup table of `depth` colors, plus the "bad" (NaN) color.
+
+    Colors are uint8 RGBA packed into uint32, e.g. for use with `np.take`.
+    """
+    colors = mpl.colormaps[cmap]
+    if colors.N != depth:
+        colors = colors.resampled(depth)
+    lut = np.concatenate(
+        [colors(np.arange(depth), bytes=True), colors([np.nan], bytes=True)]
+    )
+    return np.ascontiguousarray(lut).view(np.uint32).ravel()
+
+
 def overlay(
     img1: Image.Image,
     img2: Image.Image,
     alpha: float | None = 0.5,
 ) -> Image.Image:
     """Overlay two PIL images with alpha compositing."""
-    img1 = img1.convert("RGBA")
-    img2 = img2.convert("RGBA")
+    img1_arr = np.asarray(img1.convert("RGBA"))
+    img2_arr = np.asarray(img2.convert("RGBA"))
+    img = composite(img1_arr, [img2_arr], alpha=alpha)
+    return Image.fromarray(img)
 
-    if alpha:
-        img2.putalpha(int(alpha * 255))
-    img = Image.alpha_composite(img1, img2)
+
+def composite(
+    base: np.ndarray,
+    overlays: Sequence[np.ndarray],
+    alpha: float | Sequence[float] | None = 0.5,
+) -> np.ndarray:
+    """Alpha composite uint8 overlays, shape (H, W, 3 or 4), onto a base image.
+
+    Overlays are blended in order with opacity `alpha` (per overlay if a sequence; 1
+    if `None`), times their own alpha channel if they have one (e.g. transparent
+    background). All overlays are accumulated into a single float buffer. The base
+    alpha channel, if any, is kept.
+    """
+    if not isinstance(alpha, Sequence):
+        alpha = len(overlays) * [alpha]
+
+    out = base[..., :3].astype(np.float32)
+    for ov, ov_alpha in zip(overlays, alpha):
+        weight: float | np.ndarray = 1.0 if ov_alpha is None else ov_alpha
+        if ov.shape[-1] == 4:
+            weight = ov[..., 3:] * np.float32(weight / 255)
+        out += (ov[..., :3] - out) * weight
+
+    img = base.copy()
+    img[..., :3] = out + 0.5
     return img
 
 
@@ -65,7 +183,8 @@ def normalize(
     scale = vmax - vmin
     if scale > EPS:
         return np.clip((data - vmin) / scale, 0, 1)
-    return np.zeros_like(data)
+    # Keep NaNs, e.g. transparent overlay voxels
+    return np.where(np.isnan(data), data, 0)
 
 
 def scale(
@@ -114,11 +233,15 @@ def reorient(img: np.ndarray) -> np.ndarray:
 
 
 def to_ras(img: nib.nifti1.Nifti1Image) -> nib.nifti1.Nifti1Image:
-    """Convert a nifti image to RAS orientation with isotropic resolution."""
+    """Convert a nifti image to RAS orientation.
+
+    No data is copied: the voxel axes are permuted and flipped as array views, or
+    lazily for data proxies (see `as_closest_ras`).
+    """
     # Grab original filepath
     img_path = img.get_filename()
     # Reorient to RAS
-    img = nib.funcs.as_closest_canonical(img)
+    img = as_closest_ras(img)
 
     # Set filepath to original incase it is needed
     if img_path:
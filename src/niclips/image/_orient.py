@@ -0,0 +1,115 @@
+import nibabel as nib
+import numpy as np
+from nibabel.arrayproxy import ArrayLike
+from nibabel.fileslice import canonical_slicers
+from nibabel.orientations import apply_orientation, inv_ornt_aff, io_orientation
+
+
+class ReorientedArray:
+    """Lazy array of a data object with its voxel axes permuted and flipped.
+
+    Behaves like a nibabel data proxy: indexing maps the requested slices back to
+    native voxel space, reads only those from the underlying data object (e.g. an
+    `ArrayProxy`), and permutes the axes of the result. Nothing is read until
+    indexed.
+
+    `ornt` is a nibabel orientation array, as from `io_orientation`.
+    """
+
+    def __init__(self, dataobj: ArrayLike, ornt: np.ndarray) -> None:
+        self.dataobj = dataobj
+        self.ornt = np.asarray(ornt, dtype=int)
+        ndim = len(dataobj.shape)
+        # Output axis j is native axis perm[j], extra (e.g. time) axes are kept
+        self.perm = tuple(np.argsort(self.ornt[:, 0])) + tuple(range(3, ndim))
+        self.flips = tuple(self.ornt[:, 1] == -1) + (ndim - 3) * (False,)
+        self.shape = tuple(dataobj.shape[axis] for axis in self.perm)
+        self.ndim = ndim
+        self.dtype = proxy_dtype(dataobj)
+
+    @property
+    def is_proxy(self) -> bool:
+        """Mark as a data proxy, so that images backed by it are not in memory."""
+        return True
+
+    def __array__(
+        self, dtype: np.dtype | None = None, copy: bool | None = None
+    ) -> np.ndarray:
+        return np.asarray(self[...], dtype=dtype)
+
+    def __getitem__(self, slicer: object) -> np.ndarray:
+        slicer = canonical_slicers(slicer, self.shape)
+        if len(slicer) != self.ndim:
+            raise IndexError("New axes are not supported by reoriented arrays")
+
+        native: list[int | slice] = [slice(None)] * self.ndim
+        for idx, axis in zip(slicer, self.perm):
+            size = self.dataobj.shape[axis]
+            native[axis] = _flip_index(idx, size) if self.flips[axis] else idx
+        data = np.asarray(self.dataobj[tuple(native)])
+
+        # Remaining axes are in native order, permute them to output order
+        kept = [axis for idx, axis in zip(slicer, self.perm) if isinstance(idx, slice)]
+        return data.transpose(np.argsort(np.argsort(kept)))
+
+
+def proxy_dtype(dataobj: ArrayLike) -> np.dtype:
+    """Data type of a data object, as read (scaled data is read as floating point)."""
+    # As by `get_data_dtype`; data objects are ndarrays or proxies with a dtype
+    scaled = getattr(dataobj, "slope", 1.0) != 1.0 or getattr(dataobj, "inter", 0.0)
+    return np.dtype(np.float32) if scaled else np.dtype(getattr(dataobj, "dtype"))
+
+
+def _flip_index(idx: int | slice, size: int) -> int | slice:
+    """Map an index of a flipped axis of `size` to the same elements unflipped."""
+    if isinstance(idx, slice):
+        start, stop, step = idx.indices(size)
+        start, stop = size - 1 - start, size - 1 - stop
+        return slice(start, stop if stop >= 0 else None, -step)
+    return size - 1 - idx
+
+
+def reorient_img(img: nib.Nifti1Image, ornt: np.ndarray) -> nib.Nifti1Image:
+    """Reorient a nifti image without copying its data, as `img.as_reoriented`.
+
+    In-memory arrays are reoriented as (zero-copy) transposed and flipped views,
+    other data objects are wrapped in a lazy `ReorientedArray`.
+    """
+    if isinstance(img.dataobj, np.ndarray):
+        dataobj = apply_orientation(img.dataobj, ornt)
+    else:
+        dataobj = ReorientedArray(img.dataobj, ornt)
+    affine = img.affine.dot(inv_ornt_aff(ornt, img.shape))
+    reoriented = nib.Nifti1Image(dataobj, affine=affine, header=img.header)
+
+    # Also apply the transform to the dim_info fields
+    new_dim = [
+        None if orig_dim is None else int(ornt[orig_dim, 0])
+        for orig_dim in img.header.get_dim_info()
+    ]
+    reoriented.header.set_dim_info(*new_dim)
+    return reoriented
+
+
+def as_closest_ras(img: nib.Nifti1Image) -> nib.Nifti1Image:
+    """Reorient a nifti image to the closest RAS orientation, without copying.
+
+    Lazy counterpart of `nib.funcs.as_closest_canonical`. Images already in RAS
+    orientation are returned as is.
+    """
+    ornt = io_orientation(img.affine)
+    if np.array_equal(ornt, [[0, 1], [1, 1], [2, 1]]):
+        return img
+    return reorient_img(img, ornt)
+
+
+def ras_header(header: nib.Nifti1Header) -> nib.Nifti1Header:
+    """Header of an image as reoriented by `as_closest_ras`, without its voxel data.
+
+    Lets an image be planned from its header alone (e.g. as loaded by
+    `niclips.io.load_nifti_header`) the way it will look once loaded and reoriented.
+    """
+    # Stand-in data of the header's shape, broadcast from a single element
+    dataobj = np.broadcast_to(np.zeros((), dtype=np.uint8), header.get_data_shape())
+    img = nib.Nifti1Image(dataobj, affine=header.get_best_affine(), header=header)
+    return as_closest_ras(img).header
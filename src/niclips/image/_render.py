@@ -1,10 +1,32 @@
+import copy
+
 import nibabel as nib
+import numpy as np
 from PIL import Image
 
-from ..typing import Coord
+from niclips.checks import check_3d_4d
+
+from ..typing import Coord, Transparent
 from ._annotate import annotate as draw_annotation
-from ._convert import reorient, scale, to_iso, topil
-from ._slice import slice_volume
+from ._convert import (
+    EPS,
+    LUT_DEPTH,
+    colormap,
+    get_fdata,
+    get_fdata_slice,
+    lookup,
+    normalize,
+    quantize,
+    reorient,
+    topil,
+)
+from ._coord import apply_affine, coord2ind
+from ._resample import panel_size, resize_stack
+from ._slice import plane_index, slice_volume
+from ._window import Window, minmax
+
+# Downsampling by more than this factor first reduces by integer block averaging
+REDUCING_GAP = 3.0
 
 
 def render_slice(
@@ -18,27 +40,231 @@ def render_slice(
     cmap: str = "gray",
     annotate: bool = True,
     fontsize: int = 14,
+    transparent: Transparent | None = None,
 ) -> Image.Image:
-    """Render one slice of a volume as a PIL image."""
+    """Render one slice of a volume as a PIL image.
+
+    The slice is resampled once, directly to isotropic pixels at the target `height`.
+    If `transparent` is given, an "RGBA" image is rendered with NaN (and zero, if
+    "zero") voxels transparent, e.g. for label overlays.
+    """
     frame = slice_volume(img, coord=coord, axis=axis)
     frame = reorient(frame)
-    frame = topil(frame, vmin=vmin, vmax=vmax, cmap=cmap)
-    frame = to_iso(
-        frame, pixdims=img.header["pixdim"][1:4], axis=axis, resample=resample
+    if transparent == "zero":
+        frame = np.where(frame == 0, np.nan, frame)
+    frame = topil(
+        frame, vmin=vmin, vmax=vmax, cmap=cmap, mode="RGBA" if transparent else "RGB"
     )
-    if height:
-        # Get pixel dimensions of slice
-        frame = scale(frame, target_height=height, resample=resample)
+    size = panel_size(frame.size, _pixdims(img), axis=axis, height=height)
+    if size != frame.size:
+        frame = frame.resize(size, resample=resample, reducing_gap=REDUCING_GAP)
 
-    # Annotation for coordinate and left side
     if annotate:
-        axis_name = "XYZ"[axis]
-        label = f"{axis_name}={coord[axis]:.0f}"
-        frame = draw_annotation(
-            frame, text=label, loc="lower right", size=fontsize, inplace=True
-        )
-        if axis_name in {"Y", "Z"}:
-            frame = draw_annotation(
-                frame, text="L", loc="lower left", size=fontsize, inplace=True
-            )
+        _annotate_panel(frame, axis=axis, coord=coord, fontsize=fontsize)
     return frame
+
+
+def render_slices(
+    img: nib.Nifti1Image,
+    axis: int,
+    coord: Coord,
+    vmin: float | None = None,
+    vmax: float | None = None,
+    height: int | None = 256,
+    cmap: str = "gray",
+    volumes: slice = slice(None),
+) -> np.ndarray:
+    """Render one slice of each volume of a 4D image as a uint8 frame stack.
+
+    Batched counterpart of `render_slice` (without annotation) for videos. The plane
+    is extracted for all `volumes` at once, and the whole stack is windowed, resized
+    and colormapped together. Returns an opaque RGBA array of shape (T, H, W, 4). If
+    `vmin` or `vmax` is not given, the min/max over the whole stack is used.
+    """
+    ind = coord2ind(img.affine, coord)
+    slicer = axis * (slice(None),) + (plane_index(ind[axis], img.shape[axis]),)
+    slicer += (2 - axis) * (slice(None),) + (volumes,)
+    planes = get_fdata_slice(img, slicer)
+
+    # (X, Y, T) -> (T, I, J), as in `reorient`
+    planes = np.moveaxis(planes, -1, 0).swapaxes(1, 2)[:, ::-1]
+    planes = normalize(planes, vmin=vmin, vmax=vmax)
+
+    size = panel_size(
+        (planes.shape[2], planes.shape[1]), _pixdims(img), axis=axis, height=height
+    )
+    # Resample the normalized intensities, then colormap. NaNs would spread through
+    # the resampling, so the "bad" mask is resampled separately.
+    bad = np.isnan(planes)
+    if not bad.any():
+        return colormap(resize_stack(planes, size), cmap=cmap)
+    planes = resize_stack(np.where(bad, 0, planes), size)
+    planes[resize_stack(bad, size) >= 0.5] = np.nan
+    return colormap(planes, cmap=cmap)
+
+
+class VolumeRenderer:
+    """Renderer of slices from a pre-windowed, quantized copy of a 3D or 4D volume.
+
+    The volume is windowed with `vmin`/`vmax` and quantized to colormap indices once,
+    giving a uint8 copy of the data (uint16 if there are NaN, i.e. "bad", voxels).
+    Slices are then served by indexing, lookup and a single resize, as in
+    `render_slice` and `render_slices` (to within one colormap level). Unlike
+    `render_slice`, the default window is the min/max over the whole volume.
+
+    If `transparent` is given, NaN (and zero, if "zero") voxels are rendered
+    transparent, e.g. for label overlays.
+    """
+
+    def __init__(
+        self,
+        img: nib.Nifti1Image,
+        vmin: float | None = None,
+        vmax: float | None = None,
+        cmap: str = "gray",
+        transparent: Transparent | None = None,
+        depth: int = LUT_DEPTH,
+    ) -> None:
+        check_3d_4d(img)
+        if vmin is None or vmax is None:
+            data = get_fdata(img)
+            if transparent == "zero":
+                data = np.where(data == 0, np.nan, data)
+            data_vmin, data_vmax = minmax(data)
+            vmin = data_vmin if vmin is None else vmin
+            vmax = data_vmax if vmax is None else vmax
+        self.window = Window(vmin, vmax)
+        self.cmap = cmap
+        self.transparent = transparent
+        self.depth = depth
+        self.inv_affine = np.linalg.inv(img.affine)
+        self.pixdims = _pixdims(img)
+        self.data = self._quantize(img)
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        return self.data.shape
+
+    @property
+    def ndim(self) -> int:
+        return self.data.ndim
+
+    def select(self, idx: int | None = 0) -> "VolumeRenderer":
+        """Get a renderer of one volume of a 4D renderer, sharing its data.
+
+        If `idx` is `None`, the middle volume is selected.
+        """
+        assert self.ndim == 4, "Expected 4d renderer"
+        if idx is None:
+            idx = self.shape[-1] // 2
+        renderer = copy.copy(self)
+        renderer.data = self.data[..., idx]
+        return renderer
+
+    def get_slice(
+        self, axis: int, coord: Coord, volumes: int | slice | None = 0
+    ) -> np.ndarray:
+        """Get the colormap indices of a slice, reoriented to image axes.
+
+        For 4D volumes, the slice of volume (or `slice` of volumes) `volumes` is
+        returned, with shape (T, H, W) for a slice. If `None`, the middle volume.
+        """
+        ind = apply_affine(self.inv_affine, np.asarray(coord)).astype(np.int32)
+        slicer = axis * (slice(None),) + (plane_index(ind[axis], self.shape[axis]),)
+        if self.ndim == 3:
+            return reorient(self.data[slicer])
+
+        if volumes is None:
+            volumes = self.shape[-1] // 2
+        slicer += (2 - axis) * (slice(None),) + (volumes,)
+        planes = self.data[slicer]
+        if isinstance(volumes, slice):
+            # (X, Y, T) -> (T, I, J), as in `reorient`
+            return np.moveaxis(planes, -1, 0).swapaxes(1, 2)[:, ::-1]
+        return reorient(planes)
+
+    def render(
+        self,
+        axis: int,
+        coord: Coord,
+        volume: int | None = 0,
+        height: int | None = 256,
+        resample: Image.Resampling | None = None,
+        annotate: bool = True,
+        fontsize: int = 14,
+    ) -> Image.Image:
+        """Render one slice as a PIL image, as in `render_slice`."""
+        frame = lookup(
+            self.get_slice(axis, coord, volumes=volume), self.cmap, self.depth
+        )
+        if self.transparent:
+            img = Image.fromarray(frame)
+        else:
+            # RGBA -> RGB
+            img = Image.frombytes("RGB", frame.shape[1::-1], frame, "raw", "RGBX")
+
+        size = panel_size(img.size, self.pixdims, axis=axis, height=height)
+        if size != img.size:
+            img = img.resize(size, resample=resample, reducing_gap=REDUCING_GAP)
+        if annotate:
+            _annotate_panel(img, axis=axis, coord=coord, fontsize=fontsize)
+        return img
+
+    def render_stack(
+        self,
+        axis: int,
+        coord: Coord,
+        volumes: slice = slice(None),
+        height: int | None = 256,
+    ) -> np.ndarray:
+        """Render one slice of each of `volumes` as an RGBA stack (T, H, W, 4).
+
+        As in `render_slices`, the stack is resized as a whole. The colormap indices
+        are resampled and rounded back to the nearest index.
+        """
+        planes = self.get_slice(axis, coord, volumes=volumes)
+        size = panel_size(
+            (planes.shape[2], planes.shape[1]), self.pixdims, axis=axis, height=height
+        )
+        bad = planes == self.depth
+        indices = resize_stack(np.where(bad, 0, planes), size)
+        np.clip(indices + 0.5, 0, self.depth - 1, out=indices)
+        indices = indices.astype(planes.dtype)
+        if bad.any():
+            indices[resize_stack(bad, size) >= 0.5] = self.depth
+        return lookup(indices, self.cmap, self.depth)
+
+    def _quantize(self, img: nib.Nifti1Image) -> np.ndarray:
+        """Window and quantize the image data, volume by volume if 4D."""
+        if img.ndim == 3:
+            return self._quantize_volume(get_fdata(img))
+
+        # Volumes are stored contiguously, as on disk
+        data = np.empty(img.shape, dtype=np.uint8, order="F")
+        for idx in range(img.shape[3]):
+            volume = self._quantize_volume(get_fdata_slice(img, (..., idx)))
+            if volume.dtype != data.dtype:
+                data = data.astype(volume.dtype, order="F")
+            data[..., idx] = volume
+        return data
+
+    def _quantize_volume(self, values: np.ndarray) -> np.ndarray:
+        vmin, vmax = self.window
+        volume = np.subtract(values, vmin, dtype=np.float32)
+        if self.transparent == "zero":
+            volume[values == 0] = np.nan
+        volume *= 1.0 / (vmax - vmin) if vmax - vmin > EPS else 0.0
+        return quantize(volume, depth=self.depth)
+
+
+def _annotate_panel(frame: Image.Image, axis: int, coord: Coord, fontsize: int) -> None:
+    """Annotate a panel with its coordinate and left side."""
+    axis_name = "XYZ"[axis]
+    label = f"{axis_name}={coord[axis]:.0f}"
+    draw_annotation(frame, text=label, loc="lower right", size=fontsize, inplace=True)
+    if axis_name in {"Y", "Z"}:
+        draw_annotation(frame, text="L", loc="lower left", size=fontsize, inplace=True)
+
+
+def _pixdims(img: nib.Nifti1Image) -> tuple[float, ...]:
+    return tuple(float(pixdim) for pixdim in img.header["pixdim"][1:4])
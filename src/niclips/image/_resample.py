@@ -0,0 +1,70 @@
+import logging
+from functools import lru_cache
+
+import numpy as np
+
+
+@lru_cache
+def panel_size(
+    size: tuple[int, int],
+    pixdims: tuple[float, ...],
+    axis: int,
+    height: int | None = None,
+) -> tuple[int, int]:
+    """Get the (width, height) of a rendered slice panel.
+
+    Matches resizing a slice of `size` (width, height) to isotropic pixels with
+    `to_iso` and then to the target `height` with `scale`. The geometry is cached, so
+    it is computed once for all frames of a video.
+    """
+    target_scales = np.asarray(pixdims, dtype=float) / np.min(pixdims)
+    target_scales = target_scales[[ii for ii in range(3) if ii != axis]]
+    width, cur_height = int(size[0] * target_scales[0]), int(size[1] * target_scales[1])
+    if height:
+        # Note: Ensure size is even numbered for video codec.
+        if height % 2:
+            height += 1
+            logging.warning(f"Scaling target height to {height}")
+        width = int(height / cur_height * width)
+        width += width % 2
+        cur_height = height
+    return width, cur_height
+
+
+def resize_stack(data: np.ndarray, size: tuple[int, int]) -> np.ndarray:
+    """Resize a stack of 2D frames, shape (..., H, W), to `size` (width, height).
+
+    Uses separable bicubic interpolation (antialiased when downsampling, like PIL), so
+    the whole stack is resized with two matrix products.
+    """
+    width, height = size
+    data = np.asarray(data, dtype=np.float32)
+    weights_y = _bicubic_weights(data.shape[-2], height)
+    weights_x = _bicubic_weights(data.shape[-1], width)
+    return weights_y @ data @ weights_x.T
+
+
+@lru_cache
+def _bicubic_weights(in_size: int, out_size: int) -> np.ndarray:
+    """Bicubic resampling matrix, shape (out_size, in_size)."""
+    scale = in_size / out_size
+    filterscale = max(scale, 1.0)
+    support = 2.0 * filterscale
+
+    center = (np.arange(out_size) + 0.5) * scale
+    xmin = np.maximum((center - support + 0.5).astype(int), 0)
+    xmax = np.minimum((center + support + 0.5).astype(int), in_size)
+    x = np.arange(in_size)
+    weights = _bicubic((x[None, :] - center[:, None] + 0.5) / filterscale)
+    weights[(x[None, :] < xmin[:, None]) | (x[None, :] >= xmax[:, None])] = 0.0
+    weights /= weights.sum(axis=1, keepdims=True)
+    return weights.astype(np.float32)
+
+
+def _bicubic(x: np.ndarray, a: float = -0.5) -> np.ndarray:
+    x = np.abs(x)
+    return np.where(
+        x < 1.0,
+        ((a + 2.0) * x - (a + 3.0)) * x * x + 1.0,
+        np.where(x < 2.0, (((x - 5.0) * x + 8.0) * x - 4.0) * a, 0.0),
+    )
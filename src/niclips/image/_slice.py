@@ -1,11 +1,17 @@
+from collections.abc import Sequence
+from typing import overload
+
 import nibabel as nib
 import numpy as np
+from nibabel.arrayproxy import ArrayLike
+from nibabel.fileslice import canonical_slicers
 
 from niclips.checks import check_4d
 from niclips.typing import Coord, NiftiLike
 
-from ._convert import get_fdata
+from ._convert import get_fdata_slice
 from ._coord import coord2ind
+from ._orient import proxy_dtype
 
 
 def slice_volume(
@@ -13,16 +19,100 @@ def slice_volume(
     coord: Coord = (0.0, 0.0, 0.0),
     axis: int = 0,
     idx: int | None = 0,
+    strict: bool = False,
 ) -> np.ndarray:
-    """Slice volume at a coordinate along an axis."""
-    if img.ndim == 4:
-        img = index_img(img, idx=idx)
-    data = get_fdata(img)
+    """Slice volume at a coordinate along an axis.
 
+    For 4D images, the volume `idx` is sliced (the middle volume if `None`). Only the
+    requested plane is read for images that are not yet in memory. Coordinates
+    outside the field of view are clamped to the edge plane, or raise an
+    `IndexError` if `strict` (see `plane_index`).
+    """
     if isinstance(img, nib.Nifti1Image):
         coord = coord2ind(img.affine, coord)
-    slc = slice_array(data, int(coord[axis]), axis=axis)
-    return slc
+    slicer = axis * (slice(None),) + (
+        plane_index(coord[axis], img.shape[axis], strict),
+    )
+    if img.ndim == 4:
+        if idx is None:
+            idx = img.shape[-1] // 2
+        slicer += (2 - axis) * (slice(None),) + (idx,)
+    return get_fdata_slice(img, slicer)
+
+
+def plane_index(ind: float, size: int, strict: bool = False) -> int:
+    """Index of the plane at voxel coordinate `ind` along an axis of `size`.
+
+    Planes outside the field of view (e.g. of an overlay with a different field of
+    view) are clamped to the nearest edge plane, or raise an `IndexError` if
+    `strict`.
+    """
+    idx = int(ind)
+    if 0 <= idx < size:
+        return idx
+    if strict:
+        raise IndexError(f"index {idx} is out of bounds for axis with size {size}")
+    return min(max(idx, 0), size - 1)
+
+
+class VolumeSubset:
+    """Lazy array of a subset of the volumes of a 4D data object.
+
+    Behaves like a nibabel data proxy: indexing reads only the selected volumes that
+    are requested, one at a time, from the underlying data object (e.g. an
+    `ArrayProxy`, which doesn't support fancy indexing).
+    """
+
+    def __init__(self, dataobj: ArrayLike, volumes: Sequence[int] | np.ndarray) -> None:
+        self.dataobj = dataobj
+        self.volumes = np.asarray(volumes, dtype=int).reshape(-1)
+        self.shape = tuple(dataobj.shape[:3]) + (len(self.volumes),)
+        self.ndim = 4
+        self.dtype = proxy_dtype(dataobj)
+
+    @property
+    def is_proxy(self) -> bool:
+        """Mark as a data proxy, so that images backed by it are not in memory."""
+        return True
+
+    def __array__(
+        self, dtype: np.dtype | None = None, copy: bool | None = None
+    ) -> np.ndarray:
+        return np.asarray(self[...], dtype=dtype)
+
+    def __getitem__(self, slicer: object) -> np.ndarray:
+        *spatial, volumes = canonical_slicers(slicer, self.shape)
+        if len(spatial) != 3:
+            raise IndexError("Only 4D indexing of volume subsets is supported")
+        indices = self.volumes[volumes]
+        if indices.ndim == 0:
+            return np.asarray(self.dataobj[(*spatial, int(indices))])
+        vols = [np.asarray(self.dataobj[(*spatial, int(idx))]) for idx in indices]
+        return np.stack(vols, axis=-1)
+
+
+def take_volumes(
+    img: nib.Nifti1Image, volumes: Sequence[int] | np.ndarray
+) -> nib.Nifti1Image:
+    """Select volumes of a 4D nifti image, without reading their data.
+
+    The returned image is backed by a lazy `VolumeSubset`, so that its volumes are
+    only read (one at a time) when indexed, e.g. when streamed by `iter_volumes`.
+    """
+    check_4d(img)
+    fdata = getattr(img, "_fdata_cache", None)
+    dataobj = img.dataobj if fdata is None else fdata
+    return nib.Nifti1Image(
+        VolumeSubset(dataobj, volumes), affine=img.affine, header=img.header
+    )
+
+
+@overload
+def index_img(img: nib.Nifti1Image, idx: int | None = 0) -> nib.Nifti1Image: ...
+
+
+@overload
+def index_img(img: np.ndarray, idx: int | None = 0) -> np.ndarray: ...
 
 
 def index_img(img: NiftiLike, idx: int | None = 0) -> NiftiLike:
@@ -31,16 +121,14 @@ def index_img(img: NiftiLike, idx: int | None = 0) -> NiftiLike:
     if idx is None:
         idx = img.shape[-1] // 2
 
-    # NOTE: We currently assume throughout that 4d nifti can be loaded in memory in
-    # full, and that calls to get_fdata() typically return cached data. This
-    # dramatically improves access times, compared to interacting with the memmapped
-    # dataobj.
-    data = get_fdata(img)
-    slc = data[..., idx]
+    # NOTE: Images already in memory are indexed from their array (or the cached
+    # get_fdata() array), which is dramatically faster than repeatedly interacting
+    # with the dataobj. Lazily loaded images only read and decode the requested volume.
+    slc = get_fdata_slice(img, (..., idx))
 
     if isinstance(img, nib.Nifti1Image):
-        slc_nii = nib.Nifti1Image(slc, affine=img.affine)
-    return slc_nii
+        return nib.Nifti1Image(slc, affine=img.affine)
+    return slc
 
 
 def crop_middle_third(data: np.ndarray, axis: int | tuple[int, ...] = 0) -> np.ndarray:
@@ -7,6 +7,93 @@ from PIL import Image
 from ._pad import Align, pad_to_equal
 
 
+class GridLayout:
+    """Layout of image panels on a single canvas.
+
+    Panel offsets are computed once from the panel shapes, with the same arrangement
+    as `image_grid`: panels are centered vertically within their row, surrounded by
+    `pad` pixels of zero border, and rows are left aligned. The remaining background
+    is `fill_value`.
+
+    Panels are written directly into a canvas allocated by `canvas`, so a canvas can
+    be reused across frames of a video. Canvases and panels may have leading batch
+    dims, i.e. shape (..., H, W[, C]).
+    """
+
+    def __init__(
+        self,
+        shapes: Sequence[tuple[int, ...]],
+        nrows: int = 1,
+        pad: int = 2,
+        fill_value: int = 0,
+        dtype: np.typing.DTypeLike = np.uint8,
+    ) -> None:
+        channels = {tuple(shape[2:]) for shape in shapes}
+        assert len(channels) == 1, "Images have different channels"
+        self.channels = channels.pop()
+        self.pad = pad
+        self.fill_value = fill_value
+        self.dtype = np.dtype(dtype)
+
+        # (top, left, height, width) of each panel and its row
+        self.offsets: list[tuple[int, int, int, int]] = []
+        self._cells: list[tuple[int, int, int, int]] = []
+        ncols = math.ceil(len(shapes) / nrows)
+        height = width = 0
+        for ii in range(nrows):
+            row_shapes = shapes[ii * ncols : (ii + 1) * ncols]
+            row_height = max(shape[0] for shape in row_shapes)
+            left = 0
+            for panel_height, panel_width in (shape[:2] for shape in row_shapes):
+                top = height + pad + (row_height - panel_height) // 2
+                self.offsets.append((top, left + pad, panel_height, panel_width))
+                self._cells.append((height, left, row_height, panel_width))
+                left += panel_width + 2 * pad
+            height += row_height + 2 * pad
+            width = max(width, left)
+        self.shape = (height, width, *self.channels)
+
+    def canvas(self, *batch: int) -> np.ndarray:
+        """Allocate a canvas, shape (*batch, H, W[, C]), with the background drawn."""
+        canvas = np.full((*batch, *self.shape), self.fill_value, dtype=self.dtype)
+        pad = self.pad
+        for top, left, height, width in self._cells:
+            cell = (
+                slice(top, top + height + 2 * pad),
+                slice(left, left + width + 2 * pad),
+            )
+            canvas[(..., *cell) + self._channel_index] = 0
+            inner = (
+                slice(top + pad, top + pad + height),
+                slice(left + pad, left + pad + width),
+            )
+            canvas[(..., *inner) + self._channel_index] = self.fill_value
+        return canvas
+
+    def paste(
+        self,
+        panels: Sequence[np.ndarray | Image.Image],
+        out: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """Write panels into their place on a canvas, returning the canvas.
+
+        If `out` is not given, a new canvas is allocated. Only the panel regions of
+        `out` are written, the background is left as is.
+        """
+        arrays = [np.asarray(panel) for panel in panels]
+        assert len(arrays) == len(self.offsets), "Wrong number of panels"
+        if out is None:
+            out = self.canvas(*arrays[0].shape[: arrays[0].ndim - len(self.shape)])
+        for panel, (top, left, height, width) in zip(arrays, self.offsets):
+            region = (slice(top, top + height), slice(left, left + width))
+            out[(..., *region) + self._channel_index] = panel
+        return out
+
+    @property
+    def _channel_index(self) -> tuple[slice, ...]:
+        return len(self.channels) * (slice(None),)
+
+
 def image_grid(
     imgs: list[np.ndarray],
     nrows: int = 1,
@@ -14,20 +101,15 @@ def image_grid(
     fill_value: int = 0,
 ) -> np.ndarray:
     """Combine a list of images, possibly different sizes, into a grid."""
-    rows = []
-    ncols = math.ceil(len(imgs) / nrows)
-    for ii in range(nrows):
-        row_imgs = imgs[ii * ncols : (ii + 1) * ncols]
-        row = stack_images(row_imgs, axis=1, pad=pad, fill_value=fill_value)
-        rows.append(row)
-
-    if nrows == 1:
-        grid = rows[0]
-    else:
-        grid = stack_images(
-            rows, axis=0, pad=0, fill_value=fill_value, align=Align.LEFT
-        )
-    return grid
+    imgs = [np.asarray(img) for img in imgs]
+    layout = GridLayout(
+        [img.shape for img in imgs],
+        nrows=nrows,
+        pad=pad,
+        fill_value=fill_value,
+        dtype=np.result_type(*imgs),
+    )
+    return layout.paste(imgs)
 
 
 def stack_images(
@@ -38,9 +120,9 @@ def stack_images(
     align: Align = Align.CENTER,
 ) -> np.ndarray:
     """Stack a list of images along an axis."""
-    imgs = [np.asarray(img) for img in imgs]
+    arrays = [np.asarray(img) for img in imgs]
 
-    ndims = {img.ndim for img in imgs}
+    ndims = {img.ndim for img in arrays}
     assert len(ndims) == 1, "Images have different ndims"
     ndim = ndims.pop()
     assert ndim in {2, 3}, "Expected images to have 2 or 3 dims"
@@ -48,12 +130,30 @@ def stack_images(
 
     # Pad images to equal size on non-concatenation axis
     other_axis = (axis + 1) % 2
-    imgs = pad_to_equal(imgs, axis=other_axis, fill_value=fill_value, align=align)
+    arrays = pad_to_equal(arrays, axis=other_axis, fill_value=fill_value, align=align)
 
     # Then pad on all sides
     if pad:
         padding = [(pad, pad) if ii < 2 else (0, 0) for ii in range(ndim)]
-        imgs = [np.pad(img, padding) for img in imgs]
+        arrays = [np.pad(img, padding) for img in arrays]
 
-    stacked = np.concatenate(imgs, axis=axis)
+    stacked = np.concatenate(arrays, axis=axis)
     return stacked
+
+
+def stack_frames(
+    stacks: Sequence[np.ndarray],
+    pad: int = 2,
+    fill_value: int = 0,
+) -> np.ndarray:
+    """Stack frame stacks, shape (T, H, W[, C]), side by side.
+
+    Batched counterpart of `stack_images` along axis 1 (with center alignment).
+    """
+    layout = GridLayout(
+        [stack.shape[1:] for stack in stacks],
+        pad=pad,
+        fill_value=fill_value,
+        dtype=stacks[0].dtype,
+    )
+    return layout.paste(stacks)
@@ -0,0 +1,111 @@
+"""Streaming reductions over the volumes of 4D images."""
+
+from collections.abc import Iterator
+from typing import NamedTuple
+
+import nibabel as nib
+import numpy as np
+
+from niclips.checks import check_4d
+from niclips.precision import get_data_dtype, get_float_dtype
+
+from ._window import Window
+
+# 4D images larger than this (at the global precision) are reduced by streaming
+STREAM_BYTES = 2 * 1024**3
+# Target size (at the global precision) of the chunks of volumes read when streaming
+CHUNK_BYTES = 64 * 1024**2
+
+
+class VolumeStats(NamedTuple):
+    """Voxel-wise temporal statistics and per-volume signal of a 4D image."""
+
+    mean: np.ndarray
+    var: np.ndarray
+    signal: np.ndarray
+    window: Window
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.var)
+
+
+def should_stream(img: nib.Nifti1Image, threshold: int | None = None) -> bool:
+    """Check whether an image is 4D and large enough to be reduced by streaming.
+
+    Images are streamed if their size as processed (see `volume_nbytes`) exceeds
+    `threshold` (`STREAM_BYTES` if not given).
+    """
+    threshold = STREAM_BYTES if threshold is None else threshold
+    return img.ndim == 4 and volume_nbytes(img) * img.shape[3] > threshold
+
+
+def volume_nbytes(img: nib.Nifti1Image) -> int:
+    """Size in bytes of one volume of an image, as processed.
+
+    Volumes are processed in the floating data type of the global precision (see
+    `niclips.precision.get_float_dtype`).
+    """
+    itemsize = get_float_dtype(get_data_dtype(img)).itemsize
+    return itemsize * int(np.prod(img.shape[:3]))
+
+
+def iter_volumes(
+    img: nib.Nifti1Image, chunk_bytes: int = CHUNK_BYTES
+) -> Iterator[tuple[slice, np.ndarray]]:
+    """Iterate over chunks of volumes of a 4D image, as floating point arrays.
+
+    Yields `(volumes, data)` pairs, where `volumes` is the slice of volumes in the
+    chunk. Only one chunk is held in memory at a time. Images whose data is already
+    cached by `get_fdata()` are sliced from the cache. Chunks are in the floating
+    data type of the global precision (float64 by default).
+    """
+    check_4d(img)
+    num_volumes = img.shape[3]
+    dtype = get_float_dtype(get_data_dtype(img))
+    chunk_size = max(chunk_bytes // volume_nbytes(img), 1)
+
+    fdata = getattr(img, "_fdata_cache", None)
+    source = img.dataobj if fdata is None else fdata
+    for start in range(0, num_volumes, chunk_size):
+        volumes = slice(start, min(start + chunk_size, num_volumes))
+        yield volumes, np.asarray(source[..., volumes], dtype=dtype)
+
+
+def volume_stats(img: nib.Nifti1Image, chunk_bytes: int = CHUNK_BYTES) -> VolumeStats:
+    """Compute temporal mean and variance, per-volume signal and min/max in one pass.
+
+    Volumes are read in chunks of about `chunk_bytes`, and the statistics of each
+    chunk are merged into running float64 accumulators (Chan et al.'s parallel form
+    of Welford's algorithm), so peak memory is a few volumes. The mean and variance
+    are returned in the floating data type of the global precision.
+    """
+    check_4d(img)
+    count = 0
+    mean = np.zeros(img.shape[:3])
+    m2 = np.zeros(img.shape[:3])
+    signal = np.empty(img.shape[3])
+    vmin, vmax = np.inf, -np.inf
+
+    for volumes, chunk in iter_volumes(img, chunk_bytes=chunk_bytes):
+        chunk_count = chunk.shape[3]
+        chunk_mean = chunk.mean(axis=-1)
+        chunk_m2 = chunk_count * chunk.var(axis=-1)
+
+        total = count + chunk_count
+        delta = chunk_mean - mean
+        mean += delta * (chunk_count / total)
+        m2 += chunk_m2 + delta**2 * (count * chunk_count / total)
+        count = total
+
+        signal[volumes] = chunk.mean(axis=(0, 1, 2))
+        vmin = min(vmin, np.nanmin(chunk))
+        vmax = max(vmax, np.nanmax(chunk))
+
+    dtype = get_float_dtype(get_data_dtype(img))
+    return VolumeStats(
+        mean=mean.astype(dtype, copy=False),
+        var=(m2 / count).astype(dtype, copy=False),
+        signal=signal,
+        window=Window(vmin, vmax),
+    )
@@ -26,14 +26,19 @@ def minmax(img: NiftiLike) -> Window:
     return Window(vmin, vmax)
 
 
-def center_minmax(img: NiftiLike) -> Window:
-    """Compute min-max window over center of axial slice; compute over `idx` if 4D."""
+def center_minmax(img: NiftiLike, centroid: np.ndarray | None = None) -> Window:
+    """Compute min-max window over center of axial slice; compute over `idx` if 4D.
+
+    A precomputed `centroid` (voxel index from `peak_of_mass(..., mask=True)`) can be
+    passed to avoid recomputing it.
+    """
     check_3d_4d(img)
     if img.ndim == 4:
         img = index_img(img, idx=None)
     data = get_fdata(img)
 
-    centroid = peak_of_mass(data, mask=True)
+    if centroid is None:
+        centroid = peak_of_mass(data, mask=True)
     data = data[..., centroid[2]]
     data = crop_middle_third(data, axis=(0, 1))
     return minmax(data)
@@ -1,8 +1,14 @@
 """Handling of inputs/outputs."""
 
+import gzip
+import hashlib
+import io
 import logging
+import os
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any
+from typing import Any, NamedTuple, cast
 
 import av
 import nibabel as nib
@@ -13,7 +19,9 @@ from av.video.stream import VideoStream
 from PIL import Image
 
 from niclips.image._convert import topil
-from niclips.typing import StrPath
+from niclips.image._stream import STREAM_BYTES
+from niclips.precision import get_data_dtype, get_float_dtype
+from niclips.typing import ReadAccess, RgbConvert, StrPath, VideoCodec, YuvPlanes
 
 try:
     import nifti
@@ -22,62 +30,570 @@ try:
 except ImportError:  # pragma: no cover
     HAVE_NIFTI = False
 
+try:
+    import indexed_gzip as igzip
+
+    HAVE_INDEXED_GZIP = True
+except ImportError:  # pragma: no cover
+    HAVE_INDEXED_GZIP = False
+
+# Uncompressed bytes between gzip seek points. Each point stores a 32KiB window, so
+# the index is ~1% of the uncompressed image size.
+GZIP_INDEX_SPACING = 4 * 1024**2
+# Data size above which indexed random access is used for reading gzip slices
+LARGE_GZIP_BYTES = 64 * 1024**2
+
+
+def get_cache_dir() -> Path:
+    """Get the niclips cache directory.
+
+    Set with the `NICLIPS_CACHE_DIR` environment variable, otherwise defaults to
+    `~/.cache/niclips`.
+    """
+    cache_dir = os.environ.get("NICLIPS_CACHE_DIR")
+    if cache_dir:
+        return Path(cache_dir)
+    return Path.home() / ".cache" / "niclips"
+
+
+def gzip_index_path(fpath: StrPath, index_dir: StrPath | None = None) -> Path:
+    """Path of the persisted seek point index for a gzip file.
+
+    Indices are keyed by the file path, modification time and size, so that stale
+    indices are never reused.
+    """
+    index_dir = Path(index_dir) if index_dir else get_cache_dir() / "gzindex"
+    return index_dir / f"{file_digest(fpath)}.gzidx"
+
+
+def file_digest(fpath: StrPath, *params: object) -> str:
+    """Digest of a file's path, modification time and size, and optional `params`.
+
+    Used to key files derived from an input file (and the parameters they were
+    derived with) in the niclips cache directory.
+    """
+    fpath = Path(fpath).resolve()
+    stat = fpath.stat()
+    key = ":".join(map(str, (fpath, stat.st_mtime_ns, stat.st_size, *params)))
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def open_indexed_gzip(
+    fpath: StrPath,
+    index_dir: StrPath | None = None,
+    spacing: int = GZIP_INDEX_SPACING,
+) -> "igzip.IndexedGzipFile":
+    """Open a gzip file for random access using a persisted seek point index.
+
+    The index (zran-style checkpoints of the decompressor state) is built on first
+    access and saved under `index_dir` (default: the niclips cache directory). Later
+    opens import the index and can seek straight to any byte range.
+    """
+    index_path = gzip_index_path(fpath, index_dir=index_dir)
+    if index_path.exists():
+        try:
+            return igzip.IndexedGzipFile(
+                str(fpath), index_file=str(index_path), drop_handles=False
+            )
+        except Exception as exc:
+            logging.warning("Rebuilding invalid gzip index %s: %s", index_path, exc)
+
+    gzf = igzip.IndexedGzipFile(str(fpath), spacing=spacing, drop_handles=False)
+    gzf.build_full_index()
+    _save_gzip_index(gzf, index_path)
+    return gzf
+
+
+def _save_gzip_index(gzf: "igzip.IndexedGzipFile", index_path: Path) -> None:
+    try:
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename so concurrent workers never read a partial index
+        tmp_path = index_path.with_suffix(f".{os.getpid()}.tmp")
+        gzf.export_index(str(tmp_path))
+        tmp_path.replace(index_path)
+    except OSError as exc:
+        logging.warning("Unable to save gzip index %s: %s", index_path, exc)
+
+
+def load_nifti_header(fpath: StrPath) -> nib.Nifti1Header:
+    """Load only the header (and extensions) of a Nifti image.
+
+    No voxel data is read, so this is cheap enough for planning, e.g. default
+    coordinates, orientation checks and size-based decisions.
+    """
+    # Plain gzip stream; nibabel's opener may set up indexed (random) access, which
+    # costs far more than inflating the first block
+    opener = gzip.open if str(fpath).endswith(".gz") else open
+    with opener(fpath, "rb") as fobj:
+        return _header_from_fileobj(fobj)
+
+
+def _header_from_fileobj(fobj: io.BufferedIOBase) -> nib.Nifti1Header:
+    """Read a Nifti-1 or Nifti-2 header from the start of a file object."""
+    # Nifti-2 headers are 540 bytes (in either byte order)
+    sizeof_hdr = int.from_bytes(fobj.read(4), "little")
+    fobj.seek(0)
+    if sizeof_hdr in {540, int.from_bytes((540).to_bytes(4, "big"), "little")}:
+        return nib.Nifti2Header.from_fileobj(fobj)
+    return nib.Nifti1Header.from_fileobj(fobj)
+
+
+def get_data_nbytes(header: nib.Nifti1Header) -> int:
+    """Get the size in bytes of the (uncompressed) image data described by a header."""
+    shape = header.get_data_shape()
+    return int(np.prod(shape)) * header.get_data_dtype().itemsize
+
+
+ReaderFn = Callable[[Path], nib.Nifti1Image]
+
+reader_registry: dict[str, ReaderFn] = {}
+
+
+def register_reader(name: str) -> Callable[[ReaderFn], ReaderFn]:
+    """Register a Nifti reader backend, selectable by name in `load_nifti`."""
+
+    def decorator(fn: ReaderFn) -> ReaderFn:
+        reader_registry[name] = fn
+        return fn
+
+    return decorator
+
+
+def select_reader(fpath: StrPath, access: ReadAccess = "full") -> str:
+    """Select a reader backend from the file size, compression and access pattern.
+
+    Access patterns are "header" (metadata only), "slices" (a few planes or volumes),
+    "stream" (every volume, in order) or "full" (the full image data). Images
+    streamed volume by volume are only read lazily if too large to be loaded in full
+    (see `niclips.image.should_stream`). Large gzipped images are indexed on their
+    first full load, and decompressed in parallel from then on.
+    """
+    fpath = Path(fpath)
+    compressed = fpath.name.endswith(".gz")
+    if access == "header" or not compressed:
+        return "nibabel-mmap"
+
+    if access == "stream":
+        # Volumes read in order resume decompression through the open file handle
+        header = load_nifti_header(fpath)
+        itemsize = get_float_dtype(get_data_dtype(header)).itemsize
+        if itemsize * int(np.prod(header.get_data_shape())) > STREAM_BYTES:
+            return "nibabel-mmap"
+        access = "full"
+
+    have_index = HAVE_INDEXED_GZIP and gzip_index_path(fpath).exists()
+    if access == "slices":
+        if have_index:
+            return "indexed-gzip"
+        # Building an index costs one full read (and a write to the cache), only
+        # worth it for large 4D images, of which only a few volumes are read
+        header = load_nifti_header(fpath)
+        large = get_data_nbytes(header) >= LARGE_GZIP_BYTES
+        if HAVE_INDEXED_GZIP and large and len(header.get_data_shape()) > 3:
+            return "indexed-gzip"
+        return "nibabel-mmap"
+
+    if HAVE_INDEXED_GZIP and (os.cpu_count() or 1) > 1:
+        # The first full load of a large image builds its index while reading it
+        # sequentially, so that later loads decompress in parallel
+        if have_index or get_data_nbytes(load_nifti_header(fpath)) >= LARGE_GZIP_BYTES:
+            return "gzip-parallel"
+    return "nifti" if HAVE_NIFTI else "nibabel"
+
+
+def load_nifti(
+    fpath: StrPath,
+    reader: str | None = None,
+    access: ReadAccess = "full",
+) -> nib.Nifti1Image:
+    """Load a Nifti image with a registered reader backend.
+
+    If no `reader` is given (or "auto"), one is selected for the declared `access`
+    pattern (see `select_reader`). Lazy readers (e.g. "nibabel-mmap",
+    "indexed-gzip") only read the planes requested by slicing the image with
+    `niclips.image.slice_volume` or `niclips.image.index_img`.
+    """
+    if reader in {None, "auto"}:
+        reader = select_reader(fpath, access=access)
+    if reader not in reader_registry:
+        raise KeyError(f"Reader '{reader}' not found in registry.")
+
+    logging.info("Loading %s with '%s' reader", fpath, reader)
+    return reader_registry[reader](Path(fpath))
+
+
+@register_reader("nifti")
+def _read_nifti(fpath: Path) -> nib.Nifti1Image:
+    if not HAVE_NIFTI:
+        logging.warning("`nifti` library is unavailable - using `nibabel`")
+        return _read_nibabel(fpath)
+
+    _, arr = nifti.read_volume(str(fpath))
+    # Parse the header directly rather than copying fields over from `nifti`
+    hdr = load_nifti_header(fpath)
+    nii = nib.Nifti1Image(dataobj=arr, affine=hdr.get_best_affine(), header=hdr)
+    nii.set_filename(str(fpath))
+    return nii
+
+
+@register_reader("nibabel")
+def _read_nibabel(fpath: Path) -> nib.Nifti1Image:
+    img = cast(nib.Nifti1Image, nib.load(fpath, mmap=False))
+    nii = nib.Nifti1Image(
+        dataobj=np.asanyarray(img.dataobj), affine=img.affine, header=img.header
+    )
+    nii.set_filename(str(fpath))
+    return nii
+
 
-def load_nifti(fpath: str | Path, use_niftilib: bool = True) -> nib.Nifti1Image:
-    """Wrapper to load Nifti images using library."""
-    # Uses nifti library if available and user selects it
-    use_niftilib = use_niftilib and HAVE_NIFTI
-    if use_niftilib:
-        hdr, arr = nifti.read_volume(str(fpath))
-        new_hdr = nib.Nifti1Header()
-        for key, val in hdr.items():
-            if key in new_hdr:
-                new_hdr[key] = val
-        aff = new_hdr.get_best_affine()
-        nii = nib.Nifti1Image(dataobj=arr, affine=aff, header=new_hdr)
-        nii.set_filename(str(fpath))
-        return nii
+@register_reader("nibabel-mmap")
+def _read_nibabel_mmap(fpath: Path) -> nib.Nifti1Image:
+    # Keep the file handle open so repeated slicing of compressed images resumes
+    # decompression rather than restarting from the top of the file.
+    return cast(nib.Nifti1Image, nib.load(fpath, mmap=True, keep_file_open=True))
+
+
+@register_reader("indexed-gzip")
+def load_indexed_nifti(
+    fpath: StrPath, index_dir: StrPath | None = None
+) -> nib.Nifti1Image:
+    """Lazily load a gzipped Nifti image with random access to its data."""
+    if not (HAVE_INDEXED_GZIP and str(fpath).endswith(".gz")):
+        logging.warning("Indexed gzip reads unavailable for %s", fpath)
+        return _read_nibabel_mmap(Path(fpath))
+
+    gzf = open_indexed_gzip(fpath, index_dir=index_dir)
+    file_map = nib.Nifti1Image.make_file_map({"image": gzf, "header": gzf})
+    nii = nib.Nifti1Image.from_file_map(file_map)
+    nii.set_filename(str(fpath))
+    return nii
+
+
+@register_reader("gzip-parallel")
+def load_nifti_parallel(
+    fpath: StrPath,
+    threads: int | None = None,
+    index_dir: StrPath | None = None,
+) -> nib.Nifti1Image:
+    """Eagerly load a gzipped Nifti image, decompressing on a thread pool.
+
+    The voxel data is split into byte ranges which are inflated concurrently from the
+    nearest seek points of the persisted gzip index (see `open_indexed_gzip`),
+    straight into a preallocated array. If no index has been saved yet, the data is
+    read sequentially once while building the index, so later loads are parallel.
+    """
+    if not (HAVE_INDEXED_GZIP and str(fpath).endswith(".gz")):
+        logging.warning("Parallel decompression unavailable for %s", fpath)
+        return load_nifti(fpath, reader="nifti")
+
+    threads = threads or os.cpu_count() or 1
+    index_path = gzip_index_path(fpath, index_dir=index_dir)
+    have_index = index_path.exists()
+
+    if have_index:
+        gzf = igzip.IndexedGzipFile(
+            str(fpath), index_file=str(index_path), drop_handles=False
+        )
     else:
-        if not HAVE_NIFTI:
-            logging.warning("`nifti` library is unavailable - using `nibabel`")
-        return nib.load(fpath)
+        gzf = igzip.IndexedGzipFile(
+            str(fpath), spacing=GZIP_INDEX_SPACING, drop_handles=False
+        )
+
+    with gzf:
+        hdr = _header_from_fileobj(gzf)
+        offset = int(hdr.get_data_offset())
+        buf = np.empty(get_data_nbytes(hdr), dtype=np.uint8)
+
+        def _read_into(fileobj: "igzip.IndexedGzipFile", start: int, stop: int) -> None:
+            fileobj.seek(offset + start)
+            view = buf.data[start:stop]
+            while len(view):
+                nread = fileobj.readinto(view)
+                if not nread:
+                    raise EOFError(f"Unexpected end of file {fpath}")
+                view = view[nread:]
+
+        def _read_range(start: int, stop: int) -> None:
+            # Each worker reads from its own handle
+            with igzip.IndexedGzipFile(
+                str(fpath), index_file=str(index_path), drop_handles=False
+            ) as fileobj:
+                _read_into(fileobj, start, stop)
+
+        if have_index and threads > 1:
+            bounds = np.linspace(0, len(buf), threads + 1).astype(int)
+            with ThreadPoolExecutor(threads) as pool:
+                list(pool.map(_read_range, bounds[:-1], bounds[1:]))
+        else:
+            # Sequential read adds seek points as it goes; save them for next time
+            _read_into(gzf, 0, len(buf))
+            if not have_index:
+                _save_gzip_index(gzf, index_path)
+
+    # Nifti data is stored in Fortran order
+    arr = buf.view(hdr.get_data_dtype()).reshape(hdr.get_data_shape(), order="F")
+    slope, inter = hdr.get_slope_inter()
+    if slope is not None and (slope != 1.0 or inter):
+        arr = arr * slope + (inter or 0.0)
+
+    is_nifti2 = isinstance(hdr, nib.Nifti2Header)
+    image_cls = nib.Nifti2Image if is_nifti2 else nib.Nifti1Image
+    nii = image_cls(dataobj=arr, affine=hdr.get_best_affine(), header=hdr)
+    nii.set_filename(str(fpath))
+    return nii
+
+
+class EncoderProfile(NamedTuple):
+    """Video encoder settings.
+
+    `preset` is an x264 preset name (e.g. "ultrafast", "medium", "slow"), mapped to
+    the matching speed setting of the other codecs. `crf` is the constant rate
+    factor, lower is higher quality (for WebP, quality is `100 - crf`). `threads`
+    is the number of encoder threads, 0 to select automatically. `gop` is the
+    maximum number of frames between keyframes. `faststart` moves the mp4 index to
+    the front of the file, so that videos can be played before fully loaded.
+    Unset options use the encoder defaults.
+    """
+
+    codec: VideoCodec = "h264"
+    preset: str | None = None
+    crf: int | None = None
+    threads: int = 0
+    gop: int | None = None
+    faststart: bool = True
+
+
+ENCODER_PROFILES: dict[str, EncoderProfile] = {
+    "default": EncoderProfile(),
+    "fast-draft": EncoderProfile(preset="ultrafast", crf=28),
+    "archival": EncoderProfile(preset="slow", crf=18),
+}
+
+# Profile name, profile, or mapping of settings with an optional base "profile"
+EncoderLike = str | EncoderProfile | dict[str, Any] | None
+
+# FFmpeg encoder and supported file suffixes of each codec (first is the default)
+VIDEO_CODECS: dict[VideoCodec, tuple[str, tuple[str, ...]]] = {
+    "h264": ("h264", (".mp4",)),
+    "vp9": ("libvpx-vp9", (".mp4", ".webm")),
+    "av1": ("libaom-av1", (".mp4", ".webm")),
+    "webp": ("libwebp_anim", (".webp",)),
+}
+
+# x264 presets, as libvpx/libaom cpu-used speed settings
+_PRESET_SPEEDS = {
+    "ultrafast": 8,
+    "superfast": 7,
+    "veryfast": 6,
+    "faster": 5,
+    "fast": 4,
+    "medium": 3,
+    "slow": 2,
+    "slower": 1,
+    "veryslow": 0,
+    "placebo": 0,
+}
+
+
+def get_encoder_profile(encoder: EncoderLike = None) -> EncoderProfile:
+    """Get an encoder profile by name, or from a mapping of settings.
+
+    Mappings can set a base `profile` name, with the other settings overriding it,
+    e.g. `{"profile": "archival", "threads": 4}`.
+    """
+    if encoder is None:
+        return ENCODER_PROFILES["default"]
+    if isinstance(encoder, EncoderProfile):
+        return encoder
+    if isinstance(encoder, dict):
+        settings = dict(encoder)
+        profile = get_encoder_profile(settings.pop("profile", None))
+        profile = profile._replace(**settings)
+        if profile.codec not in VIDEO_CODECS:
+            raise ValueError(f"Unsupported video codec '{profile.codec}'")
+        return profile
+    try:
+        return ENCODER_PROFILES[encoder]
+    except KeyError:
+        raise ValueError(
+            f"Unknown encoder profile '{encoder}', "
+            f"expected one of {list(ENCODER_PROFILES)}"
+        )
+
+
+def video_suffix(encoder: EncoderLike = None) -> str:
+    """Default file suffix of videos written with an encoder profile."""
+    codec = get_encoder_profile(encoder).codec
+    return VIDEO_CODECS[codec][1][0]
+
+
+def _encoder_options(profile: EncoderProfile) -> dict[str, str]:
+    """FFmpeg encoder options of a profile."""
+    options: dict[str, str] = {}
+    speed = None
+    if profile.preset is not None:
+        if profile.preset not in _PRESET_SPEEDS:
+            raise ValueError(f"Unknown encoder preset '{profile.preset}'")
+        speed = _PRESET_SPEEDS[profile.preset]
+
+    if profile.codec == "h264":
+        if profile.preset is not None:
+            options["preset"] = profile.preset
+        if profile.crf is not None:
+            options["crf"] = str(profile.crf)
+    elif profile.codec in {"vp9", "av1"}:
+        if speed is not None:
+            options["cpu-used"] = str(speed)
+        if profile.crf is not None:
+            # Constant quality, without a bitrate cap
+            options["crf"] = str(profile.crf)
+            options["b"] = "0"
+        if profile.codec == "vp9":
+            options["row-mt"] = "1"
+    elif profile.codec == "webp":
+        if speed is not None:
+            options["compression_level"] = str(round(6 * (8 - speed) / 8))
+        if profile.crf is not None:
+            options["quality"] = str(max(100 - profile.crf, 0))
+    return options
+
+
+def rgb_to_yuv420(rgb: np.ndarray, out: YuvPlanes | None = None) -> YuvPlanes:
+    """Convert a uint8 RGB(A) frame, shape (H, W, 3 or 4), to yuv420p planes.
+
+    Uses swscale's fixed-point BT.601 (limited range) coefficients. Chroma is
+    computed from the mean of each 2x2 block of pixels (edges are replicated for
+    odd sizes). Planes are written into `out` if given.
+    """
+    height, width = rgb.shape[:2]
+    rgb = rgb[..., :3].astype(np.int32)
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    y = ((66 * r + 129 * g + 25 * b + 128) >> 8) + 16
+
+    rgb = np.pad(rgb, ((0, height % 2), (0, width % 2), (0, 0)), mode="edge")
+    rgb = rgb.reshape(rgb.shape[0] // 2, 2, rgb.shape[1] // 2, 2, 3).sum(axis=(1, 3))
+    rgb = (rgb + 2) >> 2
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    u = ((-38 * r - 74 * g + 112 * b + 128) >> 8) + 128
+    v = ((112 * r - 94 * g - 18 * b + 128) >> 8) + 128
+
+    if out is None:
+        return y.astype(np.uint8), u.astype(np.uint8), v.astype(np.uint8)
+    for plane, values in zip(out, (y, u, v)):
+        np.copyto(plane, values, casting="unsafe")
+    return out
 
 
 class VideoWriter:
-    """A simple video streaming writer."""
+    """A simple video streaming writer.
+
+    Frames are PIL images or numpy arrays. uint8 RGB(A) arrays, shape (H, W, 3 or
+    4), and preconverted yuv420p planes, a (Y, U, V) tuple, are written straight
+    into the planes of a `VideoFrame` recycled between frames, without going through
+    PIL. RGB arrays are converted with `rgb_to_yuv420`, or by swscale if
+    `rgb_convert` is "swscale". Other arrays are converted with `topil`.
 
-    def __init__(self, where: StrPath, fps: int) -> None:
+    The codec and encoder settings are set by the `encoder` profile (see
+    `EncoderProfile`), either a profile or the name of one in `ENCODER_PROFILES`.
+    """
+
+    def __init__(
+        self,
+        where: StrPath,
+        fps: int,
+        rgb_convert: RgbConvert = "numpy",
+        encoder: EncoderLike = None,
+    ) -> None:
         where = Path(where)
-        if where.suffix != ".mp4":
-            raise ValueError("Only mp4 output supported")
+        self.profile = get_encoder_profile(encoder)
+        suffixes = VIDEO_CODECS[self.profile.codec][1]
+        if where.suffix not in suffixes:
+            formats = ", ".join(suffix.lstrip(".") for suffix in suffixes)
+            raise ValueError(
+                f"Only {formats} output supported for {self.profile.codec}"
+            )
 
         self.where = where
         self.fps = fps
+        self.rgb_convert = rgb_convert
         self._container: OutputContainer | None = None
         self._stream: Stream | VideoStream | None = None
+        self._frame: av.VideoFrame | None = None
+        self._num_frames = 0
 
-    def put(self, img: np.ndarray | Image.Image) -> None:
+    def put(self, img: np.ndarray | Image.Image | YuvPlanes) -> None:
         """Add frame to the stream."""
-        if isinstance(img, np.ndarray):
-            img = topil(img)
-
-        if self._container is None:
-            self.init_stream(width=img.width, height=img.height)
+        if isinstance(img, tuple):
+            frame = self._yuv_frame(img)
+        elif isinstance(img, np.ndarray) and _is_rgb(img):
+            frame = self._rgb_frame(img)
+        else:
+            if isinstance(img, np.ndarray):
+                img = topil(img)
+            if self._container is None:
+                self.init_stream(width=img.width, height=img.height)
+            frame = av.VideoFrame.from_image(img)
 
-        frame = av.VideoFrame.from_image(img)
+        # Recycled frames keep their timestamp, so set it (as the encoder would)
+        frame.pts = self._num_frames
+        self._num_frames += 1
         assert isinstance(self._stream, VideoStream)
         for packet in self._stream.encode(frame):
             assert self._container
             self._container.mux_one(packet)
 
+    def _rgb_frame(self, img: np.ndarray) -> av.VideoFrame:
+        height, width = img.shape[:2]
+        if self._container is None:
+            self.init_stream(width=width, height=height)
+        if self.rgb_convert == "swscale":
+            rgb = np.ascontiguousarray(img[..., :3])
+            return av.VideoFrame.from_ndarray(rgb, format="rgb24")
+        frame = self._recycle_frame(width, height)
+        rgb_to_yuv420(img, out=_plane_arrays(frame))
+        return frame
+
+    def _yuv_frame(self, planes: YuvPlanes) -> av.VideoFrame:
+        height, width = planes[0].shape
+        if self._container is None:
+            self.init_stream(width=width, height=height)
+        frame = self._recycle_frame(width, height)
+        for plane, values in zip(_plane_arrays(frame), planes):
+            plane[...] = values
+        return frame
+
+    def _recycle_frame(self, width: int, height: int) -> av.VideoFrame:
+        """Get the reused yuv420p frame, allocated on first use."""
+        if self._frame is None:
+            self._frame = av.VideoFrame(width, height, "yuv420p")
+        elif hasattr(self._frame, "make_writable"):
+            # Copies the buffers only if the encoder still references them
+            self._frame.make_writable()
+        else:  # pragma: no cover
+            self._frame = av.VideoFrame(width, height, "yuv420p")
+        return self._frame
+
     def init_stream(self, width: int, height: int) -> None:
         """Initialize the stream."""
-        self._container = av.open(str(self.where), mode="w")
-        self._stream = self._container.add_stream("h264", rate=self.fps)
+        profile = self.profile
+        container_options = {}
+        if profile.faststart and self.where.suffix == ".mp4":
+            container_options["movflags"] = "+faststart"
+        self._container = av.open(
+            str(self.where), mode="w", container_options=container_options
+        )
+        self._stream = self._container.add_stream(
+            VIDEO_CODECS[profile.codec][0],
+            rate=self.fps,
+            options=_encoder_options(profile),
+        )
         assert isinstance(self._stream, VideoStream)
         self._stream.width = width
         self._stream.height = height
         self._stream.pix_fmt = "yuv420p"
+        self._stream.codec_context.thread_count = profile.threads
+        if profile.gop is not None:
+            self._stream.codec_context.gop_size = profile.gop
 
     def close(self) -> None:
         """Close the stream."""
@@ -94,3 +610,23 @@ class VideoWriter:
 
     def __exit__(self, *args: tuple[Any]) -> None:
         self.close()
+
+
+def _is_rgb(img: object) -> bool:
+    """Check whether a frame is a uint8 RGB(A) array."""
+    return (
+        isinstance(img, np.ndarray)
+        and img.dtype == np.uint8
+        and img.ndim == 3
+        and img.shape[2] in {3, 4}
+    )
+
+
+def _plane_arrays(frame: av.VideoFrame) -> YuvPlanes:
+    """Get writable array views of the planes of a frame, without line padding."""
+    arrays = []
+    for plane in frame.planes:
+        buffer = np.frombuffer(memoryview(plane), dtype=np.uint8)
+        rows = buffer[: plane.line_size * plane.height].reshape(plane.height, -1)
+        arrays.append(rows[:, : plane.width])
+    return arrays[0], arrays[1], arrays[2]
@@ -0,0 +1,54 @@
+"""Global precision of image data processing."""
+
+from typing import get_args
+
+import nibabel as nib
+import numpy as np
+
+from niclips.typing import Precision
+
+_precision: Precision = "float64"
+
+
+def set_precision(precision: Precision) -> None:
+    """Set the global precision of image data.
+
+    Precisions are "float64" (default), "float32", or "native" (the on-disk data
+    type, or float32 if the data is scaled).
+    """
+    if precision not in get_args(Precision):
+        raise ValueError(f"Invalid precision {precision}")
+    global _precision
+    _precision = precision
+
+
+def get_precision() -> Precision:
+    """Get the global precision of image data."""
+    return _precision
+
+
+def get_data_dtype(img: nib.Nifti1Image | nib.Nifti1Header) -> np.dtype:
+    """Get the data type an image's data is processed in, for the global precision.
+
+    The image's header can be given instead, e.g. to plan before loading the image.
+    """
+    if _precision == "float64":
+        return np.dtype(np.float64)
+    header = img if isinstance(img, nib.Nifti1Header) else img.header
+    dtype = header.get_data_dtype()
+    slope, inter = header.get_slope_inter()
+    scaled = slope not in {None, 1.0} or inter not in {None, 0.0}
+    if _precision == "float32" or scaled or dtype.kind not in "iuf":
+        return np.dtype(np.float32)
+    return dtype
+
+
+def get_float_dtype(dtype: np.typing.DTypeLike) -> np.dtype:
+    """Get the floating data type for computations on data of `dtype`.
+
+    Data is upcast to at least float32 (e.g. for reductions), or to float64 at
+    "float64" precision.
+    """
+    if _precision == "float64":
+        return np.dtype(np.float64)
+    return np.result_type(dtype, np.float32)
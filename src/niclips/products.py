@@ -0,0 +1,180 @@
+"""Derived image products shared across figures.
+
+Many figures need the same summaries of an image (e.g. temporal mean, rough mask,
+display window). Products are registered along with the products they are computed
+from, and `ImageProducts` resolves this dependency graph for an image, computing each
+product at most once so that figures rendered from the same image can share them.
+
+Temporal summaries of large 4D images (see `niclips.image.should_stream`) are
+computed in a single streaming pass over their volumes, with bounded memory.
+"""
+
+import logging
+from collections.abc import Callable, Iterable
+from typing import Any, NamedTuple
+
+import nibabel as nib
+import numpy as np
+
+import niclips.image as noimg
+from niclips.checks import check_4d
+from niclips.precision import get_float_dtype
+
+ProductFn = Callable[["ImageProducts"], Any]
+
+
+class Product(NamedTuple):
+    """Registered product function and the names of the products it requires."""
+
+    fn: ProductFn
+    requires: tuple[str, ...]
+
+
+product_registry: dict[str, Product] = {}
+
+
+def register_product(name: str, requires: Iterable[str] = ()) -> Callable:
+    """Register a derived image product computed from its `requires` products."""
+
+    def decorator(fn: ProductFn) -> ProductFn:
+        product_registry[name] = Product(fn, tuple(requires))
+        return fn
+
+    return decorator
+
+
+def plan_products(names: Iterable[str]) -> list[str]:
+    """Order products with their dependencies, each after the products it requires."""
+    order: list[str] = []
+    visiting: set[str] = set()
+
+    def _visit(name: str) -> None:
+        if name in order:
+            return
+        if name in visiting:
+            raise ValueError(f"Cyclic dependency on product '{name}'.")
+        try:
+            product = product_registry[name]
+        except KeyError:
+            raise KeyError(f"Product '{name}' not found in registry.")
+        visiting.add(name)
+        for required in product.requires:
+            _visit(required)
+        visiting.remove(name)
+        order.append(name)
+
+    for name in names:
+        _visit(name)
+    return order
+
+
+class ImageProducts:
+    """Memoized derived products of a single image.
+
+    Products are computed on first access (e.g. `products["mean"]`), or together up
+    front with `compute`.
+    """
+
+    def __init__(self, img: nib.Nifti1Image) -> None:
+        self.img = img
+        self._values: dict[str, Any] = {}
+
+    def __getitem__(self, name: str) -> Any:  # noqa: ANN401
+        if name not in self._values:
+            self.compute([name])
+        return self._values[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._values
+
+    def compute(self, names: Iterable[str]) -> None:
+        """Compute products, and the products they require, not yet computed."""
+        for name in plan_products(names):
+            if name not in self._values:
+                logging.debug("Computing '%s' product", name)
+                self._values[name] = product_registry[name].fn(self)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by computed array products (excluding the image's own data)."""
+        data = [getattr(self.img, "_fdata_cache", None), self.img.dataobj]
+        return sum(
+            value.nbytes
+            for value in self._values.values()
+            if isinstance(value, np.ndarray)
+            and not any(
+                isinstance(arr, np.ndarray) and np.may_share_memory(value, arr)
+                for arr in data
+            )
+        )
+
+
+@register_product("volume")
+def _volume(products: ImageProducts) -> np.ndarray:
+    """Reference 3D volume data (middle volume if 4D)."""
+    img = products.img
+    if img.ndim == 4:
+        img = noimg.index_img(img, idx=None)
+    return noimg.get_fdata(img)
+
+
+@register_product("centroid", requires=["volume"])
+def _centroid(products: ImageProducts) -> np.ndarray:
+    """Voxel index of the reference volume's peak of (masked) mass."""
+    return noimg.peak_of_mass(products["volume"], mask=True)
+
+
+@register_product("window", requires=["volume", "centroid"])
+def _window(products: ImageProducts) -> noimg.Window:
+    """Default display window of the reference volume."""
+    return noimg.center_minmax(products["volume"], centroid=products["centroid"])
+
+
+@register_product("stats")
+def _stats(products: ImageProducts) -> noimg.VolumeStats:
+    """Temporal statistics of a 4D image, computed by streaming its volumes."""
+    return noimg.volume_stats(products.img)
+
+
+@register_product("mean")
+def _mean(products: ImageProducts) -> np.ndarray:
+    """Temporal mean (the data itself if 3D)."""
+    if noimg.should_stream(products.img):
+        return products["stats"].mean
+    data = noimg.get_fdata(products.img)
+    if data.ndim == 3:
+        return data
+    return data.mean(axis=-1, dtype=get_float_dtype(data.dtype))
+
+
+@register_product("std")
+def _std(products: ImageProducts) -> np.ndarray:
+    """Temporal standard deviation."""
+    check_4d(products.img)
+    if noimg.should_stream(products.img):
+        return products["stats"].std
+    data = noimg.get_fdata(products.img)
+    return data.std(axis=-1, dtype=get_float_dtype(data.dtype))
+
+
+@register_product("signal")
+def _signal(products: ImageProducts) -> np.ndarray:
+    """Mean signal of each volume."""
+    check_4d(products.img)
+    if noimg.should_stream(products.img):
+        return products["stats"].signal
+    data = noimg.get_fdata(products.img)
+    return data.mean(axis=(0, 1, 2), dtype=np.float64)
+
+
+@register_product("mask", requires=["mean"])
+def _mask(products: ImageProducts) -> np.ndarray:
+    """Rough foreground mask of the temporal mean."""
+    mean = products["mean"]
+    return mean > mean.mean()
+
+
+@register_product("mean_window", requires=["mean"])
+def _mean_window(products: ImageProducts) -> noimg.Window:
+    """Default display window of the temporal mean."""
+    return noimg.center_minmax(products["mean"])
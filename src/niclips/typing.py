@@ -1,6 +1,7 @@
 """Defined types used in niclips."""
 
 import os
+from typing import Literal
 
 import nibabel as nib
 import numpy as np
@@ -10,3 +11,26 @@ StrPath = str | os.PathLike
 Coord = tuple[float, float, float] | np.ndarray
 
 NiftiLike = nib.nifti1.Nifti1Image | np.ndarray
+
+ReadAccess = Literal["header", "slices", "stream", "full"]
+
+# Data type images are processed in
+Precision = Literal["float64", "float32", "native"]
+
+# Overlay values rendered transparent
+Transparent = Literal["nan", "zero"]
+
+# Timeseries clustering methods of carpet plots
+ClusterMethod = Literal["kmeans", "minibatch", "tsnr", "intensity"]
+
+# Renderers of carpet plots
+CarpetBackend = Literal["raster", "matplotlib"]
+
+# Converters of RGB video frames to yuv420p
+RgbConvert = Literal["numpy", "swscale"]
+
+# Codecs of video outputs
+VideoCodec = Literal["h264", "vp9", "av1", "webp"]
+
+# yuv420p planes (Y, U, V) of a video frame
+YuvPlanes = tuple[np.ndarray, np.ndarray, np.ndarray]
@@ -30,6 +30,9 @@ def main() -> None:
                 qc_dir=args.qc_dir,
                 config=args.config,
                 workers=args.workers,
+                reader=args.reader,
+                precision=args.precision,
+                cache_size=args.cache_size,
                 overwrite=args.overwrite,
                 verbose=args.verbose,
             )
@@ -14,6 +14,8 @@ import yaml  # type:ignore [import-untyped]
 from bids2table import BIDSTable, bids2table
 from elbow.utils import cpu_count, setup_logging
 
+from niclips.precision import set_precision
+from niclips.typing import Precision
 from niftyone import Runner
 from niftyone.figures import factory
 
@@ -37,6 +39,9 @@ def participant(
     qc_dir: Path | None = None,
     config: Path | None = None,
     workers: int = 1,
+    reader: str | None = None,
+    precision: Precision = "float64",
+    cache_size: int = 2048,
     overwrite: bool = False,
     verbose: bool = False,
 ) -> None:
@@ -52,6 +57,8 @@ def participant(
     elif workers <= 0:
         raise ValueError(f"Invalid workers {workers}; expected -1 or > 0")
 
+    set_precision(precision)
+
     setup_logging("INFO" if verbose else "WARNING", max_repeats=None)
     logging.info(
         "Starting niftyone participant-level:"
@@ -62,6 +69,9 @@ def participant(
         f"\n\tqc: {qc_dir}"
         f"\n\tconfig: {config}"
         f"\n\tworkers: {workers}"
+        f"\n\treader: {reader}"
+        f"\n\tprecision: {precision}"
+        f"\n\tcache size: {cache_size} MB"
         f"\n\toverwrite: {overwrite}"
     )
 
@@ -75,14 +85,15 @@ def participant(
         subs = [sub]
 
     logging.info("Creating figure views")
-    config: dict[str, Any] = load_config(config=config)
-    figure_views = factory.create_views(config=config)
+    view_config: dict[str, Any] = load_config(config=config)
+    figure_views = factory.create_views(config=view_config, reader=reader)
 
     runner = Runner(
         out_dir=out_dir,
         qc_dir=qc_dir,
         overwrite=overwrite,
         figure_views=figure_views,
+        cache_bytes=cache_size * 1024**2,
     )
 
     _worker = partial(
@@ -91,6 +102,7 @@ def participant(
         subs=subs,
         index=index,
         runner=runner,
+        precision=precision,
         verbose=verbose,
     )
 
@@ -117,11 +129,14 @@ def _participant_worker(
     subs: list[str],
     index: BIDSTable,
     runner: Runner,
+    precision: Precision = "float64",
     verbose: bool = False,
 ) -> None:
     # reset logger for each worker
     # TODO: this is a hack, should be fixed in elbow
     setup_logging("INFO" if verbose else "WARNING", max_repeats=None)
+    # global settings aren't inherited by spawned workers
+    set_precision(precision)
 
     # find current worker's partition of subjects
     if workers > 1:
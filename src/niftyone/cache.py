@@ -0,0 +1,139 @@
+"""Process-local cache of loaded images shared across views."""
+
+import logging
+from collections import OrderedDict
+from collections.abc import Callable
+from pathlib import Path
+
+import nibabel as nib
+import numpy as np
+
+from niclips.products import ImageProducts
+from niclips.typing import ReadAccess
+
+DEFAULT_CACHE_BYTES = 2 * 1024**3
+
+# File path, modification time and size
+FileKey = tuple[str, int, int]
+# File key, reader and access pattern
+ImageKey = tuple[str, int, int, str | None, str]
+
+
+class ImageCache:
+    """LRU cache of decoded, RAS-reoriented images with a memory budget.
+
+    Images are keyed by path, modification time and size, so modified files are
+    never served stale, and by the reader backend and access pattern they were
+    loaded with, so that e.g. a lazy proxy loaded for slicing is not served to a view
+    reading the full image. Products are shared between the images of a file. Image
+    memory (including data decoded after insertion, e.g. by
+    `get_fdata()`, and derived products) is re-measured on every access, and the least
+    recently used images are evicted to stay within `max_bytes`. A budget of 0
+    disables caching.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._images: OrderedDict[ImageKey, nib.Nifti1Image] = OrderedDict()
+        self._products: dict[FileKey, ImageProducts] = {}
+
+    def get(
+        self,
+        path: Path,
+        load: Callable[[Path], nib.Nifti1Image],
+        reader: str | None = None,
+        access: ReadAccess = "full",
+    ) -> nib.Nifti1Image:
+        """Get the image for a path, calling `load(path)` on a cache miss.
+
+        Images are cached per `reader` and `access` pattern, which `load` should
+        use to read the image.
+        """
+        key = (*_cache_key(path), reader, access)
+        if key in self._images:
+            self.hits += 1
+            self._images.move_to_end(key)
+            logging.debug("Image cache hit: %s", path)
+            img = self._images[key]
+        else:
+            self.misses += 1
+            img = load(path)
+            if self.max_bytes > 0:
+                self._images[key] = img
+        self._evict()
+        return img
+
+    def get_products(self, path: Path, img: nib.Nifti1Image) -> ImageProducts:
+        """Get the derived products of an image, shared while the image is cached."""
+        key = _cache_key(path)
+        if not any(
+            image_key[:3] == key and cached is img
+            for image_key, cached in self._images.items()
+        ):
+            return ImageProducts(img)
+        if key not in self._products:
+            self._products[key] = ImageProducts(img)
+        return self._products[key]
+
+    @property
+    def nbytes(self) -> int:
+        """Current memory held by cached images and their products."""
+        return sum(_image_nbytes(img) for img in self._images.values()) + sum(
+            products.nbytes for products in self._products.values()
+        )
+
+    def clear(self) -> None:
+        """Drop all cached images."""
+        self._images.clear()
+        self._products.clear()
+
+    def log_stats(self) -> None:
+        """Log cache hit/miss statistics."""
+        logging.info(
+            "Image cache: %d hits, %d misses, %d evictions; %d images, %.1f MiB",
+            self.hits,
+            self.misses,
+            self.evictions,
+            len(self._images),
+            self.nbytes / 1024**2,
+        )
+
+    def _evict(self) -> None:
+        while self._images and self.nbytes > self.max_bytes:
+            key, _ = self._images.popitem(last=False)
+            if not any(image_key[:3] == key[:3] for image_key in self._images):
+                self._products.pop(key[:3], None)
+            self.evictions += 1
+            logging.debug("Image cache evicted: %s", key[0])
+
+    def __len__(self) -> int:
+        return len(self._images)
+
+    def __getstate__(self) -> dict:
+        # Images are process-local, workers start with an empty cache
+        state = self.__dict__.copy()
+        state["_images"] = OrderedDict()
+        state["_products"] = {}
+        return state
+
+
+def _cache_key(path: Path) -> FileKey:
+    stat = path.stat()
+    return (str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+
+
+def _image_nbytes(img: nib.Nifti1Image) -> int:
+    """Memory held by an image's decoded data (excluding memory-mapped data)."""
+    nbytes = 0
+    dataobj = img.dataobj
+    in_memory = isinstance(dataobj, np.ndarray)
+    if isinstance(dataobj, np.ndarray) and not isinstance(dataobj, np.memmap):
+        nbytes += dataobj.nbytes
+    fdata = getattr(img, "_fdata_cache", None)
+    # get_fdata() doesn't copy float64 array data
+    if fdata is not None and not (in_memory and np.may_share_memory(fdata, dataobj)):
+        nbytes += fdata.nbytes
+    return nbytes
@@ -3,6 +3,10 @@
 from argparse import ArgumentParser, Namespace, RawDescriptionHelpFormatter
 from collections.abc import Sequence
 from pathlib import Path
+from typing import get_args
+
+from niclips.io import reader_registry
+from niclips.typing import Precision
 
 
 class NiftyOneArgumentParser:
@@ -105,6 +109,32 @@ The different analysis levels perform the following tasks:
             "(default: %(default)d)",
             default=1,
         )
+        self.participant_level.add_argument(
+            "--reader",
+            metavar="READER",
+            type=str,
+            choices=["auto", *reader_registry],
+            default="auto",
+            help="nifti reader backend - one of [%(choices)s]; 'auto' selects per "
+            "image from file size, compression and view (default: %(default)s)",
+        )
+        self.participant_level.add_argument(
+            "--precision",
+            metavar="DTYPE",
+            type=str,
+            choices=get_args(Precision),
+            default="float64",
+            help="data type images are processed in - one of [%(choices)s]; "
+            "'native' keeps the on-disk data type (default: %(default)s)",
+        )
+        self.participant_level.add_argument(
+            "--cache-size",
+            metavar="MB",
+            type=int,
+            default=2048,
+            help="memory budget of the image cache shared across views - setting "
+            "to 0 disables caching (default: %(default)d)",
+        )
 
     def _add_group_launch_args(self) -> None:
         """Application group / launch CLI arguments."""
@@ -10,6 +10,7 @@ class QSpaceShells(View):
 
     entities = {"ext": ".mp4", "figure": "qspace"}
     view_fn = staticmethod(dwi.visualize_qspace)
+    products = ("dwi",)
 
 
 @register("three_view_shell_video")
@@ -18,6 +19,18 @@ class DwiPerShell(View):
 
     entities = {"ext": ".mp4", "figure": "bval"}
     view_fn = staticmethod(dwi.three_view_per_shell)
+    access = "stream"
+    products = ("dwi",)
+
+
+@register("three_view_shell_means")
+class DwiShellMeans(View):
+    """Visualize the mean image of each diffusion shell."""
+
+    entities = {"ext": ".png", "figure": "shellMeans"}
+    view_fn = staticmethod(dwi.three_view_shell_means)
+    access = "stream"
+    products = ("dwi",)
 
 
 @register("signal_per_volume")
@@ -26,3 +39,5 @@ class SignalPerVolume(View):
 
     entities = {"ext": ".mp4", "figure": "signalPerVolume"}
     view_fn = staticmethod(dwi.signal_per_volume)
+    access = "stream"
+    products = ("window", "dwi")
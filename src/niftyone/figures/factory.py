@@ -1,5 +1,6 @@
 """Factory for creating different figures."""
 
+import inspect
 import logging
 from abc import ABC
 from functools import reduce
@@ -13,7 +14,11 @@ import pandas as pd
 from bids2table import BIDSEntities, BIDSTable
 
 import niclips.image as noimg
-from niclips.io import load_nifti
+from niclips.defaults import get_default_coord
+from niclips.io import load_nifti, load_nifti_header, video_suffix
+from niclips.products import ImageProducts
+from niclips.typing import ReadAccess
+from niftyone.cache import ImageCache
 
 T = TypeVar("T", bound="View")
 
@@ -35,24 +40,30 @@ def create_view(
     view_kwargs: dict[str, Any] | None,
     join_entities: list[str],
     queries: list[str],
+    reader: str | None = None,
 ) -> "View":
     """Create a registered view."""
     view_kwargs = view_kwargs or {}
     try:
         view_cls = view_registry[view]
-        return view_cls(queries, join_entities, view_kwargs)
+        return view_cls(queries, join_entities, view_kwargs, reader=reader)
     except KeyError:
         raise KeyError(f"Factory for '{view}' for not found in registry.")
 
 
-def create_views(config: dict[str, Any]) -> list["View"]:
-    """Create selected views dynamically from config."""
+def create_views(config: dict[str, Any], reader: str | None = None) -> list["View"]:
+    """Create selected views dynamically from config.
+
+    The `reader` is the default Nifti reader backend, which can be overridden per view
+    with a `reader` key in the view config.
+    """
     return [
         create_view(
             view=view,
             view_kwargs=view_kwargs,
             join_entities=group.get("join_entities", ["sub", "ses"]),
             queries=group.get("queries", []),
+            reader=reader,
         )
         for group in config.get("figures", {}).values()
         for view, view_kwargs in group.get("views", {}).items()
@@ -64,14 +75,21 @@ class View(ABC, Generic[T]):
 
     entities: dict[str, Any] | None = None
     view_fn: Callable | None = None
+    # Declared image access pattern, used to select a reader backend
+    access: ReadAccess = "full"
+    # Derived image products the view needs, computed once and shared between views
+    products: tuple[str, ...] = ()
 
     def __init__(
         self,
         queries: list[str],
         join_entities: list[str] | None,
         view_kwargs: dict[str, Any],
+        reader: str | None = None,
     ) -> None:
+        view_kwargs = dict(view_kwargs)
         self.queries = queries
+        self.reader = view_kwargs.pop("reader", None) or reader
         self.view_kwargs = MappingProxyType(view_kwargs)  # Immutable dict
         self.join_entities = join_entities or []
 
@@ -80,6 +98,7 @@ class View(ABC, Generic[T]):
         table: BIDSTable,
         out_dir: Path,
         overwrite: bool,
+        cache: ImageCache | None = None,
     ) -> None:
         # Filters by entities via string query
         # First query is for main image, subsequent are for overlays
@@ -100,24 +119,56 @@ class View(ABC, Generic[T]):
 
         for inds in zip(*indices):
             records = [table.nested.loc[ind] for ind in inds]
-            self.create(records=records, out_dir=out_dir, overwrite=overwrite)
+            self.create(
+                records=records, out_dir=out_dir, overwrite=overwrite, cache=cache
+            )
 
-    def _load_image(self, record: pd.Series, log: bool = False) -> nib.Nifti1Image:
-        """Helper to load image."""
+    def _load_image(
+        self,
+        record: pd.Series,
+        log: bool = False,
+        cache: ImageCache | None = None,
+    ) -> nib.Nifti1Image:
+        """Helper to load image, reusing images cached by other views."""
         img_path = Path(record["finfo"]["file_path"])
         if log:
             logging.info("Processing %s", img_path)
-        img = load_nifti(img_path)
-
+        if cache is not None:
+            return cache.get(
+                img_path, self._read_image, reader=self.reader, access=self.access
+            )
+        return self._read_image(img_path)
+
+    def _read_image(self, img_path: Path) -> nib.Nifti1Image:
+        img = load_nifti(img_path, reader=self.reader, access=self.access)
         return noimg.to_ras(img)
 
-    def _load_overlays(self, overlay_records: list[pd.Series]) -> list[nib.Nifti1Image]:
+    def _load_overlays(
+        self,
+        overlay_records: list[pd.Series],
+        cache: ImageCache | None = None,
+    ) -> list[nib.Nifti1Image]:
         """Helper to load overlays."""
         return [
-            self._load_image(record=overlay_record)
+            self._load_image(record=overlay_record, cache=cache)
             for overlay_record in overlay_records
         ]
 
+    def _get_products(
+        self,
+        record: pd.Series,
+        img: nib.Nifti1Image,
+        cache: ImageCache | None = None,
+    ) -> ImageProducts:
+        """Helper to compute image products, reusing products cached by other views."""
+        img_path = Path(record["finfo"]["file_path"])
+        if cache is not None:
+            products = cache.get_products(img_path, img)
+        else:
+            products = ImageProducts(img)
+        products.compute(self.products)
+        return products
+
     def _figure_out_path(self, record: pd.Series, out_dir: Path) -> Path:
         """Generates the output figure file path."""
         figure_value = self.view_kwargs.get("figure")
@@ -126,31 +177,58 @@ class View(ABC, Generic[T]):
             **(self.entities if self.entities is not None else {}),
             **({"figure": figure_value} if figure_value is not None else {}),
         }
+        if figure_entities.get("ext") == ".mp4":
+            # Videos take the file format of their encoder profile's codec
+            figure_entities["ext"] = video_suffix(self.view_kwargs.get("encoder"))
 
         out_path = BIDSEntities.from_dict(figure_entities).to_path(prefix=out_dir)
         out_path.parent.mkdir(exist_ok=True, parents=True)
         return out_path
 
+    def _plan_view_kwargs(self, record: pd.Series) -> dict[str, Any]:
+        """Plans view arguments from the image header, before loading the image."""
+        if self.view_fn is None or "coord" in self.view_kwargs:
+            return {}
+        if "coord" not in inspect.signature(self.view_fn).parameters:
+            return {}
+        # Images are reoriented to RAS on loading, so plan for the reoriented header
+        header = load_nifti_header(Path(record["finfo"]["file_path"]))
+        return {"coord": get_default_coord(noimg.ras_header(header))}
+
     def create(
         self,
         records: list[pd.Series],
         out_dir: Path,
         overwrite: bool,
+        cache: ImageCache | None = None,
     ) -> None:
         """Create and save figure from a list of relevant records."""
         if not self.view_fn:
             raise ValueError("No view factory provided, unable to create view.")
 
-        img = self._load_image(record=records[0], log=True)
+        # Plan the output before touching any image data
+        out_path = self._figure_out_path(records[0], out_dir)
+        if out_path.exists() and not overwrite:
+            logging.info("Skipping existing %s", out_path)
+            return
+        planned_kwargs = self._plan_view_kwargs(records[0])
+
+        img = self._load_image(record=records[0], log=True, cache=cache)
+        products = self._get_products(record=records[0], img=img, cache=cache)
         overlays = (
-            self._load_overlays(overlay_records=records[1:])
+            self._load_overlays(overlay_records=records[1:], cache=cache)
             if len(records) > 1
             else None
         )
-        out_path = self._figure_out_path(records[0], out_dir)
 
-        if not out_path.exists() or overwrite:
-            logging.info("Creating %s", out_path)
-            self.view_fn(img, out_path, overlay=overlays, **self.view_kwargs)
+        logging.info("Creating %s", out_path)
+        self.view_fn(
+            img,
+            out_path,
+            overlay=overlays,
+            products=products,
+            **planned_kwargs,
+            **self.view_kwargs,
+        )
 
         plt.close("all")
@@ -10,6 +10,7 @@ class CarpetPlot(View):
 
     entities = {"ext": ".png", "figure": "carpet"}
     view_fn = staticmethod(bold.carpet_plot)
+    products = ("mean", "std", "mask", "mean_window")
 
 
 @register("mean_std")
@@ -18,3 +19,4 @@ class MeanStd(View):
 
     entities = {"ext": ".png", "figure": "meanStd"}
     view_fn = staticmethod(bold.bold_mean_std)
+    products = ("mean", "std", "mask", "mean_window")
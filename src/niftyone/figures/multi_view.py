@@ -10,6 +10,7 @@ class ThreeView(View):
 
     entities = {"ext": ".png", "figure": "threeView"}
     view_fn = staticmethod(multi_view.three_view_frame)
+    access = "slices"
 
 
 @register("slice_video")
@@ -26,3 +27,4 @@ class ThreeViewVideo(View):
 
     entities = {"ext": ".mp4", "figure": "threeViewVideo"}
     view_fn = staticmethod(multi_view.three_view_video)
+    access = "stream"
@@ -5,6 +5,7 @@ from pathlib import Path
 
 from bids2table import BIDSEntities, BIDSTable
 
+from niftyone.cache import DEFAULT_CACHE_BYTES, ImageCache
 from niftyone.figures.factory import View
 from niftyone.metrics import create_niftyone_metrics_tsv
 
@@ -20,11 +21,14 @@ class Runner:
         out_dir: Path,
         qc_dir: Path | None,
         overwrite: bool,
+        cache_bytes: int = DEFAULT_CACHE_BYTES,
     ) -> None:
         self.figure_views = figure_views
         self.out_dir = out_dir
         self.qc_dir = qc_dir
         self.overwrite = overwrite
+        # Shared by all views (and subjects) processed by this worker
+        self.image_cache = ImageCache(max_bytes=cache_bytes)
 
     def create_figures(self) -> None:
         """Generate figures from dataset."""
@@ -39,7 +43,13 @@ class Runner:
             "\n\t".join(self.table.finfo["file_path"].tolist()),
         )
         for figure_view in self.figure_views:
-            figure_view(table=images, out_dir=self.out_dir, overwrite=self.overwrite)
+            figure_view(
+                table=images,
+                out_dir=self.out_dir,
+                overwrite=self.overwrite,
+                cache=self.image_cache,
+            )
+        self.image_cache.log_stats()
 
     def update_metrics(self) -> None:
         """Generate / update QC metrics for dataset."""
@@ -1,6 +1,7 @@
 """Tests functionality of figure generation of bold images (not figure content)."""
 
 from pathlib import Path
+from unittest.mock import patch
 
 import nibabel as nib
 import numpy as np
@@ -23,12 +24,54 @@ class TestClusterTimeSeries:
         clustered_img = nobold.cluster_timeseries(nii_bold)
         assert isinstance(clustered_img, nib.Nifti1Image)
 
+    @pytest.mark.parametrize("method", [("minibatch"), ("tsnr"), ("intensity")])
+    def test_method(self, nii_bold: nib.Nifti1Image, method: str):
+        clustered_img = nobold.cluster_timeseries(nii_bold, method=method)
+        labels = clustered_img.get_fdata()
+
+        assert set(np.unique(labels[~np.isnan(labels)])) <= {0, 1, 2}
+
+    def test_invalid_method(self, nii_bold: nib.Nifti1Image):
+        with pytest.raises(ValueError, match=".*Invalid clustering.*"):
+            nobold.cluster_timeseries(nii_bold, method="invalid")
+
+    def test_cache(
+        self,
+        nii_bold: nib.Nifti1Image,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setenv("NICLIPS_CACHE_DIR", str(tmp_path / "cache"))
+        nib.save(nii_bold, (nii_fpath := tmp_path / "test_bold.nii.gz"))
+        nii_bold.set_filename(str(nii_fpath))
+
+        nobold.cluster_timeseries(nii_bold)
+        assert not (tmp_path / "cache" / "labels").exists()
+
+        clustered_img = nobold.cluster_timeseries(nii_bold, cache=True)
+        assert len(list((tmp_path / "cache" / "labels").iterdir())) == 1
+        with patch.object(nobold, "KMeans", side_effect=AssertionError):
+            cached_img = nobold.cluster_timeseries(nii_bold, cache=True)
+
+        np.testing.assert_array_equal(cached_img.get_fdata(), clustered_img.get_fdata())
+
 
 class TestCarpetPlot:
     def test_default(self, nii_bold: nib.Nifti1Image):
         carpet_plot = nobold.carpet_plot(nii_bold)
 
+        assert isinstance(carpet_plot, Image.Image)
+
+    def test_matplotlib(self, nii_bold: nib.Nifti1Image, tmp_path: Path):
+        out_fpath = tmp_path / "test_carpet_plot.png"
+        carpet_plot = nobold.carpet_plot(nii_bold, out=out_fpath, backend="matplotlib")
+
         assert isinstance(carpet_plot, Figure)
+        assert out_fpath.exists()
+
+    def test_invalid_backend(self, nii_bold: nib.Nifti1Image):
+        with pytest.raises(ValueError, match=".*Invalid carpet.*"):
+            nobold.carpet_plot(nii_bold, backend="invalid")
 
     def test_label(self, nii_bold: nib.Nifti1Image):
         label_img = nib.Nifti1Image(
@@ -36,7 +79,12 @@ class TestCarpetPlot:
         )
         carpet_plot = nobold.carpet_plot(nii_bold, label=label_img)
 
-        assert isinstance(carpet_plot, Figure)
+        assert isinstance(carpet_plot, Image.Image)
+
+    def test_cluster_method(self, nii_bold: nib.Nifti1Image):
+        carpet_plot = nobold.carpet_plot(nii_bold, cluster_method="tsnr")
+
+        assert isinstance(carpet_plot, Image.Image)
 
     def test_save(self, nii_bold: nib.Nifti1Image, tmp_path: Path):
         out_fpath = tmp_path / "test_carpet_plot.png"
@@ -3,9 +3,9 @@ from pathlib import Path
 import nibabel as nib
 import numpy as np
 import pytest
-from matplotlib.animation import FuncAnimation
 
 from niclips.figures import dwi as nodwi
+from niclips.products import ImageProducts
 
 
 @pytest.fixture
@@ -67,12 +67,73 @@ def dwi_nii(tmp_path: Path) -> nib.Nifti1Image:
     return img
 
 
+class TestEquateBvals:
+    def test_equate(self):
+        bvals = np.array([5, 1600, 1595, 1605, 1620, 0, 3000])
+        equated = nodwi._equate_bvals(bvals, thresh=10)
+
+        np.testing.assert_array_equal(equated, [0, 1595, 1595, 1595, 1620, 0, 3000])
+
+
+class TestDwiSession:
+    def test_shells(self, dwi_nii: nib.Nifti1Image):
+        session = ImageProducts(dwi_nii)["dwi"]
+
+        np.testing.assert_array_equal(session.shell_values, [5, 1595])
+        np.testing.assert_array_equal(session.volumes(5), [0])
+        assert session.bvecs.shape == (3, 11)
+
+    def test_thresh(self, dwi_nii: nib.Nifti1Image):
+        products = ImageProducts(dwi_nii)
+        session = nodwi.DwiSession.from_products(products, thresh=5)
+
+        assert session is not products["dwi"]
+        assert len(session.shell_values) == 3
+
+    def test_no_sidecars(self, nii_4d_img: nib.Nifti1Image):
+        with pytest.raises(ValueError, match=".*without a file"):
+            ImageProducts(nii_4d_img)["bvals"]
+
+    def test_summaries(self, dwi_nii: nib.Nifti1Image):
+        session = ImageProducts(dwi_nii)["dwi"]
+        data = dwi_nii.get_fdata()
+
+        np.testing.assert_allclose(session.signal, data.mean(axis=(0, 1, 2)))
+        np.testing.assert_allclose(session.shell_means[5], data[..., 0])
+        np.testing.assert_allclose(session.shell_means[1595], data[..., 1:].mean(-1))
+
+    def test_shell_means_figure(self, dwi_nii: nib.Nifti1Image, tmp_path: Path):
+        out_fpath = tmp_path / "test_shellMeans.png"
+        nodwi.three_view_shell_means(dwi_nii, out=out_fpath)
+
+        assert out_fpath.exists()
+
+
 class TestQSpaceShells:
     @pytest.mark.parametrize("thresh", [(5), (10), (30)])
-    def test_default(self, dwi_nii: nib.Nifti1Image, thresh: int):
-        ani = nodwi.visualize_qspace(dwi=dwi_nii, thresh=thresh)
+    def test_default(self, dwi_nii: nib.Nifti1Image, thresh: int, tmp_path: Path):
+        out_fpath = tmp_path / "test_qspace.mp4"
+        nodwi.visualize_qspace(dwi=dwi_nii, out=out_fpath, thresh=thresh, num_frames=8)
+
+        assert out_fpath.exists()
+
+    def test_frames(self, dwi_nii: nib.Nifti1Image):
+        bvecs = np.loadtxt(dwi_nii.get_filename().replace(".nii.gz", ".bvec"))
+        bvals = np.loadtxt(dwi_nii.get_filename().replace(".nii.gz", ".bval"))
+        shells = nodwi._equate_bvals(bvals, thresh=10)
+        frames = [
+            frame.copy()
+            for frame in nodwi.iter_qspace_frames(
+                bvecs, shells, num_frames=12, size=63, batch_size=5
+            )
+        ]
 
-        assert isinstance(ani, FuncAnimation)
+        assert len(frames) == 12
+        assert all(frame.shape == (64, 64, 3) for frame in frames)
+        assert all(frame.dtype == np.uint8 for frame in frames)
+        # Points are drawn, and rotate
+        assert frames[0].any()
+        assert not np.array_equal(frames[0], frames[3])
 
     def test_save(self, dwi_nii: nib.Nifti1Image, tmp_path: Path):
         out_fpath = tmp_path / "test_qspace.mp4"
@@ -104,6 +165,16 @@ class TestDwiPerShell:
             ]
         )
 
+    def test_lazy(self, dwi_nii: nib.Nifti1Image, tmp_path: Path):
+        nib.save(dwi_nii, (nii_fpath := tmp_path / "test.nii.gz"))
+        lazy_nii = nib.load(nii_fpath)
+        dwis = nodwi.three_view_per_shell(dwi=lazy_nii, thresh=10)
+        expected = nodwi.three_view_per_shell(dwi=dwi_nii, thresh=10)
+
+        assert len(dwis) == len(expected)
+        for dwi, exp_dwi in zip(dwis, expected):
+            np.testing.assert_allclose(dwi.get_fdata(), exp_dwi.get_fdata())
+
     def test_invalid_shape(self, dwi_nii: nib.Nifti1Image):
         test_nii = nib.Nifti1Image(
             dataobj=np.random.rand(10, 10, 10, 5, 2), affine=dwi_nii.affine
@@ -121,3 +192,32 @@ class TestDwiSignalPerVolume:
         nodwi.signal_per_volume(dwi=nii_4d_img, out=out_fpath)
 
         assert out_fpath.exists()
+
+    def test_frames(self, nii_4d_img: nib.Nifti1Image):
+        signal = nii_4d_img.get_fdata().mean(axis=(0, 1, 2))
+        frames = [
+            frame.copy()
+            for frame in nodwi.iter_signal_frames(
+                nii_4d_img,
+                signal=signal,
+                coord=(5, 5, 5),
+                window=(0.0, 10.0),
+                batch_size=2,
+            )
+        ]
+
+        assert len(frames) == nii_4d_img.shape[-1]
+        assert all(frame.shape == frames[0].shape for frame in frames)
+        assert frames[0].dtype == np.uint8 and frames[0].shape[-1] == 3
+        assert all(dim % 2 == 0 for dim in frames[0].shape[:2])
+        # The marker moves between frames
+        assert not np.array_equal(frames[0], frames[1])
+
+    def test_trace_markers(self):
+        signal = np.array([0.0, 5.0, 10.0, 0.0])
+        background, markers = nodwi._signal_trace(signal, size=(151, 101))
+
+        assert all(dim % 2 == 0 for dim in background.shape[:2])
+        assert markers.shape == (4, 2)
+        assert (markers >= 0).all()
+        assert (markers < background.shape[:2]).all()
@@ -1,12 +1,14 @@
 """Tests functionality of multi-view figure generation (not figure content)."""
 
 from pathlib import Path
+from unittest.mock import patch
 
 import nibabel as nib
 import numpy as np
 import pytest
 from PIL import Image
 
+import niclips.image as noimg
 from niclips.figures import multi_view as mv
 
 
@@ -62,6 +64,24 @@ class TestMultiViewFrame:
 
         assert out_path.exists()
 
+    def test_lazy_slices(self, nii_3d_img: nib.Nifti1Image):
+        # Without a shared renderer, only the panels' planes are rendered
+        with patch("niclips.image.VolumeRenderer") as mock_renderer:
+            mv.multi_view_frame(img=nii_3d_img, coords=[(0, 0, 0)], axes=[0, 1])
+
+        mock_renderer.assert_not_called()
+
+    def test_renderer(self, nii_3d_img: nib.Nifti1Image):
+        renderer = noimg.VolumeRenderer(nii_3d_img, vmin=0.0, vmax=1.0)
+        frame = mv.multi_view_frame(
+            img=nii_3d_img, coords=[(5, 5, 5)], axes=[2], renderer=renderer
+        )
+        expected = mv.multi_view_frame(
+            img=nii_3d_img, coords=[(5, 5, 5)], axes=[2], vmin=0.0, vmax=1.0
+        )
+
+        assert frame.size == expected.size
+
 
 class TestThreeViewFrame:
     def test_3d(self, nii_3d_img: nib.Nifti1Image):
@@ -92,6 +112,21 @@ class TestThreeViewVideo:
         mv.three_view_video(nii_4d_img, out=out_fpath, overlay=nii_4d_img)
         assert out_fpath.exists()
 
+    @pytest.mark.parametrize("overlay", [(False), (True)])
+    def test_stream(self, nii_4d_img: nib.Nifti1Image, tmp_path: Path, overlay: bool):
+        nib.save(nii_4d_img, (nii_fpath := tmp_path / "test.nii.gz"))
+        lazy_img = nib.load(nii_fpath)
+        out_fpath = tmp_path / "test_three_view.mp4"
+        mv.three_view_video(
+            lazy_img,
+            out=out_fpath,
+            overlay=nii_4d_img if overlay else None,
+            batch_size=2,
+            stream=True,
+        )
+        assert out_fpath.exists()
+        assert not lazy_img.in_memory
+
 
 class TestSliceVideo:
     def test_3d(self, nii_3d_img: nib.Nifti1Image, tmp_path: Path):
@@ -1,8 +1,8 @@
 import numpy as np
 import pytest
-from PIL import Image, ImageFont
+from PIL import Image, ImageDraw, ImageFont
 
-from niclips.image._annotate import _get_font, annotate
+from niclips.image._annotate import _get_font, _render_label, annotate, blit_text
 
 
 class TestAnnotate:
@@ -33,6 +33,45 @@ class TestAnnotate:
         with pytest.raises(ValueError, match="Unsupported loc.*"):
             annotate(img=img_pil, text="Text", loc="Test")
 
+    def test_matches_draw_text(self):
+        img = np.random.default_rng(0).integers(0, 255, (50, 80, 3), dtype=np.uint8)
+        expected = Image.fromarray(img)
+        ImageDraw.Draw(expected).text(
+            (78, 2), "T=17", fill="white", font=_get_font(size=14), anchor="rt"
+        )
+
+        new_img = annotate(img=img, text="T=17", loc="upper right", size=14)
+        np.testing.assert_array_equal(np.asarray(new_img), np.asarray(expected))
+
+    def test_cached(self, img_pil: Image.Image):
+        _render_label.cache_clear()
+        for _ in range(3):
+            annotate(img=img_pil, text="Z=42", loc="lower right", inplace=True)
+        assert _render_label.cache_info().misses == 1
+
+
+class TestBlitText:
+    @pytest.mark.parametrize("shape", [(50, 80), (50, 80, 3)])
+    def test_matches_annotate(self, shape: tuple[int, ...]):
+        img = np.random.default_rng(0).integers(0, 255, shape, dtype=np.uint8)
+        expected = annotate(img=img, text="L", loc="lower left", size=14)
+
+        new_img = blit_text(img, text="L", loc="lower left", size=14)
+        assert new_img is img
+        np.testing.assert_array_equal(new_img, np.asarray(expected))
+
+    def test_alpha(self):
+        img = np.zeros((50, 80, 4), dtype=np.uint8)
+        blit_text(img, text="Text", loc="upper left", size=14)
+
+        assert img[..., :3].max() == 255
+        assert img[..., 3].max() == 0
+
+    def test_clipped(self):
+        img = np.zeros((4, 4, 3), dtype=np.uint8)
+        blit_text(img, text="Long text", loc="upper right", size=14)
+        assert img.shape == (4, 4, 3)
+
 
 def test_get_font():
     font = _get_font(size=12)
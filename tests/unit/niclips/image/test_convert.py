@@ -1,5 +1,6 @@
 from copy import deepcopy
 
+import matplotlib as mpl
 import nibabel as nib
 import numpy as np
 import pytest
@@ -37,6 +38,27 @@ class TestTopil:
         assert isinstance(img, Image.Image)
 
 
+class TestColormap:
+    @pytest.mark.parametrize("cmap", ["gray", "turbo"])
+    def test_matches_matplotlib(self, cmap: str):
+        data = np.random.default_rng(0).random((20, 30))
+        data[0, :3] = [0.0, 1.0, np.nan]
+        expected = mpl.colormaps[cmap](data, bytes=True)
+
+        colored = noconvert.colormap(data, cmap=cmap)
+        assert colored.dtype == np.uint8
+        np.testing.assert_array_equal(colored, expected)
+
+    def test_depth(self):
+        data = np.linspace(0, 1, 100)
+        colored = noconvert.colormap(data, depth=4)
+        assert len(np.unique(colored[:, 0])) == 4
+
+    def test_lut_cached(self):
+        assert noconvert.get_lut("gray") is noconvert.get_lut("gray")
+        assert noconvert.get_lut("gray", depth=16).shape == (17,)
+
+
 class TestOverlay:
     def test_no_alpha(self, img_pil: Image.Image):
         img1 = img_pil
@@ -57,6 +79,39 @@ class TestOverlay:
         assert isinstance(new_img, Image.Image)
 
 
+class TestComposite:
+    def test_multiple_overlays(self):
+        base = np.zeros((4, 4, 3), dtype=np.uint8)
+        overlays = [
+            np.full((4, 4, 3), 200, dtype=np.uint8),
+            np.full((4, 4, 3), 100, dtype=np.uint8),
+        ]
+        img = noconvert.composite(base, overlays, alpha=[0.5, 0.5])
+
+        # (0 + 200) / 2 = 100, then (100 + 100) / 2 = 100
+        assert img.dtype == np.uint8
+        assert np.all(img == 100)
+
+    def test_transparent_overlay(self):
+        base = np.full((4, 4, 4), 50, dtype=np.uint8)
+        overlay = np.full((4, 4, 4), 250, dtype=np.uint8)
+        overlay[..., 3] = 255
+        overlay[0, 0, 3] = 0
+        img = noconvert.composite(base, [overlay], alpha=None)
+
+        assert np.all(img[0, 0] == 50)
+        assert np.all(img[1:, 1:, :3] == 250)
+        # Base alpha is kept
+        assert np.all(img[..., 3] == 50)
+
+    def test_no_overlays(self, img_array: np.ndarray):
+        base = (255 * img_array).astype(np.uint8)
+        img = noconvert.composite(base, [])
+
+        assert img is not base
+        assert np.array_equal(img, base)
+
+
 class TestNormalize:
     def test_data_only(self, img_array: np.ndarray):
         img_array[0, 0, 0] = 10
@@ -107,6 +162,9 @@ class TestToRas:
 
         assert isinstance(img, nib.Nifti1Image)
         assert not np.allclose(nii_3d_non_iso_ras.affine, img.affine)
+        np.testing.assert_allclose(
+            img.affine, nib.funcs.as_closest_canonical(nii_3d_non_iso_ras).affine
+        )
 
 
 def test_reorient(img_array: np.ndarray):
@@ -0,0 +1,62 @@
+from pathlib import Path
+
+import nibabel as nib
+import numpy as np
+import pytest
+
+import niclips.image._orient as noorient
+
+
+@pytest.fixture
+def nii_4d_lps() -> nib.Nifti1Image:
+    rng = np.random.default_rng(42)
+    # Axes are (P, L, S), i.e. permuted and flipped from RAS
+    affine = np.array(
+        [
+            [0.0, -2.0, 0.0, 90.0],
+            [-3.0, 0.0, 0.0, 100.0],
+            [0.0, 0.0, 4.0, -110.0],
+            [0.0, 0.0, 0.0, 1.0],
+        ]
+    )
+    return nib.Nifti1Image(rng.random((6, 5, 4, 3)), affine=affine)
+
+
+class TestAsClosestRas:
+    def test_ras(self, nii_3d_img: nib.Nifti1Image):
+        assert noorient.as_closest_ras(nii_3d_img) is nii_3d_img
+
+    def test_in_memory(self, nii_4d_lps: nib.Nifti1Image):
+        img = noorient.as_closest_ras(nii_4d_lps)
+        expected = nib.funcs.as_closest_canonical(nii_4d_lps)
+
+        np.testing.assert_allclose(img.affine, expected.affine)
+        np.testing.assert_allclose(img.header.get_zooms(), expected.header.get_zooms())
+        assert np.shares_memory(img.dataobj, nii_4d_lps.dataobj)
+        np.testing.assert_array_equal(img.get_fdata(), expected.get_fdata())
+
+    def test_lazy(self, tmp_path: Path, nii_4d_lps: nib.Nifti1Image):
+        nib.save(nii_4d_lps, (nii_fpath := tmp_path / "test.nii"))
+        lazy_img = noorient.as_closest_ras(nib.load(nii_fpath))
+        expected = nib.funcs.as_closest_canonical(nii_4d_lps).get_fdata()
+
+        assert isinstance(lazy_img.dataobj, noorient.ReorientedArray)
+        assert not lazy_img.in_memory
+        assert lazy_img.shape == expected.shape
+        for slicer in [
+            (..., 1),
+            (slice(1, 4), 2, slice(None, None, -1), 0),
+            (slice(None, None, 2), slice(None), 1),
+            (-1, slice(3, 0, -2)),
+        ]:
+            np.testing.assert_allclose(lazy_img.dataobj[slicer], expected[slicer])
+        np.testing.assert_allclose(lazy_img.get_fdata(), expected)
+
+
+def test_ras_header(nii_4d_lps: nib.Nifti1Image):
+    header = noorient.ras_header(nii_4d_lps.header)
+    expected = nib.funcs.as_closest_canonical(nii_4d_lps)
+
+    np.testing.assert_allclose(header.get_best_affine(), expected.affine)
+    assert header.get_data_shape() == expected.shape
+    assert header.get_data_dtype() == nii_4d_lps.get_data_dtype()
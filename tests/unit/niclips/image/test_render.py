@@ -1,10 +1,13 @@
 from unittest.mock import MagicMock, patch
 
 import nibabel as nib
+import numpy as np
 import pytest
 from PIL import Image
 
-from niclips.image._render import render_slice
+from niclips.image._convert import colormap
+from niclips.image._render import VolumeRenderer, render_slice, render_slices
+from niclips.image._slice import index_img
 
 
 class TestRenderSlice:
@@ -32,3 +35,134 @@ class TestRenderSlice:
         )
 
         assert isinstance(img, Image.Image)
+
+    def test_single_resize(self, nii_3d_non_iso_ras: nib.Nifti1Image):
+        resize = Image.Image.resize
+        with patch.object(
+            Image.Image, "resize", autospec=True, side_effect=resize
+        ) as mock_resize:
+            img = render_slice(
+                nii_3d_non_iso_ras, axis=2, coord=(0, 0, 0), height=64, annotate=False
+            )
+
+        mock_resize.assert_called_once()
+        assert mock_resize.call_args.kwargs["reducing_gap"] is not None
+        # Non-isotropic 10x10 slice (2mm x 3mm)
+        assert img.size == (42, 64)
+
+    @pytest.mark.parametrize("transparent", [("nan"), ("zero")])
+    def test_transparent(self, nii_3d_img: nib.Nifti1Image, transparent: str):
+        data = np.zeros(nii_3d_img.shape)
+        data[:5] = np.nan
+        data[5:] = 1.0
+        data[8:] = 0.0
+        label = nib.Nifti1Image(data, nii_3d_img.affine)
+        img = render_slice(
+            label, axis=2, coord=(0, 0, 0), height=None, transparent=transparent
+        )
+
+        alpha = np.asarray(img)[..., 3]
+        assert img.mode == "RGBA"
+        assert alpha.min() == 0
+        assert alpha.max() == 255
+
+
+class TestRenderSlices:
+    @pytest.mark.parametrize("axis", [(0), (1), (2)])
+    def test_matches_render_slice(self, nii_4d_img: nib.Nifti1Image, axis: int):
+        frames = render_slices(
+            nii_4d_img, axis=axis, coord=(5, 5, 5), vmin=0.0, vmax=10.0, height=64
+        )
+        assert frames.shape[0] == nii_4d_img.shape[-1]
+        assert frames.dtype == np.uint8
+
+        for idx, frame in enumerate(frames):
+            expected = render_slice(
+                index_img(nii_4d_img, idx),
+                axis=axis,
+                coord=(5, 5, 5),
+                vmin=0.0,
+                vmax=10.0,
+                height=64,
+                annotate=False,
+            )
+            assert frame.shape[:2] == (expected.height, expected.width)
+            assert np.all(frame[..., 3] == 255)
+            # Single pass resampling differs slightly from resizing twice
+            diff = np.abs(frame[..., :3].astype(int) - np.asarray(expected))
+            assert diff.mean() < 2.0
+
+    def test_volumes(self, nii_4d_img: nib.Nifti1Image):
+        frames = render_slices(
+            nii_4d_img, axis=2, coord=(5, 5, 5), volumes=slice(1, 2), height=None
+        )
+        assert frames.shape == (1, 10, 10, 4)
+        assert frames[0, 4, 5, 0] == 255
+
+    @pytest.mark.parametrize("height", [None, 40])
+    def test_nan(self, height: int | None):
+        data = np.ones((10, 10, 10, 2), dtype=np.float32)
+        data[3, 4, 5] = np.nan
+        img = nib.Nifti1Image(data, affine=np.eye(4))
+        frames = render_slices(
+            img, axis=2, coord=(5, 5, 5), vmin=0.0, vmax=2.0, height=height
+        )
+        bad = np.all(frames == colormap(np.array([np.nan]))[0], axis=-1)
+
+        if height is None:
+            # Voxel (x=3, y=4) is at row 9 - 4, column 3
+            expected = np.zeros((2, 10, 10), dtype=bool)
+            expected[:, 5, 3] = True
+            assert np.array_equal(bad, expected)
+        else:
+            assert bad[:, 20:24, 12:16].all()
+            assert 0 < bad.sum() < bad.size / 16
+
+
+class TestVolumeRenderer:
+    @pytest.mark.parametrize("axis", [(0), (1), (2)])
+    def test_matches_render_slice(self, nii_4d_img: nib.Nifti1Image, axis: int):
+        renderer = VolumeRenderer(nii_4d_img, vmin=0.0, vmax=1.0)
+        img = renderer.select(1).render(axis=axis, coord=(0, 0, 0), height=64)
+        expected = render_slice(
+            index_img(nii_4d_img, idx=1),
+            axis=axis,
+            coord=(0, 0, 0),
+            vmin=0.0,
+            vmax=1.0,
+            height=64,
+        )
+
+        assert renderer.data.dtype == np.uint8
+        assert img.size == expected.size
+        diff = np.abs(np.asarray(img, dtype=int) - np.asarray(expected))
+        assert diff.max() <= 1
+
+    def test_render_stack(self, nii_4d_img: nib.Nifti1Image):
+        renderer = VolumeRenderer(nii_4d_img, vmin=0.0, vmax=1.0)
+        frames = renderer.render_stack(axis=2, coord=(0, 0, 0), volumes=slice(1, 3))
+        expected = render_slices(
+            nii_4d_img, axis=2, coord=(0, 0, 0), vmin=0.0, vmax=1.0, volumes=slice(1, 3)
+        )
+
+        assert frames.shape == expected.shape
+        assert np.abs(frames.astype(int) - expected).max() <= 2
+
+    def test_select(self, nii_4d_img: nib.Nifti1Image):
+        renderer = VolumeRenderer(nii_4d_img)
+        volume = renderer.select(None)
+
+        assert volume.shape == nii_4d_img.shape[:3]
+        assert np.shares_memory(volume.data, renderer.data)
+
+    def test_transparent(self, nii_3d_img: nib.Nifti1Image):
+        data = np.zeros(nii_3d_img.shape)
+        data[5:] = 2.0
+        label = nib.Nifti1Image(data, nii_3d_img.affine)
+        renderer = VolumeRenderer(label, cmap="brg", transparent="zero")
+        img = renderer.render(axis=2, coord=(0, 0, 0), height=None, annotate=False)
+
+        alpha = np.asarray(img)[..., 3]
+        assert img.mode == "RGBA"
+        assert renderer.window == (2.0, 2.0)
+        assert alpha.min() == 0 and alpha.max() == 255
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from niclips.image._convert import scale, to_iso
+from niclips.image._resample import panel_size, resize_stack
+
+
+class TestPanelSize:
+    @pytest.mark.parametrize("axis", [0, 1, 2])
+    @pytest.mark.parametrize("height", [None, 256, 75])
+    def test_matches_two_step(self, axis: int, height: int | None):
+        pixdims = (2.0, 3.0, 4.0)
+        img = Image.new("RGB", (37, 23))
+        expected = to_iso(img, pixdims=pixdims, axis=axis)
+        if height:
+            expected = scale(expected, target_height=height)
+
+        assert panel_size((37, 23), pixdims, axis=axis, height=height) == expected.size
+
+
+class TestResizeStack:
+    @pytest.mark.parametrize("size", [(64, 48), (20, 10)])
+    def test_matches_pil(self, size: tuple[int, int]):
+        rng = np.random.default_rng(0)
+        data = rng.random((2, 32, 40)).astype(np.float32)
+        resized = resize_stack(data, size)
+
+        assert resized.shape == (2, size[1], size[0])
+        for frame, resized_frame in zip(data, resized):
+            expected = np.asarray(Image.fromarray(frame).resize(size, Image.BICUBIC))
+            np.testing.assert_allclose(resized_frame, expected, atol=1e-4)
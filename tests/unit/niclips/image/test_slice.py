@@ -1,3 +1,5 @@
+from pathlib import Path
+
 import nibabel as nib
 import numpy as np
 import pytest
@@ -7,6 +9,7 @@ from niclips.image._slice import (
     index_img,
     slice_array,
     slice_volume,
+    take_volumes,
 )
 from niclips.typing import NiftiLike
 
@@ -24,6 +27,25 @@ class TestSliceVolume:
         slc = slice_volume(img_array)
         assert isinstance(slc, np.ndarray)
 
+    @pytest.mark.parametrize("axis", [(0), (1), (2)])
+    def test_lazy_nii(self, tmp_path: Path, nii_4d_img: nib.Nifti1Image, axis: int):
+        nib.save(nii_4d_img, (nii_fpath := (tmp_path / "test.nii")))
+        lazy_img = nib.load(nii_fpath)
+
+        slc = slice_volume(lazy_img, coord=(5, 5, 5), axis=axis, idx=1)
+        expected = slice_volume(nii_4d_img, coord=(5, 5, 5), axis=axis, idx=1)
+        assert not lazy_img.in_memory
+        np.testing.assert_array_equal(slc, expected)
+
+    @pytest.mark.parametrize("coord,edge", [((27, 5, 5), 9), ((-1, 5, 5), 0)])
+    def test_out_of_bounds(self, nii_3d_img: nib.Nifti1Image, coord: tuple, edge: int):
+        slc = slice_volume(nii_3d_img, coord=coord, axis=0)
+        expected = slice_volume(nii_3d_img, coord=(edge, 5, 5), axis=0)
+        np.testing.assert_array_equal(slc, expected)
+
+        with pytest.raises(IndexError):
+            slice_volume(nii_3d_img, coord=coord, axis=0, strict=True)
+
 
 class TestIndexImg:
     @pytest.mark.parametrize("idx", [(None), (0)])
@@ -31,11 +53,37 @@ class TestIndexImg:
         slc = index_img(nii_4d_img, idx=idx)
         assert isinstance(slc, NiftiLike)
 
+    def test_index_4d_arr(self, nii_4d_img: nib.Nifti1Image):
+        slc = index_img(nii_4d_img.get_fdata(), idx=1)
+        assert isinstance(slc, np.ndarray)
+        assert slc.shape == nii_4d_img.shape[:3]
+
     def test_index_3d_nii(self, nii_3d_img: nib.Nifti1Image):
         with pytest.raises(ValueError):
             index_img(nii_3d_img)
 
 
+class TestTakeVolumes:
+    def test_lazy(self, tmp_path: Path, nii_4d_img: nib.Nifti1Image):
+        nib.save(nii_4d_img, (nii_fpath := (tmp_path / "test.nii")))
+        lazy_img = nib.load(nii_fpath)
+
+        subset = take_volumes(lazy_img, [2, 1])
+        assert subset.shape == (10, 10, 10, 2)
+        assert not subset.in_memory
+        np.testing.assert_array_equal(
+            subset.get_fdata(), nii_4d_img.get_fdata()[..., [2, 1]]
+        )
+        np.testing.assert_array_equal(
+            subset.dataobj[5, :, 1:3, 1], nii_4d_img.get_fdata()[5, :, 1:3, 1]
+        )
+
+    def test_index(self, nii_4d_img: nib.Nifti1Image):
+        subset = take_volumes(nii_4d_img, [1])
+        slc = index_img(subset, idx=0)
+        np.testing.assert_array_equal(slc.get_fdata(), nii_4d_img.get_fdata()[..., 1])
+
+
 class TestCropMiddleThird:
     @pytest.mark.parametrize("axis", [(None), ((0, 1, 2))])
     def test_crop_middle_third(
@@ -1,7 +1,7 @@
 import numpy as np
 import pytest
 
-from niclips.image._stack import image_grid, stack_images
+from niclips.image._stack import GridLayout, image_grid, stack_frames, stack_images
 
 
 class TestImageGrid:
@@ -43,3 +43,51 @@ class TestStackImages:
     def test_invalid_axis(self, img_array: np.ndarray):
         with pytest.raises(AssertionError, match="Invalid axis.*"):
             stack_images([img_array], axis=2)
+
+
+class TestStackFrames:
+    def test_matches_stack_images(self):
+        rng = np.random.default_rng(0)
+        stacks = [
+            rng.integers(0, 255, (2, 10, 12, 3), dtype=np.uint8),
+            rng.integers(0, 255, (2, 7, 5, 3), dtype=np.uint8),
+        ]
+        frames = stack_frames(stacks, pad=2)
+
+        for idx, frame in enumerate(frames):
+            expected = stack_images([stack[idx] for stack in stacks])
+            np.testing.assert_array_equal(frame, expected)
+
+
+class TestGridLayout:
+    def test_matches_image_grid(self, img_array: np.ndarray):
+        imgs = [img_array, np.ones((120, 80, 3), dtype=np.uint8), img_array[:50]]
+        layout = GridLayout([img.shape for img in imgs], nrows=2, fill_value=100)
+
+        assert layout.shape == (178, 188, 3)
+        np.testing.assert_array_equal(
+            layout.paste(imgs), image_grid(imgs, nrows=2, fill_value=100)
+        )
+
+    def test_reuse_canvas(self, img_array: np.ndarray):
+        layout = GridLayout([img_array.shape, img_array.shape])
+        canvas = layout.canvas()
+        out = layout.paste([img_array, img_array], out=canvas)
+        assert out is canvas
+
+        layout.paste([1 - img_array, img_array], out=canvas)
+        np.testing.assert_array_equal(canvas[2:102, 2:102], 1 - img_array)
+
+    def test_batch(self, img_array: np.ndarray):
+        stack = np.stack([img_array, 1 - img_array])
+        layout = GridLayout([img_array.shape])
+        canvas = layout.canvas(2)
+
+        assert canvas.shape == (2, *layout.shape)
+        np.testing.assert_array_equal(
+            layout.paste([stack], out=canvas)[1, 2:-2, 2:-2], stack[1]
+        )
+
+    def test_channels(self, img_array: np.ndarray):
+        with pytest.raises(AssertionError, match=".*different channels"):
+            GridLayout([img_array.shape, img_array.shape[:2]])
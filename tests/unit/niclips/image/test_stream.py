@@ -0,0 +1,80 @@
+import nibabel as nib
+import numpy as np
+import pytest
+
+import niclips.image._stream as nostream
+from niclips.precision import set_precision
+from niclips.products import ImageProducts
+
+
+@pytest.fixture
+def nii_bold_img() -> nib.Nifti1Image:
+    rng = np.random.default_rng(42)
+    data = rng.normal(1000, 50, size=(6, 5, 4, 11)).astype(np.float32)
+    return nib.Nifti1Image(data, affine=np.eye(4))
+
+
+class TestIterVolumes:
+    def test_chunks(self, nii_bold_img: nib.Nifti1Image):
+        # 3 volumes per chunk
+        chunk_bytes = 3 * 8 * 6 * 5 * 4
+        chunks = list(nostream.iter_volumes(nii_bold_img, chunk_bytes=chunk_bytes))
+
+        assert [volumes.stop for volumes, _ in chunks] == [3, 6, 9, 11]
+        data = np.concatenate([chunk for _, chunk in chunks], axis=-1)
+        assert data.dtype == np.float64
+        np.testing.assert_array_equal(data, nii_bold_img.get_fdata())
+
+    def test_float32(self, nii_bold_img: nib.Nifti1Image):
+        set_precision("float32")
+        try:
+            # 3 volumes per chunk, as float32
+            chunk_bytes = 3 * 4 * 6 * 5 * 4
+            chunks = list(nostream.iter_volumes(nii_bold_img, chunk_bytes=chunk_bytes))
+        finally:
+            set_precision("float64")
+
+        assert [volumes.stop for volumes, _ in chunks] == [3, 6, 9, 11]
+        assert all(chunk.dtype == np.float32 for _, chunk in chunks)
+
+
+class TestVolumeStats:
+    @pytest.mark.parametrize("chunk_bytes", [(1), (4 * 8 * 6 * 5 * 4), (2**30)])
+    def test_matches_numpy(self, nii_bold_img: nib.Nifti1Image, chunk_bytes: int):
+        stats = nostream.volume_stats(nii_bold_img, chunk_bytes=chunk_bytes)
+        data = nii_bold_img.get_fdata()
+
+        np.testing.assert_allclose(stats.mean, data.mean(axis=-1))
+        np.testing.assert_allclose(stats.std, data.std(axis=-1))
+        np.testing.assert_allclose(stats.signal, data.mean(axis=(0, 1, 2)))
+        assert stats.window == (data.min(), data.max())
+
+    def test_not_4d(self, nii_3d_img: nib.Nifti1Image):
+        with pytest.raises(ValueError, match="Expected 4d image.*"):
+            nostream.volume_stats(nii_3d_img)
+
+
+class TestShouldStream:
+    def test_threshold(self, nii_bold_img: nib.Nifti1Image):
+        assert not nostream.should_stream(nii_bold_img)
+        assert nostream.should_stream(nii_bold_img, threshold=1024)
+
+    def test_precision(self, nii_bold_img: nib.Nifti1Image):
+        threshold = 6 * int(np.prod(nii_bold_img.shape))
+        assert nostream.should_stream(nii_bold_img, threshold=threshold)
+        set_precision("float32")
+        try:
+            assert not nostream.should_stream(nii_bold_img, threshold=threshold)
+        finally:
+            set_precision("float64")
+
+    def test_products(
+        self, nii_bold_img: nib.Nifti1Image, monkeypatch: pytest.MonkeyPatch
+    ):
+        monkeypatch.setattr(nostream, "STREAM_BYTES", 1024)
+        products = ImageProducts(nii_bold_img)
+        data = nii_bold_img.get_fdata()
+
+        np.testing.assert_allclose(products["std"], data.std(axis=-1))
+        np.testing.assert_allclose(products["signal"], data.mean(axis=(0, 1, 2)))
+        assert "stats" in products
@@ -1,7 +1,7 @@
 import nibabel as nib
 import numpy as np
 
-from niclips.image import crop_middle_third, get_fdata, index_img
+from niclips.image import crop_middle_third, get_fdata, index_img, peak_of_mass
 from niclips.image._window import Window, center_minmax, minmax
 
 
@@ -38,3 +38,9 @@ class TestCenterMinMax:
 
         assert isinstance(window, Window)
         assert window.vmin == min(data.flatten()) and window.vmax == max(data.flatten())
+
+    def test_centroid(self, nii_3d_img: nib.Nifti1Image):
+        centroid = peak_of_mass(get_fdata(nii_3d_img), mask=True)
+        window = center_minmax(img=nii_3d_img, centroid=centroid)
+
+        assert window == center_minmax(img=nii_3d_img)
@@ -11,6 +11,11 @@ def test_get_default_coord(nii_3d_img: nib.Nifti1Image):
     assert default_coord == (5.0, 5.0, 5.0)
 
 
+def test_get_default_coord_header(nii_3d_non_iso_ras: nib.Nifti1Image):
+    default_coord = nodefaults.get_default_coord(nii_3d_non_iso_ras.header)
+    assert default_coord == nodefaults.get_default_coord(nii_3d_non_iso_ras)
+
+
 def test_get_default_window(mock_img: MagicMock):
     mock_center_minmax = MagicMock(return_value=(100.0, 1000.0))
     with patch("niclips.image.center_minmax", mock_center_minmax):
@@ -11,14 +11,36 @@ import niclips.io as noio
 
 
 class TestLoadNifti:
-    @pytest.mark.parametrize("nifti_lib", [(True), (False)])
+    @pytest.mark.parametrize("reader", list(noio.reader_registry))
+    @pytest.mark.parametrize("ext", [(".nii"), (".nii.gz")])
     def test_load_nifti(
-        self, tmp_path: Path, nii_3d_img: nib.Nifti1Image, nifti_lib: bool
+        self,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+        nii_3d_img: nib.Nifti1Image,
+        reader: str,
+        ext: str,
     ):
-        nib.save(nii_3d_img, (nii_fpath := (tmp_path / "test.nii")))
-        res = noio.load_nifti(nii_fpath, use_niftilib=nifti_lib)
+        monkeypatch.setenv("NICLIPS_CACHE_DIR", str(tmp_path / "cache"))
+        nib.save(nii_3d_img, (nii_fpath := (tmp_path / f"test{ext}")))
+        res = noio.load_nifti(nii_fpath, reader=reader)
 
         assert isinstance(res, nib.Nifti1Image)
+        np.testing.assert_array_equal(res.get_fdata(), nii_3d_img.get_fdata())
+        np.testing.assert_array_equal(res.affine, nii_3d_img.affine)
+
+    def test_unknown_reader(self, tmp_path: Path):
+        with pytest.raises(KeyError, match=".*not found in registry"):
+            noio.load_nifti(tmp_path / "test.nii", reader="unknown")
+
+    def test_register_reader(self, tmp_path: Path, nii_3d_img: nib.Nifti1Image):
+        mock_reader = MagicMock(return_value=nii_3d_img)
+        with patch.dict(noio.reader_registry):
+            noio.register_reader("mock")(mock_reader)
+            res = noio.load_nifti(tmp_path / "test.nii", reader="mock")
+
+        assert res is nii_3d_img
+        mock_reader.assert_called_once_with(tmp_path / "test.nii")
 
     def test_unavailable_nifti(
         self,
@@ -28,11 +50,227 @@ class TestLoadNifti:
     ):
         nib.save(nii_3d_img, (nii_fpath := (tmp_path / "test.nii")))
         with patch("niclips.io.HAVE_NIFTI", False):
-            res = noio.load_nifti(nii_fpath, use_niftilib=True)
+            res = noio.load_nifti(nii_fpath, reader="nifti")
             assert "unavailable" in caplog.text
 
         assert isinstance(res, nib.Nifti1Image)
 
+    @pytest.mark.parametrize("ext", [(".nii"), (".nii.gz")])
+    def test_lazy(self, tmp_path: Path, nii_4d_img: nib.Nifti1Image, ext: str):
+        nib.save(nii_4d_img, (nii_fpath := (tmp_path / f"test{ext}")))
+        res = noio.load_nifti(nii_fpath, access="slices")
+
+        assert isinstance(res, nib.Nifti1Image)
+        assert not res.in_memory
+        np.testing.assert_array_equal(res.dataobj[..., 1], nii_4d_img.dataobj[..., 1])
+
+
+class TestLoadNiftiHeader:
+    @pytest.mark.parametrize("ext", [(".nii"), (".nii.gz")])
+    @pytest.mark.parametrize("klass", [(nib.Nifti1Image), (nib.Nifti2Image)])
+    def test_header(
+        self, tmp_path: Path, nii_4d_img: nib.Nifti1Image, ext: str, klass: type
+    ):
+        img = klass(nii_4d_img.dataobj, affine=np.diag([2.0, 3.0, 4.0, 1.0]))
+        nib.save(img, (nii_fpath := (tmp_path / f"test{ext}")))
+        hdr = noio.load_nifti_header(nii_fpath)
+
+        assert isinstance(hdr, klass.header_class)
+        assert hdr.get_data_shape() == img.shape
+        np.testing.assert_array_equal(hdr.get_best_affine(), img.affine)
+        assert noio.get_data_nbytes(hdr) == img.get_fdata().nbytes
+
+
+class TestSelectReader:
+    @pytest.mark.parametrize("access", [("header"), ("slices"), ("stream"), ("full")])
+    def test_uncompressed(self, tmp_path: Path, access: str):
+        assert noio.select_reader(tmp_path / "test.nii", access=access) == (
+            "nibabel-mmap"
+        )
+
+    @pytest.mark.parametrize(
+        ("have_nifti", "expected"), [(True, "nifti"), (False, "nibabel")]
+    )
+    def test_full(
+        self,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+        nii_3d_img: nib.Nifti1Image,
+        have_nifti: bool,
+        expected: str,
+    ):
+        monkeypatch.setenv("NICLIPS_CACHE_DIR", str(tmp_path / "cache"))
+        nib.save(nii_3d_img, (nii_fpath := (tmp_path / "test.nii.gz")))
+        with patch("niclips.io.HAVE_NIFTI", have_nifti):
+            assert noio.select_reader(nii_fpath, access="full") == expected
+
+    def test_full_indexed(
+        self,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+        nii_3d_img: nib.Nifti1Image,
+    ):
+        monkeypatch.setenv("NICLIPS_CACHE_DIR", str(tmp_path / "cache"))
+        nib.save(nii_3d_img, (nii_fpath := (tmp_path / "test.nii.gz")))
+        noio.open_indexed_gzip(nii_fpath)
+        with patch("os.cpu_count", return_value=4):
+            assert noio.select_reader(nii_fpath, access="full") == "gzip-parallel"
+        assert noio.select_reader(nii_fpath, access="slices") == "indexed-gzip"
+
+    def test_full_large(
+        self,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+        nii_3d_img: nib.Nifti1Image,
+    ):
+        monkeypatch.setenv("NICLIPS_CACHE_DIR", str(tmp_path / "cache"))
+        nib.save(nii_3d_img, (nii_fpath := (tmp_path / "test.nii.gz")))
+        with patch("os.cpu_count", return_value=4):
+            with patch("niclips.io.LARGE_GZIP_BYTES", 0):
+                assert noio.select_reader(nii_fpath, access="full") == "gzip-parallel"
+            # First full load builds the index, used by later loads of any size
+            noio.load_nifti(nii_fpath, reader="gzip-parallel")
+            assert noio.gzip_index_path(nii_fpath).exists()
+            assert noio.select_reader(nii_fpath, access="full") == "gzip-parallel"
+
+    def test_slices_large(
+        self,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+        nii_3d_img: nib.Nifti1Image,
+        nii_4d_img: nib.Nifti1Image,
+    ):
+        monkeypatch.setenv("NICLIPS_CACHE_DIR", str(tmp_path / "cache"))
+        nib.save(nii_3d_img, (nii_3d_fpath := (tmp_path / "test_3d.nii.gz")))
+        nib.save(nii_4d_img, (nii_4d_fpath := (tmp_path / "test_4d.nii.gz")))
+        assert noio.select_reader(nii_4d_fpath, access="slices") == "nibabel-mmap"
+        with patch("niclips.io.LARGE_GZIP_BYTES", 0):
+            assert noio.select_reader(nii_4d_fpath, access="slices") == "indexed-gzip"
+            # 3D images are read in full anyway, without building an index
+            assert noio.select_reader(nii_3d_fpath, access="slices") == ("nibabel-mmap")
+
+    def test_stream(
+        self,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+        nii_4d_img: nib.Nifti1Image,
+    ):
+        monkeypatch.setenv("NICLIPS_CACHE_DIR", str(tmp_path / "cache"))
+        nib.save(nii_4d_img, (nii_fpath := (tmp_path / "test.nii.gz")))
+        assert noio.select_reader(nii_fpath, access="stream") == (
+            noio.select_reader(nii_fpath, access="full")
+        )
+        with patch("niclips.io.STREAM_BYTES", 0):
+            assert noio.select_reader(nii_fpath, access="stream") == "nibabel-mmap"
+
+
+class TestGzipIndex:
+    def test_cache_dir(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setenv("NICLIPS_CACHE_DIR", str(tmp_path))
+        assert noio.get_cache_dir() == tmp_path
+
+    def test_index_path(self, tmp_path: Path, nii_4d_img: nib.Nifti1Image):
+        nib.save(nii_4d_img, (nii_fpath := (tmp_path / "test.nii.gz")))
+        index_path = noio.gzip_index_path(nii_fpath, index_dir=tmp_path)
+
+        assert index_path.parent == tmp_path
+        assert index_path == noio.gzip_index_path(nii_fpath, index_dir=tmp_path)
+
+    def test_load_indexed(
+        self,
+        tmp_path: Path,
+        nii_4d_img: nib.Nifti1Image,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        monkeypatch.setenv("NICLIPS_CACHE_DIR", str(tmp_path / "cache"))
+        nib.save(nii_4d_img, (nii_fpath := (tmp_path / "test.nii.gz")))
+
+        for _ in range(2):
+            res = noio.load_nifti(nii_fpath, reader="indexed-gzip")
+            assert noio.gzip_index_path(nii_fpath).exists()
+            assert res.get_filename() == str(nii_fpath)
+            assert not res.in_memory
+            np.testing.assert_array_equal(
+                res.dataobj[..., 1], nii_4d_img.dataobj[..., 1]
+            )
+
+    def test_unavailable_indexed_gzip(
+        self,
+        tmp_path: Path,
+        nii_4d_img: nib.Nifti1Image,
+        caplog: pytest.LogCaptureFixture,
+    ):
+        nib.save(nii_4d_img, (nii_fpath := (tmp_path / "test.nii.gz")))
+        with patch("niclips.io.HAVE_INDEXED_GZIP", False):
+            res = noio.load_nifti(nii_fpath, reader="indexed-gzip")
+            assert "unavailable" in caplog.text
+
+        assert not res.in_memory
+
+
+class TestLoadNiftiParallel:
+    @pytest.mark.parametrize("threads", [(1), (3)])
+    def test_load(
+        self,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+        threads: int,
+    ):
+        monkeypatch.setenv("NICLIPS_CACHE_DIR", str(tmp_path / "cache"))
+        data = np.random.rand(10, 10, 10, 7).astype(np.float32)
+        img = nib.Nifti1Image(data, affine=np.diag([2.0, 2.0, 2.0, 1.0]))
+        nib.save(img, (nii_fpath := (tmp_path / "test.nii.gz")))
+
+        # First load builds the index, second load decompresses in parallel
+        for _ in range(2):
+            res = noio.load_nifti_parallel(nii_fpath, threads=threads)
+            assert res.get_filename() == str(nii_fpath)
+            np.testing.assert_array_equal(res.get_fdata(), data)
+            np.testing.assert_array_equal(res.affine, img.affine)
+
+    def test_scaled(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setenv("NICLIPS_CACHE_DIR", str(tmp_path / "cache"))
+        img = nib.Nifti1Image(np.arange(24, dtype=np.int16).reshape(2, 3, 4), None)
+        img.header.set_slope_inter(2.0, 1.0)
+        nib.save(img, (nii_fpath := (tmp_path / "test.nii.gz")))
+
+        res = noio.load_nifti(nii_fpath, reader="gzip-parallel")
+        np.testing.assert_allclose(res.get_fdata(), nib.load(nii_fpath).get_fdata())
+
+    def test_nifti2(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setenv("NICLIPS_CACHE_DIR", str(tmp_path / "cache"))
+        data = np.random.rand(4, 5, 6).astype(np.float32)
+        nib.save(nib.Nifti2Image(data, None), (nii_fpath := (tmp_path / "test.nii.gz")))
+
+        res = noio.load_nifti_parallel(nii_fpath)
+        assert isinstance(res, nib.Nifti2Image)
+        np.testing.assert_array_equal(res.get_fdata(), data)
+
+    def test_closes_files(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+        monkeypatch.setenv("NICLIPS_CACHE_DIR", str(tmp_path / "cache"))
+        img = nib.Nifti1Image(np.random.rand(10, 10, 10, 4).astype(np.float32), None)
+        nib.save(img, (nii_fpath := (tmp_path / "test.nii.gz")))
+
+        opened = []
+
+        class TrackedGzipFile(noio.igzip.IndexedGzipFile):
+            def __init__(self, *args, **kwargs) -> None:
+                super().__init__(*args, **kwargs)
+                opened.append(self)
+
+        monkeypatch.setattr(noio.igzip, "IndexedGzipFile", TrackedGzipFile)
+        for _ in range(2):
+            noio.load_nifti_parallel(nii_fpath, threads=2)
+
+        assert len(opened) == 4
+        assert all(gzf.closed for gzf in opened)
+
+    def test_uncompressed(self, tmp_path: Path, nii_3d_img: nib.Nifti1Image):
+        nib.save(nii_3d_img, (nii_fpath := (tmp_path / "test.nii")))
+        res = noio.load_nifti_parallel(nii_fpath)
+
+        assert isinstance(res, nib.Nifti1Image)
+
 
 class TestVideoWriterClassInit:
     def test_init_non_mp4(self, tmp_path: Path):
@@ -48,6 +286,53 @@ class TestVideoWriterClassInit:
         assert video_writer._container is None
         assert video_writer._stream is None
 
+    def test_init_codec_suffix(self, tmp_path: Path):
+        with pytest.raises(ValueError, match="Only webp.*"):
+            noio.VideoWriter(tmp_path / "video.mp4", fps=30, encoder={"codec": "webp"})
+        video_writer = noio.VideoWriter(
+            tmp_path / "video.webm", fps=30, encoder={"codec": "vp9"}
+        )
+        assert video_writer.profile.codec == "vp9"
+
+
+class TestEncoderProfile:
+    def test_named(self):
+        assert noio.get_encoder_profile() == noio.ENCODER_PROFILES["default"]
+        assert noio.get_encoder_profile("fast-draft").preset == "ultrafast"
+
+    def test_unknown(self):
+        with pytest.raises(ValueError, match="Unknown encoder profile.*"):
+            noio.get_encoder_profile("unknown")
+        with pytest.raises(ValueError, match="Unsupported video codec.*"):
+            noio.get_encoder_profile({"codec": "mpeg1"})
+
+    def test_overrides(self):
+        profile = noio.get_encoder_profile({"profile": "archival", "threads": 4})
+        assert profile.preset == "slow"
+        assert profile.threads == 4
+
+    @pytest.mark.parametrize(
+        "codec,expected",
+        [
+            ("h264", {"preset": "slow", "crf": "18"}),
+            ("vp9", {"cpu-used": "2", "crf": "18", "b": "0", "row-mt": "1"}),
+            ("webp", {"compression_level": "4", "quality": "82"}),
+        ],
+    )
+    def test_options(self, codec: str, expected: dict[str, str]):
+        profile = noio.get_encoder_profile({"profile": "archival", "codec": codec})
+        assert noio._encoder_options(profile) == expected
+
+    def test_init_stream(self, tmp_path: Path):
+        encoder = noio.EncoderProfile(preset="ultrafast", threads=2, gop=5)
+        writer = noio.VideoWriter(tmp_path / "video.mp4", fps=30, encoder=encoder)
+        writer.init_stream(width=64, height=64)
+
+        assert writer._stream
+        assert writer._stream.codec_context.thread_count == 2
+        assert writer._stream.codec_context.gop_size == 5
+        writer.close()
+
 
 @pytest.fixture
 def video_writer(tmp_path: Path) -> noio.VideoWriter:
@@ -67,6 +352,65 @@ class TestVideoWriterPut:
         assert video_writer._container
         assert video_writer._stream
 
+    def test_put_array_reuses_frame(self, video_writer: noio.VideoWriter):
+        rgba = np.zeros((64, 48, 4), dtype=np.uint8)
+        video_writer.put(rgba)
+        frame = video_writer._frame
+        video_writer.put(rgba)
+
+        assert frame is not None
+        assert video_writer._frame is frame
+        assert frame.format.name == "yuv420p"
+        assert video_writer._num_frames == 2
+
+    def test_put_yuv_planes(self, video_writer: noio.VideoWriter):
+        planes = noio.rgb_to_yuv420(np.zeros((64, 48, 3), dtype=np.uint8))
+        video_writer.put(planes)
+
+        assert video_writer._frame is not None
+        assert video_writer._stream
+        assert video_writer._stream.width == 48
+
+    def test_put_swscale(self, tmp_path: Path, img_array: np.ndarray):
+        with noio.VideoWriter(tmp_path / "test.mp4", 30, "swscale") as writer:
+            writer.put(img_array)
+
+            assert writer._frame is None
+            assert writer._num_frames == 1
+
+
+class TestRgbToYuv420:
+    @pytest.mark.parametrize(
+        "color,expected",
+        [
+            ((0, 0, 0), (16, 128, 128)),
+            ((255, 255, 255), (235, 128, 128)),
+            ((255, 0, 0), (82, 90, 240)),
+        ],
+    )
+    def test_values(self, color: tuple[int, ...], expected: tuple[int, ...]):
+        rgb = np.full((4, 4, 3), color, dtype=np.uint8)
+        y, u, v = noio.rgb_to_yuv420(rgb)
+
+        assert (y == expected[0]).all()
+        assert (u == expected[1]).all()
+        assert (v == expected[2]).all()
+
+    def test_odd_shape(self):
+        y, u, v = noio.rgb_to_yuv420(np.zeros((5, 7, 4), dtype=np.uint8))
+
+        assert y.shape == (5, 7)
+        assert u.shape == v.shape == (3, 4)
+        assert y.dtype == u.dtype == np.uint8
+
+    def test_out(self):
+        shapes = [(4, 4), (2, 2), (2, 2)]
+        out = tuple(np.empty(shape, dtype=np.uint8) for shape in shapes)
+        planes = noio.rgb_to_yuv420(np.zeros((4, 4, 3), dtype=np.uint8), out=out)
+
+        assert planes is out
+        assert (out[0] == 16).all()
+
 
 class TestVideoWriterInitFunc:
     def test_init(self, video_writer: noio.VideoWriter):
@@ -0,0 +1,69 @@
+from collections.abc import Generator
+
+import nibabel as nib
+import numpy as np
+import pytest
+
+import niclips.image as noimg
+from niclips.precision import get_precision, set_precision
+from niclips.products import ImageProducts
+from niclips.typing import Precision
+
+
+@pytest.fixture
+def precision(request: pytest.FixtureRequest) -> Generator[Precision, None, None]:
+    set_precision(request.param)
+    yield request.param
+    set_precision("float64")
+
+
+@pytest.fixture
+def nii_int16_img() -> nib.Nifti1Image:
+    rng = np.random.default_rng(42)
+    data = rng.integers(0, 1000, size=(10, 10, 10, 4), dtype=np.int16)
+    return nib.Nifti1Image(data, affine=np.eye(4))
+
+
+class TestSetPrecision:
+    def test_default(self):
+        assert get_precision() == "float64"
+
+    def test_invalid(self):
+        with pytest.raises(ValueError, match="Invalid precision.*"):
+            set_precision("float16")  # type: ignore [arg-type]
+
+
+class TestGetFdata:
+    @pytest.mark.parametrize(
+        ("precision", "dtype"),
+        [("float64", np.float64), ("float32", np.float32), ("native", np.int16)],
+        indirect=["precision"],
+    )
+    def test_dtype(
+        self, nii_int16_img: nib.Nifti1Image, precision: Precision, dtype: type
+    ):
+        assert noimg.get_fdata(nii_int16_img).dtype == dtype
+        assert noimg.index_img(nii_int16_img).get_data_dtype() == dtype
+
+    @pytest.mark.parametrize("precision", ["native"], indirect=True)
+    def test_native_scaled(self, nii_int16_img: nib.Nifti1Image, precision: Precision):
+        nii_int16_img.header.set_slope_inter(2.0, 0.0)
+        assert noimg.get_fdata(nii_int16_img).dtype == np.float32
+
+    @pytest.mark.parametrize("precision", ["native"], indirect=True)
+    def test_native_no_copy(self, nii_int16_img: nib.Nifti1Image, precision: Precision):
+        assert noimg.get_fdata(nii_int16_img) is nii_int16_img.dataobj
+
+
+class TestProducts:
+    @pytest.mark.parametrize("precision", ["float32", "native"], indirect=True)
+    def test_upcast_reductions(
+        self, nii_int16_img: nib.Nifti1Image, precision: Precision
+    ):
+        products = ImageProducts(nii_int16_img)
+        expected = nii_int16_img.get_fdata().mean(axis=-1)
+
+        assert products["mean"].dtype == np.float32
+        assert products["std"].dtype == np.float32
+        np.testing.assert_allclose(products["mean"], expected, rtol=1e-6)
+        assert noimg.center_minmax(nii_int16_img) == products["window"]
@@ -0,0 +1,79 @@
+from collections.abc import Generator
+from unittest.mock import MagicMock
+
+import nibabel as nib
+import numpy as np
+import pytest
+
+import niclips.image as noimg
+from niclips.products import (
+    ImageProducts,
+    plan_products,
+    product_registry,
+    register_product,
+)
+
+
+@pytest.fixture
+def mock_products() -> Generator[dict[str, MagicMock], None, None]:
+    """Register mock products 'a' <- 'b' <- 'c' and 'a' <- 'd'."""
+    fns = {name: MagicMock(return_value=name) for name in "abcd"}
+    register_product("a")(fns["a"])
+    register_product("b", requires=["a"])(fns["b"])
+    register_product("c", requires=["b"])(fns["c"])
+    register_product("d", requires=["a"])(fns["d"])
+    yield fns
+    for name in fns:
+        product_registry.pop(name)
+
+
+class TestPlanProducts:
+    def test_order(self, mock_products: dict[str, MagicMock]):
+        assert plan_products(["c", "d"]) == ["a", "b", "c", "d"]
+
+    def test_not_found(self):
+        with pytest.raises(KeyError, match=".*not found in registry"):
+            plan_products(["fake"])
+
+    def test_cycle(self, mock_products: dict[str, MagicMock]):
+        register_product("a", requires=["c"])(mock_products["a"])
+        with pytest.raises(ValueError, match="Cyclic dependency.*"):
+            plan_products(["c"])
+
+
+class TestImageProducts:
+    def test_compute_once(
+        self, nii_3d_img: nib.Nifti1Image, mock_products: dict[str, MagicMock]
+    ):
+        products = ImageProducts(nii_3d_img)
+        products.compute(["c", "d"])
+
+        assert products["c"] == "c"
+        assert all(fn.call_count == 1 for fn in mock_products.values())
+
+    def test_lazy(
+        self, nii_3d_img: nib.Nifti1Image, mock_products: dict[str, MagicMock]
+    ):
+        products = ImageProducts(nii_3d_img)
+
+        assert products["b"] == "b"
+        assert "a" in products and "c" not in products
+        mock_products["c"].assert_not_called()
+
+    def test_window(self, nii_4d_img: nib.Nifti1Image):
+        products = ImageProducts(nii_4d_img)
+        assert products["window"] == noimg.center_minmax(nii_4d_img)
+
+    def test_mean_mask(self, nii_4d_img: nib.Nifti1Image):
+        products = ImageProducts(nii_4d_img)
+        mean = nii_4d_img.get_fdata().mean(axis=-1)
+
+        assert np.array_equal(products["mean"], mean)
+        assert np.array_equal(products["mask"], mean > mean.mean())
+        assert products["std"].shape == nii_4d_img.shape[:3]
+
+    def test_nbytes(self, nii_3d_img: nib.Nifti1Image):
+        products = ImageProducts(nii_3d_img)
+        # 3D mean is the image data itself
+        products.compute(["mean", "mask"])
+        assert products.nbytes == products["mask"].nbytes
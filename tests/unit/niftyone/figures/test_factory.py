@@ -1,12 +1,16 @@
 from collections.abc import Generator, Mapping
 from pathlib import Path
 from typing import Any
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, create_autospec
 
+import nibabel as nib
 import pandas as pd
 import pytest
 from bids2table import BIDSTable
 
+from niclips.defaults import get_default_coord
+from niclips.io import EncoderLike
+from niftyone.cache import ImageCache
 from niftyone.figures.factory import (
     View,
     create_view,
@@ -43,6 +47,85 @@ class TestViewFactory:
         test_view(table=b2t_mock, out_dir=tmp_path, overwrite=True)
         test_view.create.assert_called()
 
+    def test_view_skip_existing(self, test_view: View, tmp_path: Path) -> None:
+        out_path = tmp_path / "out.png"
+        out_path.touch()
+        test_view.view_fn = MagicMock()
+        test_view._figure_out_path = MagicMock(  # type: ignore [method-assign]
+            return_value=out_path
+        )
+        test_view._load_image = MagicMock()  # type: ignore [method-assign]
+
+        test_view.create(records=[MagicMock()], out_dir=tmp_path, overwrite=False)
+        test_view._load_image.assert_not_called()
+        test_view.view_fn.assert_not_called()
+
+    def test_view_products(
+        self, test_view: View, tmp_path: Path, nii_3d_img: nib.Nifti1Image
+    ) -> None:
+        nib.save(nii_3d_img, (img_path := tmp_path / "img.nii"))
+        test_view.products = ("mask",)
+        test_view.view_fn = MagicMock()
+        test_view._figure_out_path = MagicMock(  # type: ignore [method-assign]
+            return_value=tmp_path / "out.png"
+        )
+        cache = ImageCache()
+        record = pd.Series({"finfo": {"file_path": str(img_path)}})
+
+        test_view.create(
+            records=[record], out_dir=tmp_path, overwrite=True, cache=cache
+        )
+        products = test_view.view_fn.call_args.kwargs["products"]
+        img = test_view.view_fn.call_args.args[0]
+        assert "mask" in products
+        assert cache.get_products(img_path, img) is products
+
+    def test_view_planned_coord(
+        self, test_view: View, tmp_path: Path, nii_3d_non_iso_ras: nib.Nifti1Image
+    ) -> None:
+        def view_fn(
+            img: nib.Nifti1Image, out: Path, coord: tuple | None = None, **kwargs
+        ) -> None:
+            pass
+
+        nib.save(nii_3d_non_iso_ras, (img_path := tmp_path / "img.nii"))
+        test_view.view_fn = create_autospec(view_fn)
+        test_view._figure_out_path = MagicMock(  # type: ignore [method-assign]
+            return_value=tmp_path / "out.png"
+        )
+        record = pd.Series({"finfo": {"file_path": str(img_path)}})
+
+        test_view.create(records=[record], out_dir=tmp_path, overwrite=True)
+        img = test_view.view_fn.call_args.args[0]
+        coord = test_view.view_fn.call_args.kwargs["coord"]
+        assert coord == get_default_coord(img)
+
+        # Coordinates set in the view config take precedence
+        view = type(test_view)([], None, {"coord": (0.0, 0.0, 0.0)})
+        assert view._plan_view_kwargs(record) == {}
+
+    def test_view_reader(self, test_view: View) -> None:
+        view = type(test_view)([], None, {"reader": "nifti"}, reader="nibabel")
+        assert view.reader == "nifti"
+        assert "reader" not in view.view_kwargs
+
+        view = type(test_view)([], None, {}, reader="nibabel")
+        assert view.reader == "nibabel"
+
+    @pytest.mark.parametrize(
+        "encoder,suffix",
+        [(None, ".mp4"), ("archival", ".mp4"), ({"codec": "webp"}, ".webp")],
+    )
+    def test_view_video_suffix(
+        self, tmp_path: Path, encoder: EncoderLike, suffix: str
+    ) -> None:
+        class TestVideo(View):
+            entities = {"desc": "test", "ext": ".mp4"}
+
+        view = TestVideo([], None, {"encoder": encoder})
+        record = pd.Series({"ent": pd.Series({"sub": "01", "suffix": "T1w"})})
+        assert view._figure_out_path(record, tmp_path).suffix == suffix
+
     def test_view_no_view_fn(self, test_view: View) -> None:
         with pytest.raises(ValueError, match=".*unable to create view.*"):
             test_view.create(
@@ -0,0 +1,112 @@
+import os
+import pickle
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import nibabel as nib
+import numpy as np
+import pytest
+
+from niftyone.cache import ImageCache
+
+
+@pytest.fixture
+def nii_path(tmp_path: Path, nii_3d_img: nib.Nifti1Image) -> Path:
+    nib.save(nii_3d_img, (nii_fpath := tmp_path / "test.nii"))
+    return nii_fpath
+
+
+@pytest.fixture
+def mock_load() -> MagicMock:
+    return MagicMock(
+        side_effect=lambda _: nib.Nifti1Image(np.zeros((10, 10, 10)), None)
+    )
+
+
+class TestImageCache:
+    def test_hit(self, nii_path: Path, mock_load: MagicMock):
+        cache = ImageCache()
+        img1 = cache.get(nii_path, mock_load)
+        img2 = cache.get(nii_path, mock_load)
+
+        assert img1 is img2
+        mock_load.assert_called_once_with(nii_path)
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_modified(self, nii_path: Path, mock_load: MagicMock):
+        cache = ImageCache()
+        img1 = cache.get(nii_path, mock_load)
+        stat = nii_path.stat()
+        os.utime(nii_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        img2 = cache.get(nii_path, mock_load)
+
+        assert img1 is not img2
+        assert cache.misses == 2
+
+    def test_reader_access(self, nii_path: Path, mock_load: MagicMock):
+        cache = ImageCache()
+        img1 = cache.get(nii_path, mock_load, reader="nibabel-mmap", access="slices")
+        img2 = cache.get(nii_path, mock_load, reader="nibabel-mmap", access="full")
+        img3 = cache.get(nii_path, mock_load, reader="nifti", access="full")
+
+        assert len({id(img1), id(img2), id(img3)}) == 3
+        assert cache.get(nii_path, mock_load, access="slices") is not img1
+        assert cache.misses == 4
+        # Products are shared between the images of a file
+        assert cache.get_products(nii_path, img1) is cache.get_products(nii_path, img3)
+
+    def test_evict(self, tmp_path: Path, mock_load: MagicMock):
+        # Each image is 8000 bytes
+        cache = ImageCache(max_bytes=20000)
+        paths = [tmp_path / f"test{ii}.nii" for ii in range(3)]
+        for path in paths:
+            path.touch()
+            cache.get(path, mock_load)
+
+        assert len(cache) == 2
+        assert cache.evictions == 1
+        cache.get(paths[0], mock_load)
+        assert cache.misses == 4
+
+    def test_fdata_nbytes(self, nii_path: Path):
+        cache = ImageCache()
+        img = cache.get(nii_path, nib.load)
+        assert cache.nbytes == 0
+
+        img.get_fdata()
+        assert cache.nbytes == img.get_fdata().nbytes
+
+    def test_disabled(self, nii_path: Path, mock_load: MagicMock):
+        cache = ImageCache(max_bytes=0)
+        cache.get(nii_path, mock_load)
+        cache.get(nii_path, mock_load)
+
+        assert len(cache) == 0
+        assert mock_load.call_count == 2
+
+    def test_pickle(self, nii_path: Path, mock_load: MagicMock):
+        cache = ImageCache()
+        cache.get(nii_path, mock_load)
+        cache = pickle.loads(pickle.dumps(cache))
+
+        assert len(cache) == 0
+        assert cache.misses == 1
+
+    def test_log_stats(self, nii_path: Path, caplog: pytest.LogCaptureFixture):
+        cache = ImageCache()
+        cache.get(nii_path, nib.load)
+        cache.log_stats()
+
+        assert "0 hits, 1 misses" in caplog.text
+
+    def test_products(self, nii_path: Path):
+        cache = ImageCache()
+        img = cache.get(nii_path, nib.load)
+        products = cache.get_products(nii_path, img)
+        products.compute(["mask"])
+
+        assert cache.get_products(nii_path, img) is products
+        assert cache.nbytes == img.get_fdata().nbytes + products["mask"].nbytes
+
+        cache.clear()
+        assert cache.get_products(nii_path, img) is not products
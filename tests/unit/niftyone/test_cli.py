@@ -47,6 +47,12 @@ class TestParser:
                 "qc_dir",
                 "--workers",
                 "2",
+                "--reader",
+                "nibabel-mmap",
+                "--precision",
+                "float32",
+                "--cache-size",
+                "512",
             ],
         ):
             args = parser.parse_args()
@@ -55,6 +61,9 @@ class TestParser:
         assert args.index == Path("index.b2t")
         assert args.qc_dir == Path("qc_dir")
         assert args.workers == 2
+        assert args.reader == "nibabel-mmap"
+        assert args.precision == "float32"
+        assert args.cache_size == 512
 
     def test_group_args(self, parser: NiftyOneArgumentParser) -> None:
         with patch(
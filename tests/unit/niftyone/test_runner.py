@@ -41,6 +41,7 @@ class TestRunner:
 
         for mock_view in mock_views:
             mock_view.assert_called()  # type: ignore [attr-defined]
+            assert mock_view.call_args.kwargs["cache"] is runner.image_cache
 
     @pytest.mark.parametrize(
         "table_return, expected_msg",